@@ -0,0 +1,311 @@
+import argparse
+import asyncio
+import json
+import math
+import random
+import subprocess
+import time
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+import httpx
+import fastapi.routing
+from fastapi.responses import JSONResponse
+from sqlalchemy import event, text
+import cache
+from database import SessionLocal, engine
+from main import app
+from services.aggregate_service import AggregateService
+
+# (method, path, query params, JSON body)
+Request = Tuple[str, str, Dict[str, Any], Optional[Dict[str, Any]]]
+
+# Key prefixes the API caches under; cold runs delete only these, never the whole Redis database.
+CACHE_PREFIXES = [
+    "monthly_summary", "sales_overview", "sales_breakdown", "top_products", "delivery_performance",
+    "production_performance", "ticket_trend", "ticket_composition", "churn_risk", "customer_rfm", "query"
+]
+
+class Counters:
+    """Time spent in the database and in response serialization, summed over all requests."""
+
+    def __init__(self):
+        self.db_seconds = 0.0
+        self.db_queries = 0
+        self.serialization_seconds = 0.0
+
+    def snapshot(self) -> Tuple[float, int, float]:
+        return self.db_seconds, self.db_queries, self.serialization_seconds
+
+counters = Counters()
+
+def instrument():
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("benchmark_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        counters.db_seconds += time.perf_counter() - conn.info["benchmark_started"].pop()
+        counters.db_queries += 1
+
+    # Response model validation plus JSON rendering
+    serialize_response = fastapi.routing.serialize_response
+    render = JSONResponse.render
+
+    async def timed_serialize_response(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return await serialize_response(*args, **kwargs)
+        finally:
+            counters.serialization_seconds += time.perf_counter() - started
+
+    def timed_render(self, content):
+        started = time.perf_counter()
+        try:
+            return render(self, content)
+        finally:
+            counters.serialization_seconds += time.perf_counter() - started
+
+    fastapi.routing.serialize_response = timed_serialize_response
+    JSONResponse.render = timed_render
+
+async def clear_caches():
+    for prefix in CACHE_PREFIXES:
+        await cache.invalidate_cache_prefix(f"{prefix}:")
+
+def cache_lookups() -> Tuple[int, int]:
+    # An L1 miss that Redis answers is still a hit for the request.
+    stats = cache.get_cache_stats()
+    return stats["l1_hits"] + stats["redis_hits"], stats["l1_hits"] + stats["l1_misses"]
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    return sorted_values[max(0, math.ceil(fraction * len(sorted_values)) - 1)]
+
+def date_ranges(first_day: date, last_day: date, rng: random.Random) -> List[Tuple[date, date]]:
+    ranges = [(max(first_day, last_day - timedelta(days=days - 1)), last_day) for days in (7, 30)]
+    ranges.append((first_day, last_day))
+    span = (last_day - first_day).days
+    for _ in range(2):
+        start = first_day + timedelta(days=rng.randint(0, max(0, span - 13)))
+        ranges.append((start, min(last_day, start + timedelta(days=13))))
+    return ranges
+
+def range_params(date_range: Tuple[date, date]) -> Dict[str, Any]:
+    return {"start_date": str(date_range[0]), "end_date": str(date_range[1])}
+
+def optional_filters(rng: random.Random, store_ids: List[int], channel_ids: List[int], hours: bool = True) -> Dict[str, Any]:
+    params = {}
+    if rng.random() < 0.4:
+        params["channel_id"] = rng.choice(channel_ids)
+    if rng.random() < 0.3:
+        params["store_id"] = rng.choice(store_ids)
+    if rng.random() < 0.3:
+        params["day_of_week"] = rng.randint(1, 7)
+    if hours and rng.random() < 0.3:
+        start_hour = rng.choice([11, 18, 19])
+        params["start_hour"], params["end_hour"] = start_hour, start_hour + 3
+    return params
+
+def build_scenarios(first_day: date, last_day: date, store_ids: List[int], channel_ids: List[int], goal_value: float, rng: random.Random) -> Dict[str, List[Request]]:
+    """Realistic filter mixes per endpoint; every request in a list is distinct."""
+    ranges = date_ranges(first_day, last_day, rng)
+    scenarios: Dict[str, List[Request]] = {
+        "GET /analytics/monthly-summary": [("GET", "/analytics/monthly-summary", {}, None)],
+        "GET /analytics/sales-overview": [
+            ("GET", "/analytics/sales-overview", {**range_params(r), **({"compare_to": compare_to} if compare_to else {})}, None)
+            for r in ranges for compare_to in (None, "previous_period", "previous_year")
+        ],
+        "GET /analytics/top-products": [
+            ("GET", "/analytics/top-products", {**range_params(r), "limit": rng.choice([10, 10, 50]), **optional_filters(rng, store_ids, channel_ids)}, None)
+            for r in ranges for _ in range(3)
+        ],
+        "GET /analytics/sales-breakdown": [
+            ("GET", "/analytics/sales-breakdown", {**range_params(r), "dimension": dimension, **({"compare_to": compare_to} if compare_to else {})}, None)
+            for r in ranges for dimension in ("channel", "store") for compare_to in (None, "previous_period")
+        ],
+        "GET /analytics/delivery-performance": [
+            ("GET", "/analytics/delivery-performance", {**range_params(r), "dimension": dimension, **optional_filters(rng, store_ids, channel_ids)}, None)
+            for r in ranges for dimension in ("store", "neighborhood", "city")
+        ],
+        "GET /analytics/production-performance": [
+            ("GET", "/analytics/production-performance", {**range_params(r), "dimension": dimension, **({"day_of_week": rng.randint(1, 7)} if rng.random() < 0.3 else {})}, None)
+            for r in ranges for dimension in ("store", "neighborhood", "city")
+        ],
+        "GET /analytics/ticket-trend": [("GET", "/analytics/ticket-trend", range_params(r), None) for r in ranges],
+        "GET /analytics/ticket-composition": [("GET", "/analytics/ticket-composition", range_params(r), None) for r in ranges],
+        "GET /analytics/customer-churn-risk": [
+            ("GET", "/analytics/customer-churn-risk", {"min_purchases": min_purchases, "inactive_days": inactive_days, "limit": limit}, None)
+            for min_purchases in (2, 3, 5) for inactive_days in (7, 30) for limit in (50, 100)
+        ],
+        "GET /analytics/customer-churn-risk/count": [
+            ("GET", "/analytics/customer-churn-risk/count", {"min_purchases": min_purchases, "inactive_days": inactive_days}, None)
+            for min_purchases in (2, 3, 5) for inactive_days in (7, 30)
+        ],
+        "GET /analytics/customer-rfm": [("GET", "/analytics/customer-rfm", {}, None)],
+        "GET /filters/options": [("GET", "/filters/options", {}, None)],
+        "GET /goal/average-ticket-goal": [("GET", "/goal/average-ticket-goal", {}, None)],
+        # Writes back the current goal, so the run leaves the data as it found it
+        "PUT /goal/average-ticket-goal": [("PUT", "/goal/average-ticket-goal", {}, {"goal_value": goal_value})]
+    }
+    # Drop repeats so a cold pass misses the cache on every request.
+    return {
+        name: list({json.dumps(request, sort_keys=True): request for request in requests}.values())
+        for name, requests in scenarios.items()
+    }
+
+async def run_phase(client: httpx.AsyncClient, requests: List[Request], concurrency: int) -> Dict[str, Any]:
+    latencies: List[float] = []
+    errors = 0
+    queue: asyncio.Queue = asyncio.Queue()
+    for request in requests:
+        queue.put_nowait(request)
+
+    async def worker():
+        nonlocal errors
+        while not queue.empty():
+            method, path, params, body = queue.get_nowait()
+            started = time.perf_counter()
+            response = await client.request(method, path, params=params, json=body)
+            latencies.append((time.perf_counter() - started) * 1000)
+            if response.status_code >= 400:
+                errors += 1
+
+    db_before, queries_before, serialization_before = counters.snapshot()
+    hits_before, lookups_before = cache_lookups()
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(min(concurrency, len(requests)))))
+    elapsed = time.perf_counter() - started
+    db_after, queries_after, serialization_after = counters.snapshot()
+    hits_after, lookups_after = cache_lookups()
+
+    count = len(latencies)
+    latencies.sort()
+    lookups = lookups_after - lookups_before
+    return {
+        "requests": count,
+        "errors": errors,
+        "throughput_rps": count / elapsed if elapsed else None,
+        "latency_ms": {
+            "p50": percentile(latencies, 0.50),
+            "p95": percentile(latencies, 0.95),
+            "p99": percentile(latencies, 0.99),
+            "mean": sum(latencies) / count,
+            "max": latencies[-1]
+        },
+        "db_ms_per_request": (db_after - db_before) * 1000 / count,
+        "db_queries_per_request": (queries_after - queries_before) / count,
+        "serialization_ms_per_request": (serialization_after - serialization_before) * 1000 / count,
+        "cache_hit_ratio": (hits_after - hits_before) / lookups if lookups else None
+    }
+
+async def describe_dataset() -> Dict[str, Any]:
+    async with SessionLocal() as db:
+        result = (await db.execute(text("""
+            SELECT
+                (SELECT COUNT(*) FROM sales) as sales,
+                (SELECT COUNT(*) FROM stores) as stores,
+                (SELECT COUNT(*) FROM customers) as customers,
+                (SELECT MIN(sale_date) FROM sales_daily_rollup) as first_day,
+                (SELECT MAX(sale_date) FROM sales_daily_rollup) as last_day
+        """))).fetchone()
+    return result._asdict()
+
+async def refresh_aggregates():
+    async with SessionLocal() as db:
+        aggregate_service = AggregateService(db)
+        await aggregate_service.backfill()
+        await aggregate_service.refresh()
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def print_results(results: List[Dict[str, Any]], baseline: Dict[Tuple[str, str], Dict[str, Any]]):
+    header = f"{'endpoint':44} {'phase':5} {'req':>5} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'db ms':>7} {'ser ms':>7} {'hit':>5}"
+    print(header + ("  p95 vs baseline" if baseline else ""))
+    for result in results:
+        latency = result["latency_ms"]
+        hit_ratio = result["cache_hit_ratio"]
+        line = (
+            f"{result['endpoint']:44} {result['phase']:5} {result['requests']:>5} {result['throughput_rps']:>8.1f} "
+            f"{latency['p50']:>8.1f} {latency['p95']:>8.1f} {latency['p99']:>8.1f} "
+            f"{result['db_ms_per_request']:>7.1f} {result['serialization_ms_per_request']:>7.2f} "
+            f"{'-' if hit_ratio is None else f'{hit_ratio:.0%}':>5}"
+        )
+        previous = baseline.get((result["endpoint"], result["phase"]))
+        if previous and previous["latency_ms"]["p95"]:
+            line += f"  {(latency['p95'] / previous['latency_ms']['p95'] - 1) * 100:+.0f}%"
+        print(line)
+
+async def main(args: argparse.Namespace):
+    if args.fake_redis:
+        from fakeredis import aioredis
+        cache.redis_client = aioredis.FakeRedis()
+    instrument()
+    try:
+        if not args.skip_refresh:
+            await refresh_aggregates()
+        dataset = await describe_dataset()
+        if dataset["first_day"] is None:
+            raise SystemExit("No sales in the database; seed it with generate_data.py first.")
+
+        rng = random.Random(args.seed)
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://benchmark", timeout=None) as client:
+            options = (await client.get("/filters/options")).json()
+            goal_value = (await client.get("/goal/average-ticket-goal")).json()["goal_value"]
+            scenarios = build_scenarios(
+                dataset["first_day"], dataset["last_day"],
+                [store["id"] for store in options["stores"]],
+                [channel["id"] for channel in options["channels"]],
+                goal_value, rng
+            )
+            selected = [name for name in scenarios if not args.endpoint or any(part in name for part in args.endpoint)]
+
+            results = []
+            for name in selected:
+                requests = scenarios[name]
+                # Cold: empty caches, each distinct request once. Warm: the same mix, repeated.
+                await clear_caches()
+                phases: List[Tuple[str, List[Request]]] = [("cold", requests)]
+                phases.append(("warm", [rng.choice(requests) for _ in range(args.requests)]))
+                for phase, phase_requests in phases:
+                    results.append({"endpoint": name, "phase": phase, **await run_phase(client, phase_requests, args.concurrency)})
+
+        baseline = {}
+        if args.compare:
+            with open(args.compare) as baseline_file:
+                baseline = {(r["endpoint"], r["phase"]): r for r in json.load(baseline_file)["results"]}
+        print_results(results, baseline)
+
+        report = {
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "dataset": {key: str(value) if isinstance(value, date) else value for key, value in dataset.items()},
+            "settings": {
+                "concurrency": args.concurrency,
+                "warm_requests": args.requests,
+                "seed": args.seed,
+                "redis": "fakeredis" if args.fake_redis else "redis"
+            },
+            "results": results
+        }
+        with open(args.output, "w") as output_file:
+            json.dump(report, output_file, indent=2)
+        print(f"Results written to {args.output}")
+    finally:
+        await engine.dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the analytics API in-process against the configured Postgres and Redis")
+    parser.add_argument("--concurrency", type=int, default=8, help="Requests in flight at once")
+    parser.add_argument("--requests", type=int, default=200, help="Warm-cache requests per endpoint")
+    parser.add_argument("--seed", type=int, default=1, help="Seed for the filter mix")
+    parser.add_argument("--endpoint", action="append", help="Only endpoints whose name contains this text (repeatable)")
+    parser.add_argument("--fake-redis", action="store_true", help="Use an in-process fakeredis instead of REDIS_URL")
+    parser.add_argument("--skip-refresh", action="store_true", help="Do not bring the aggregates up to date first")
+    parser.add_argument("--compare", help="Earlier results file to show p95 changes against")
+    parser.add_argument("--output", default=f"benchmark-{date.today()}.json", help="Where to write the JSON results")
+    args = parser.parse_args()
+    asyncio.run(main(args))
@@ -1,20 +1,349 @@
+import asyncio
 import redis
+import redis.asyncio
 import json
-from typing import Optional, Any
-from config import REDIS_URL
+import logging
+import orjson
+import zstandard
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import date
+from typing import Optional, Any, Tuple, Dict, List
+from config import (
+    REDIS_URL,
+    L1_CACHE_MAX_ENTRIES,
+    L1_CACHE_MAX_BYTES,
+    L1_CACHE_TTL_SECONDS,
+    CACHE_COMPRESSION_THRESHOLD_BYTES
+)
+from instrumentation import track_cache_time
+from data_versions import day_versions
 
-redis_client = redis.from_url(REDIS_URL)
+logger = logging.getLogger(__name__)
+
+# Asynchronous, so a Redis round trip never blocks the event loop
+redis_client = redis.asyncio.from_url(REDIS_URL)
 
 # Cache TTL in seconds (e.g., 15 minutes)
 CACHE_TTL = 900
 
-def get_from_cache(key: str) -> Optional[Any]:
-    """Retrieve an item from the cache."""
-    cached_value = redis_client.get(key)
+# Keys carry a data version, so results for ranges that end before today only
+# go stale through a version bump and can be kept for much longer (7 days).
+HISTORICAL_CACHE_TTL = 7 * 24 * 3600
+
+# Pub/sub channel used by workers to drop each other's L1 entries
+INVALIDATION_CHANNEL = "cache:invalidate"
+WORKER_ID = uuid.uuid4().hex
+
+# Encoded payloads start with FORMAT_MARKER followed by a codec id byte.
+# Values written before the codec existed are plain JSON and never start with
+# a NUL byte, so they are still decoded by the legacy path.
+FORMAT_MARKER = b"\x00"
+
+class Codec:
+    def __init__(self, codec_id: int, name: str):
+        self.codec_id = codec_id
+        self.name = name
+
+    def encode(self, raw: bytes) -> bytes:
+        return raw
+
+    def decode(self, payload: bytes) -> bytes:
+        return payload
+
+class ZstdCodec(Codec):
+    def __init__(self, codec_id: int, name: str, level: int = 3):
+        super().__init__(codec_id, name)
+        self.level = level
+
+    def encode(self, raw: bytes) -> bytes:
+        return zstandard.ZstdCompressor(level=self.level).compress(raw)
+
+    def decode(self, payload: bytes) -> bytes:
+        return zstandard.ZstdDecompressor().decompress(payload)
+
+CODECS: Dict[int, Codec] = {}
+
+def register_codec(codec: Codec):
+    CODECS[codec.codec_id] = codec
+
+PLAIN_CODEC = Codec(1, "orjson")
+COMPRESSED_CODEC = ZstdCodec(2, "orjson+zstd")
+register_codec(PLAIN_CODEC)
+register_codec(COMPRESSED_CODEC)
+
+def encode_value(value: Any) -> Tuple[bytes, int]:
+    """Serialize a value for Redis; returns the payload and its uncompressed size."""
+    raw = orjson.dumps(value)
+    codec = COMPRESSED_CODEC if len(raw) >= CACHE_COMPRESSION_THRESHOLD_BYTES else PLAIN_CODEC
+    return FORMAT_MARKER + bytes([codec.codec_id]) + codec.encode(raw), len(raw)
+
+def decode_value(payload: bytes) -> Tuple[Any, int]:
+    """Deserialize a Redis payload; returns the value and its uncompressed size."""
+    if not payload.startswith(FORMAT_MARKER):
+        return json.loads(payload), len(payload)
+    raw = CODECS[payload[1]].decode(payload[2:])
+    return orjson.loads(raw), len(raw)
+
+class PayloadStats:
+    def __init__(self):
+        self.writes = 0
+        self.raw_bytes = 0
+        self.stored_bytes = 0
+
+payload_stats: Dict[str, PayloadStats] = {}
+
+def _record_payload(key: str, raw_size: int, stored_size: int):
+    prefix = key.split(":", 1)[0]
+    stats = payload_stats.get(prefix)
+    if stats is None:
+        stats = payload_stats[prefix] = PayloadStats()
+    stats.writes += 1
+    stats.raw_bytes += raw_size
+    stats.stored_bytes += stored_size
+
+class LocalCache:
+    """Bounded in-process LRU cache whose entries also expire after a TTL."""
+
+    def __init__(self, max_entries: int, max_bytes: int, ttl: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return False, None
+            expires_at, size, value = entry
+            if expires_at < time.monotonic():
+                self._remove(key)
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, value
+
+    def set(self, key: str, value: Any, size: int):
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl, size, value)
+            self.total_bytes += size
+            while len(self._entries) > self.max_entries or self.total_bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def delete(self, key: str):
+        with self._lock:
+            self._remove(key)
+
+    def delete_prefix(self, prefix: str):
+        with self._lock:
+            for key in [k for k in self._entries if k.startswith(prefix)]:
+                self._remove(key)
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.total_bytes -= entry[1]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+local_cache = LocalCache(L1_CACHE_MAX_ENTRIES, L1_CACHE_MAX_BYTES, L1_CACHE_TTL_SECONDS)
+
+class RedisStats:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+redis_stats = RedisStats()
+
+class PrefixStats:
+    def __init__(self):
+        self.l1_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+        self.errors = 0
+
+# Keyed by the cache key prefix ("sales_overview", "top_products", "churn_risk", ...)
+prefix_stats: Dict[str, PrefixStats] = {}
+
+def _prefix_stats(key: str) -> PrefixStats:
+    prefix = key.split(":", 1)[0]
+    stats = prefix_stats.get(prefix)
+    if stats is None:
+        stats = prefix_stats[prefix] = PrefixStats()
+    return stats
+
+@track_cache_time
+async def get_from_cache(key: str) -> Optional[Any]:
+    """Retrieve an item from the cache, trying the in-process tier first."""
+    stats = _prefix_stats(key)
+    found, value = local_cache.get(key)
+    if found:
+        stats.l1_hits += 1
+        return value
+    try:
+        cached_value = await redis_client.get(key)
+    except redis.RedisError:
+        stats.errors += 1
+        raise
     if cached_value:
-        return json.loads(cached_value)
+        redis_stats.hits += 1
+        stats.redis_hits += 1
+        value, raw_size = decode_value(cached_value)
+        local_cache.set(key, value, raw_size)
+        return value
+    redis_stats.misses += 1
+    stats.misses += 1
     return None
 
-def set_in_cache(key: str, value: Any):
+@track_cache_time
+async def get_many_from_cache(keys: List[str]) -> Dict[str, Any]:
+    """Retrieve several items at once; L1 misses are fetched with a single MGET."""
+    found_values = {}
+    remote_keys = []
+    for key in keys:
+        found, value = local_cache.get(key)
+        if found:
+            _prefix_stats(key).l1_hits += 1
+            found_values[key] = value
+        else:
+            remote_keys.append(key)
+    if remote_keys:
+        try:
+            cached_values = await redis_client.mget(remote_keys)
+        except redis.RedisError:
+            for key in remote_keys:
+                _prefix_stats(key).errors += 1
+            raise
+        for key, cached_value in zip(remote_keys, cached_values):
+            if cached_value:
+                redis_stats.hits += 1
+                _prefix_stats(key).redis_hits += 1
+                value, raw_size = decode_value(cached_value)
+                local_cache.set(key, value, raw_size)
+                found_values[key] = value
+            else:
+                redis_stats.misses += 1
+                _prefix_stats(key).misses += 1
+    return found_values
+
+def range_cache_ttl(end_date: date) -> int:
+    """TTL for a result covering a date range ending at end_date."""
+    return HISTORICAL_CACHE_TTL if end_date < date.today() else CACHE_TTL
+
+@track_cache_time
+async def set_in_cache(key: str, value: Any, ttl: int = CACHE_TTL):
     """Set an item in the cache with a TTL."""
-    redis_client.setex(key, CACHE_TTL, json.dumps(value))
+    payload, raw_size = encode_value(value)
+    # No invalidation is published: keys are versioned, so another worker's L1 copy
+    # of the same key already holds this value.
+    try:
+        await redis_client.setex(key, ttl, payload)
+    except redis.RedisError:
+        _prefix_stats(key).errors += 1
+        raise
+    _record_payload(key, raw_size, len(payload))
+    local_cache.set(key, value, raw_size)
+
+@track_cache_time
+async def invalidate_cache(*keys: str):
+    """Remove keys from Redis and from the L1 tier of every worker."""
+    for key in keys:
+        local_cache.delete(key)
+    pipeline = redis_client.pipeline(transaction=False)
+    pipeline.delete(*keys)
+    pipeline.publish(INVALIDATION_CHANNEL, json.dumps({"origin": WORKER_ID, "keys": list(keys)}))
+    await pipeline.execute()
+
+@track_cache_time
+async def invalidate_cache_prefix(prefix: str):
+    """Remove every key starting with prefix from Redis and every worker's L1 tier."""
+    local_cache.delete_prefix(prefix)
+    keys = [key async for key in redis_client.scan_iter(match=f"{prefix}*", count=1000)]
+    pipeline = redis_client.pipeline(transaction=False)
+    if keys:
+        pipeline.delete(*keys)
+    pipeline.publish(INVALIDATION_CHANNEL, json.dumps({"origin": WORKER_ID, "prefix": prefix}))
+    await pipeline.execute()
+
+def _handle_invalidation(message: dict):
+    try:
+        payload = json.loads(message["data"])
+    except (TypeError, ValueError):
+        return
+    if payload.get("origin") == WORKER_ID:
+        return
+    for key in payload.get("keys", []):
+        local_cache.delete(key)
+    if payload.get("prefix"):
+        local_cache.delete_prefix(payload["prefix"])
+    if payload.get("day_versions"):
+        day_versions.apply({date.fromisoformat(day): version for day, version in payload["day_versions"].items()})
+
+async def publish_day_versions(versions: Dict[date, int]):
+    """Share bumped day versions so other workers build new cache keys without a query."""
+    day_versions.apply(versions)
+    try:
+        await redis_client.publish(INVALIDATION_CHANNEL, json.dumps({
+            "origin": WORKER_ID,
+            "day_versions": {str(day): version for day, version in versions.items()}
+        }))
+    except redis.RedisError:
+        logger.exception("Could not publish day versions; other workers pick them up on their next refresh")
+
+async def _on_listener_error(error: BaseException, pubsub):
+    # The next read reconnects and subscribes again.
+    logger.warning("Cache invalidation listener lost Redis (%s); retrying", error)
+    await asyncio.sleep(1)
+
+async def start_invalidation_listener() -> Optional[asyncio.Task]:
+    """Subscribe to invalidations from other workers in a background task."""
+    try:
+        pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+        await pubsub.subscribe(**{INVALIDATION_CHANNEL: _handle_invalidation})
+    except redis.RedisError:
+        logger.exception("Could not subscribe to cache invalidations; L1 entries will only expire by TTL")
+        return None
+    return asyncio.create_task(pubsub.run(exception_handler=_on_listener_error))
+
+def get_cache_stats() -> dict:
+    return {
+        "l1_entries": len(local_cache),
+        "l1_bytes": local_cache.total_bytes,
+        "l1_hits": local_cache.hits,
+        "l1_misses": local_cache.misses,
+        "l1_evictions": local_cache.evictions,
+        "redis_hits": redis_stats.hits,
+        "redis_misses": redis_stats.misses,
+        "prefixes": {
+            prefix: {
+                "l1_hits": stats.l1_hits,
+                "redis_hits": stats.redis_hits,
+                "misses": stats.misses,
+                "errors": stats.errors
+            }
+            for prefix, stats in prefix_stats.items()
+        },
+        "payloads": {
+            prefix: {
+                "writes": stats.writes,
+                "raw_bytes": stats.raw_bytes,
+                "stored_bytes": stats.stored_bytes
+            }
+            for prefix, stats in payload_stats.items()
+        }
+    }
@@ -0,0 +1,167 @@
+import asyncio
+import json
+import os
+import threading
+from contextlib import contextmanager
+from datetime import date
+from typing import Any, Dict, Iterator, List, Optional
+from dateutil.relativedelta import relativedelta
+import duckdb
+import pyarrow as pa
+import pyarrow.parquet as pq
+from config import COLUMNAR_DATA_DIR, COLUMNAR_THREADS
+
+MONEY = pa.decimal128(12, 2)
+
+# Denormalised so the engine answers from one file set without joins.
+FACT_SCHEMAS = {
+    "sales": pa.schema([
+        ("sale_id", pa.int32()),
+        ("created_at", pa.timestamp("us")),
+        ("sale_date", pa.date32()),
+        ("iso_dow", pa.int16()),
+        ("hour", pa.int16()),
+        ("store_id", pa.int32()),
+        ("store_name", pa.string()),
+        ("channel_id", pa.int32()),
+        ("sub_brand_id", pa.int32()),
+        ("customer_id", pa.int32()),
+        ("sale_status_desc", pa.string()),
+        ("total_amount", MONEY),
+        ("total_discount", MONEY),
+        ("delivery_fee", MONEY),
+        ("service_tax_fee", MONEY),
+        ("production_seconds", pa.int32()),
+        ("delivery_seconds", pa.int32()),
+        ("delivery_address_id", pa.int32()),
+        ("neighborhood", pa.string()),
+        ("city", pa.string()),
+    ]),
+    "product_sales": pa.schema([
+        ("sale_id", pa.int32()),
+        ("product_id", pa.int32()),
+        ("sale_date", pa.date32()),
+        ("iso_dow", pa.int16()),
+        ("hour", pa.int16()),
+        ("store_id", pa.int32()),
+        ("channel_id", pa.int32()),
+        ("sale_status_desc", pa.string()),
+        ("quantity", pa.int32()),
+        ("total_price", MONEY),
+    ]),
+}
+
+# Facts snapshotted for each closed month. Product lines are answered by
+# product_sales_cube at every range, so only the sales rows are needed.
+SNAPSHOT_FACTS = ["sales"]
+
+def month_key(month: date) -> str:
+    return month.strftime("%Y-%m")
+
+def month_starts(start_date: date, end_date: date) -> List[date]:
+    months = []
+    month = start_date.replace(day=1)
+    while month <= end_date:
+        months.append(month)
+        month += relativedelta(months=1)
+    return months
+
+class ColumnarStore:
+    """Month-partitioned Parquet snapshots of the sales facts, queried with DuckDB.
+
+    A month is only used while the data version it was exported at is still the
+    latest one for that month, so a late edit sends the month back to Postgres
+    until it is re-exported.
+    """
+
+    def __init__(self, data_dir: str, threads: int):
+        self.data_dir = data_dir
+        self.threads = threads
+        self._lock = threading.Lock()
+        self._manifest: Dict[str, int] = {}
+        self._manifest_mtime: Optional[float] = None
+        self._connection = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.data_dir)
+
+    @property
+    def manifest_path(self) -> str:
+        return os.path.join(self.data_dir, "manifest.json")
+
+    def month_path(self, fact: str, month: date) -> str:
+        return os.path.join(self.data_dir, fact, f"month={month_key(month)}", "data.parquet")
+
+    def get_manifest(self) -> Dict[str, int]:
+        # Other workers export too; reload whenever the file changes.
+        try:
+            mtime = os.path.getmtime(self.manifest_path)
+        except FileNotFoundError:
+            return {}
+        with self._lock:
+            if mtime != self._manifest_mtime:
+                with open(self.manifest_path) as manifest_file:
+                    self._manifest = json.load(manifest_file)
+                self._manifest_mtime = mtime
+            return dict(self._manifest)
+
+    def record_export(self, month: date, version: int):
+        manifest = self.get_manifest()
+        manifest[month_key(month)] = version
+        temporary_path = f"{self.manifest_path}.{os.getpid()}.tmp"
+        with open(temporary_path, "w") as manifest_file:
+            json.dump(manifest, manifest_file, indent=2, sort_keys=True)
+        os.replace(temporary_path, self.manifest_path)
+
+    def is_fresh(self, month: date, version: int) -> bool:
+        # Version 0 means the month has no sales at all, so there is nothing to export.
+        return version == 0 or self.get_manifest().get(month_key(month)) == version
+
+    @contextmanager
+    def month_writer(self, fact: str, month: date) -> Iterator[pq.ParquetWriter]:
+        # Written beside the live file and swapped in, so readers never see half a month.
+        path = self.month_path(fact, month)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary_path = f"{path}.{os.getpid()}.tmp"
+        writer = pq.ParquetWriter(temporary_path, FACT_SCHEMAS[fact], compression="zstd")
+        try:
+            yield writer
+            writer.close()
+            os.replace(temporary_path, path)
+        except BaseException:
+            writer.close()
+            os.remove(temporary_path)
+            raise
+
+    def write_batch(self, writer: pq.ParquetWriter, fact: str, rows: List[Dict[str, Any]]):
+        writer.write_batch(pa.RecordBatch.from_pylist(rows, schema=FACT_SCHEMAS[fact]))
+
+    def month_sources(self, fact: str, months: List[date]) -> Optional[str]:
+        # read_parquet() over just the months asked for; None when none were exported.
+        paths = [self.month_path(fact, month) for month in months if os.path.exists(self.month_path(fact, month))]
+        if not paths:
+            return None
+        quoted = ", ".join("'" + path.replace("'", "''") + "'" for path in paths)
+        return f"read_parquet([{quoted}])"
+
+    def _get_connection(self):
+        with self._lock:
+            if self._connection is None:
+                self._connection = duckdb.connect(config={"threads": self.threads})
+            return self._connection
+
+    def _query(self, sql: str, params: List[Any]) -> List[Dict[str, Any]]:
+        # One cursor per call: cursors are DuckDB's per-thread connections.
+        cursor = self._get_connection().cursor()
+        try:
+            cursor.execute(sql, params)
+            columns = [column[0] for column in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+        finally:
+            cursor.close()
+
+    async def query(self, sql: str, params: List[Any]) -> List[Dict[str, Any]]:
+        return await asyncio.to_thread(self._query, sql, params)
+
+columnar_store = ColumnarStore(COLUMNAR_DATA_DIR, COLUMNAR_THREADS)
@@ -0,0 +1,48 @@
+import bisect
+import threading
+from datetime import date
+from typing import Dict
+from repositories.data_version_repository import DataVersionRepository
+
+class DayVersions:
+    """In-process copy of sales_day_versions, so cache keys are built without a query.
+
+    Kept current by the worker that refreshes the aggregates (published over the cache
+    invalidation channel) and re-synced by every worker's refresher loop as a fallback.
+    Versions only move forward, so late or repeated updates are harmless.
+    """
+
+    def __init__(self):
+        self.loaded = False
+        self.latest = 0
+        # Sorted days and their versions, swapped as a pair so readers need no lock.
+        self._snapshot = ([], [])
+        self._lock = threading.Lock()
+
+    def apply(self, versions: Dict[date, int]):
+        with self._lock:
+            days, day_versions = self._snapshot
+            merged = dict(zip(days, day_versions))
+            for sale_date, version in versions.items():
+                merged[sale_date] = max(version, merged.get(sale_date, 0))
+            days = sorted(merged)
+            self._snapshot = (days, [merged[sale_date] for sale_date in days])
+            self.latest = max(merged.values(), default=0)
+            self.loaded = True
+
+    def range_version(self, start_date: date, end_date: date) -> int:
+        days, day_versions = self._snapshot
+        return max(day_versions[bisect.bisect_left(days, start_date):bisect.bisect_right(days, end_date)], default=0)
+
+day_versions = DayVersions()
+
+async def sync_day_versions(data_version_repository: DataVersionRepository) -> Dict[date, int]:
+    """Pull the days bumped since the newest version held here; returns them."""
+    changed = await data_version_repository.get_day_versions(after_version=day_versions.latest)
+    day_versions.apply(changed)
+    return changed
+
+async def ensure_day_versions(data_version_repository: DataVersionRepository):
+    # Only the first key built by a worker pays for the query.
+    if not day_versions.loaded:
+        await sync_day_versions(data_version_repository)
@@ -1,14 +1,91 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, Session
-from typing import Generator
-from config import DATABASE_URL
+import bisect
+import time
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from typing import AsyncGenerator
+from instrumentation import instrument_engine
+from config import (
+    ASYNC_DATABASE_URL,
+    DB_POOL_SIZE,
+    DB_MAX_OVERFLOW,
+    DB_POOL_TIMEOUT_SECONDS,
+    DB_POOL_RECYCLE_SECONDS,
+    DB_POOL_PRE_PING,
+    DB_STATEMENT_TIMEOUT_MS
+)
 
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Upper bounds (ms) of the checkout wait histogram; the last bucket is unbounded.
+POOL_WAIT_BUCKETS_MS = [1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000]
 
-def get_db() -> Generator[Session, None, None]:
-    db = SessionLocal()
-    try:
+class PoolStats:
+    def __init__(self):
+        self.checkouts = 0
+        self.overflow_events = 0
+        self.timeouts = 0
+        self.wait_total_ms = 0.0
+        self.wait_max_ms = 0.0
+        self.wait_buckets = [0] * (len(POOL_WAIT_BUCKETS_MS) + 1)
+
+    def record_checkout(self, wait_ms: float, overflowed: bool):
+        self.checkouts += 1
+        self.wait_total_ms += wait_ms
+        self.wait_max_ms = max(self.wait_max_ms, wait_ms)
+        self.wait_buckets[bisect.bisect_left(POOL_WAIT_BUCKETS_MS, wait_ms)] += 1
+        if overflowed:
+            self.overflow_events += 1
+
+pool_stats = PoolStats()
+
+class InstrumentedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long each checkout waited for a connection."""
+
+    def _do_get(self):
+        beyond_pool_size = self.checkedout() >= self.size()
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            pool_stats.timeouts += 1
+            raise
+        pool_stats.record_checkout(
+            (time.perf_counter() - started) * 1000,
+            overflowed=beyond_pool_size
+        )
+        return connection
+
+engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    poolclass=InstrumentedAsyncQueuePool,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT_SECONDS,
+    pool_recycle=DB_POOL_RECYCLE_SECONDS,
+    pool_pre_ping=DB_POOL_PRE_PING,
+    connect_args={"server_settings": {"statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)}}
+)
+instrument_engine(engine)
+SessionLocal = async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+
+async def get_db() -> AsyncGenerator[AsyncSession, None]:
+    async with SessionLocal() as db:
         yield db
-    finally:
-        db.close()
+
+def get_pool_status() -> dict:
+    pool = engine.pool
+    return {
+        "pool_size": pool.size(),
+        "max_overflow": DB_MAX_OVERFLOW,
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "checkouts": pool_stats.checkouts,
+        "overflow_events": pool_stats.overflow_events,
+        "timeouts": pool_stats.timeouts,
+        "average_wait_ms": pool_stats.wait_total_ms / pool_stats.checkouts if pool_stats.checkouts else 0.0,
+        "max_wait_ms": pool_stats.wait_max_ms,
+        "wait_histogram": [
+            {"le_ms": bound, "count": count}
+            for bound, count in zip(POOL_WAIT_BUCKETS_MS + [None], pool_stats.wait_buckets)
+        ]
+    }
@@ -0,0 +1,34 @@
+import json
+import logging
+from datetime import date
+from typing import Callable, List
+import redis
+import cache
+
+logger = logging.getLogger(__name__)
+
+# Published after sales are written, for consumers outside this process
+SALES_CHANGED_CHANNEL = "events:sales_changed"
+
+sales_changed_handlers: List[Callable[[dict], None]] = []
+
+def on_sales_changed(handler: Callable[[dict], None]) -> Callable[[dict], None]:
+    """Register an in-process handler; it runs synchronously, so it should only schedule work."""
+    sales_changed_handlers.append(handler)
+    return handler
+
+async def emit_sales_changed(sale_dates: List[date], store_ids: List[int], sales_count: int):
+    event = {
+        "sale_dates": [str(sale_date) for sale_date in sale_dates],
+        "store_ids": store_ids,
+        "sales_count": sales_count
+    }
+    for handler in sales_changed_handlers:
+        try:
+            handler(event)
+        except Exception:
+            logger.exception("Sales changed handler %s failed", handler.__name__)
+    try:
+        await cache.redis_client.publish(SALES_CHANGED_CHANNEL, json.dumps(event))
+    except redis.RedisError:
+        logger.exception("Could not publish the sales changed event")
@@ -0,0 +1,18 @@
+import argparse
+import asyncio
+from database import SessionLocal, engine
+from services.columnar_service import ColumnarService
+
+async def main(force: bool):
+    try:
+        async with SessionLocal() as db:
+            exported = await ColumnarService(db).export_closed_months(force)
+            print(f"Exported: {', '.join(f'{month:%Y-%m}' for month in exported)}" if exported else "Snapshots are up to date.")
+    finally:
+        await engine.dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export closed months of sales to Parquet for the columnar engine")
+    parser.add_argument("--force", action="store_true", help="Re-export every month even if its snapshot is current")
+    args = parser.parse_args()
+    asyncio.run(main(args.force))
@@ -0,0 +1,268 @@
+import asyncio
+import functools
+import inspect
+import logging
+import random
+import time
+from collections import deque
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional, Tuple
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from config import SLOW_QUERY_THRESHOLD_MS, SLOW_QUERY_EXPLAIN_SAMPLE_RATE, SLOW_QUERY_LOG_SIZE
+from metrics import Histogram
+
+logger = logging.getLogger(__name__)
+
+# Repository method currently running, e.g. "SalesRepository.get_top_products"
+query_source: ContextVar[Optional[str]] = ContextVar("query_source", default=None)
+
+class RequestTiming:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.db_ms = 0.0
+        self.cache_ms = 0.0
+        self.serialization_ms = 0.0
+        self.endpoint_finished: Optional[float] = None
+
+    def server_timing(self) -> str:
+        total_ms = (time.perf_counter() - self.started) * 1000
+        return (
+            f"db;dur={self.db_ms:.1f}, cache;dur={self.cache_ms:.1f}, "
+            f"serialize;dur={self.serialization_ms:.1f}, total;dur={total_ms:.1f}"
+        )
+
+request_timing: ContextVar[Optional[RequestTiming]] = ContextVar("request_timing", default=None)
+
+class QueryStats:
+    def __init__(self):
+        self.calls = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.rows = 0
+        self.duration = Histogram()
+
+    def record(self, duration_ms: float, rows: int):
+        self.calls += 1
+        self.total_ms += duration_ms
+        self.max_ms = max(self.max_ms, duration_ms)
+        self.rows += max(rows, 0)
+        self.duration.observe(duration_ms / 1000)
+
+class RouteMetrics:
+    def __init__(self):
+        self.in_flight = 0
+        self.duration = Histogram()
+
+query_stats: Dict[str, QueryStats] = {}
+# Keyed by (method, path template), filled in as routes are registered
+route_metrics: Dict[Tuple[str, str], RouteMetrics] = {}
+slow_queries: deque = deque(maxlen=SLOW_QUERY_LOG_SIZE)
+# Plan captures re-run the statement, so only one is in flight at a time.
+explain_tasks: set = set()
+
+def _with_source(source: str, method: Callable) -> Callable:
+    if inspect.isasyncgenfunction(method):
+        @functools.wraps(method)
+        async def generator_wrapper(*args, **kwargs):
+            # Only around each step: the consumer runs in between and may query too.
+            generator = method(*args, **kwargs)
+            while True:
+                previous = query_source.get()
+                query_source.set(source)
+                try:
+                    item = await generator.__anext__()
+                except StopAsyncIteration:
+                    return
+                finally:
+                    query_source.set(previous)
+                yield item
+        return generator_wrapper
+
+    @functools.wraps(method)
+    async def wrapper(*args, **kwargs):
+        token = query_source.set(source)
+        try:
+            return await method(*args, **kwargs)
+        finally:
+            query_source.reset(token)
+    return wrapper
+
+def track_queries(cls):
+    """Class decorator attributing the statements of every async method to "Class.method"."""
+    for name, method in list(vars(cls).items()):
+        if inspect.iscoroutinefunction(method) or inspect.isasyncgenfunction(method):
+            setattr(cls, name, _with_source(f"{cls.__name__}.{name}", method))
+    return cls
+
+def track_cache_time(function: Callable) -> Callable:
+    if inspect.iscoroutinefunction(function):
+        @functools.wraps(function)
+        async def async_wrapper(*args, **kwargs):
+            timing = request_timing.get()
+            if timing is None:
+                return await function(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                return await function(*args, **kwargs)
+            finally:
+                timing.cache_ms += (time.perf_counter() - started) * 1000
+        return async_wrapper
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        timing = request_timing.get()
+        if timing is None:
+            return function(*args, **kwargs)
+        started = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            timing.cache_ms += (time.perf_counter() - started) * 1000
+    return wrapper
+
+def _is_read_only(statement: str) -> bool:
+    return statement.lstrip().upper().startswith(("SELECT", "WITH"))
+
+async def _capture_plan(engine: AsyncEngine, entry: Dict[str, Any], statement: str, parameters: tuple):
+    try:
+        async with engine.connect() as conn:
+            driver_connection = (await conn.get_raw_connection()).driver_connection
+            # Read-only and rolled back: EXPLAIN ANALYZE executes the statement again.
+            transaction = driver_connection.transaction(readonly=True)
+            await transaction.start()
+            try:
+                rows = await driver_connection.fetch(f"EXPLAIN (ANALYZE, BUFFERS) {statement}", *parameters)
+            finally:
+                await transaction.rollback()
+        entry["plan"] = "\n".join(row[0] for row in rows)
+        entry["plan_status"] = "captured"
+    except Exception as exc:
+        entry["plan_status"] = "failed"
+        entry["plan"] = str(exc)
+
+def _record_slow_query(engine: AsyncEngine, source: str, statement: str, parameters: Any, duration_ms: float, rows: int):
+    entry = {
+        "recorded_at": datetime.now(),
+        "source": source,
+        "duration_ms": duration_ms,
+        "rows": rows,
+        "statement": statement,
+        # Only the types: values can be customer data and the log is served over HTTP.
+        "parameter_types": [type(parameter).__name__ for parameter in parameters] if isinstance(parameters, (list, tuple)) else [],
+        "plan_status": "not_sampled",
+        "plan": None
+    }
+    slow_queries.append(entry)
+    logger.warning("Slow query from %s took %.1f ms", source, duration_ms)
+    if explain_tasks or not _is_read_only(statement) or random.random() >= SLOW_QUERY_EXPLAIN_SAMPLE_RATE:
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    entry["plan_status"] = "pending"
+    task = loop.create_task(_capture_plan(engine, entry, statement, tuple(parameters)))
+    explain_tasks.add(task)
+    task.add_done_callback(explain_tasks.discard)
+
+def record_statement(duration_ms: float, rows: int) -> str:
+    """Accounts a statement to the running repository method and request; returns the method."""
+    source = query_source.get() or "other"
+    stats = query_stats.get(source)
+    if stats is None:
+        stats = query_stats[source] = QueryStats()
+    stats.record(duration_ms, rows)
+    timing = request_timing.get()
+    if timing is not None:
+        timing.db_ms += duration_ms
+    return source
+
+def instrument_engine(engine: AsyncEngine):
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        duration_ms = (time.perf_counter() - conn.info["query_started"].pop()) * 1000
+        rows = cursor.rowcount
+        source = record_statement(duration_ms, rows)
+        if duration_ms >= SLOW_QUERY_THRESHOLD_MS and not executemany:
+            _record_slow_query(engine, source, statement, parameters, duration_ms, rows)
+
+class InstrumentedRoute(APIRoute):
+    """Route that records its latency and in-flight requests, and times what follows the
+    endpoint: response model validation and rendering."""
+
+    def get_route_handler(self) -> Callable:
+        metrics = route_metrics.setdefault((",".join(sorted(self.methods)), self.path_format), RouteMetrics())
+        endpoint = self.dependant.call
+        if inspect.iscoroutinefunction(endpoint):
+            @functools.wraps(endpoint)
+            async def timed_endpoint(*args, **kwargs):
+                try:
+                    return await endpoint(*args, **kwargs)
+                finally:
+                    timing = request_timing.get()
+                    if timing is not None:
+                        timing.endpoint_finished = time.perf_counter()
+            self.dependant.call = timed_endpoint
+        handler = super().get_route_handler()
+
+        async def timed_handler(request):
+            metrics.in_flight += 1
+            started = time.perf_counter()
+            try:
+                response = await handler(request)
+            finally:
+                metrics.in_flight -= 1
+                metrics.duration.observe(time.perf_counter() - started)
+            timing = request_timing.get()
+            if timing is not None and timing.endpoint_finished is not None:
+                timing.serialization_ms += (time.perf_counter() - timing.endpoint_finished) * 1000
+            return response
+        return timed_handler
+
+class ServerTimingMiddleware:
+    """Adds a Server-Timing header splitting the request into DB, cache and serialization time."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        timing = RequestTiming()
+        token = request_timing.set(timing)
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", []), (b"server-timing", timing.server_timing().encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            request_timing.reset(token)
+
+def get_slow_query_log() -> dict:
+    return {
+        "threshold_ms": SLOW_QUERY_THRESHOLD_MS,
+        "explain_sample_rate": SLOW_QUERY_EXPLAIN_SAMPLE_RATE,
+        "queries": list(reversed(slow_queries)),
+        "sources": [
+            {
+                "source": source,
+                "calls": stats.calls,
+                "total_ms": stats.total_ms,
+                "average_ms": stats.total_ms / stats.calls,
+                "max_ms": stats.max_ms,
+                "rows": stats.rows
+            }
+            for source, stats in sorted(query_stats.items(), key=lambda item: item[1].total_ms, reverse=True)
+        ]
+    }
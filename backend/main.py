@@ -1,6 +1,15 @@
+import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from routers import health_router, sales_router, customer_router, filter_router, goal_router
+from routers import health_router, sales_router, customer_router, filter_router, goal_router, batch_router, query_router, export_router, ingest_router, debug_router
+from services.aggregate_service import refresh_aggregates_periodically
+from services.migration_service import run_migrations
+from services.partition_service import maintain_partitions_periodically
+from services.columnar_service import export_columnar_periodically
+from columnar import columnar_store
+from config import RUN_MIGRATIONS_ON_STARTUP, DEBUG_ENDPOINTS_ENABLED
+from cache import start_invalidation_listener
+from instrumentation import ServerTimingMiddleware
 
 app = FastAPI(
     title="God Level Analytics API",
@@ -19,10 +28,60 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing"],
 )
+app.add_middleware(ServerTimingMiddleware)
 
 app.include_router(health_router.router)
 app.include_router(sales_router.router)
 app.include_router(customer_router.router)
 app.include_router(filter_router.router)
 app.include_router(goal_router.router)
+app.include_router(batch_router.router)
+app.include_router(query_router.router)
+app.include_router(export_router.router)
+app.include_router(ingest_router.router)
+if DEBUG_ENDPOINTS_ENABLED:
+    app.include_router(debug_router.router)
+
+# Registered first: startup handlers run in order and the refresher needs the aggregate tables.
+@app.on_event("startup")
+async def apply_schema_migrations():
+    if RUN_MIGRATIONS_ON_STARTUP:
+        await run_migrations()
+
+@app.on_event("startup")
+async def start_aggregate_refresh():
+    app.state.aggregate_refresh_task = asyncio.create_task(refresh_aggregates_periodically())
+
+@app.on_event("startup")
+async def start_partition_maintenance():
+    app.state.partition_maintenance_task = asyncio.create_task(maintain_partitions_periodically())
+
+@app.on_event("startup")
+async def start_columnar_export():
+    app.state.columnar_export_task = None
+    if columnar_store.enabled:
+        app.state.columnar_export_task = asyncio.create_task(export_columnar_periodically())
+
+@app.on_event("startup")
+async def start_cache_invalidation_listener():
+    app.state.cache_invalidation_task = await start_invalidation_listener()
+
+@app.on_event("shutdown")
+async def stop_aggregate_refresh():
+    app.state.aggregate_refresh_task.cancel()
+
+@app.on_event("shutdown")
+async def stop_partition_maintenance():
+    app.state.partition_maintenance_task.cancel()
+
+@app.on_event("shutdown")
+async def stop_columnar_export():
+    if app.state.columnar_export_task is not None:
+        app.state.columnar_export_task.cancel()
+
+@app.on_event("shutdown")
+async def stop_cache_invalidation_listener():
+    if app.state.cache_invalidation_task is not None:
+        app.state.cache_invalidation_task.cancel()
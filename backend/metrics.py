@@ -0,0 +1,62 @@
+import bisect
+from typing import Dict, List, Optional, Sequence
+
+# Upper bounds (seconds) shared by the request and query duration histograms; the last bucket is unbounded.
+LATENCY_BUCKETS_SECONDS = [0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10]
+
+class Histogram:
+    """Fixed-bucket histogram; observing only bumps plain counters, so it is cheap on every request."""
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS_SECONDS):
+        self.buckets = list(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(labels: Optional[Dict[str, str]], le: Optional[str] = None) -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in (labels or {}).items()]
+    if le is not None:
+        parts.append(f'le="{le}"')
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+class MetricsWriter:
+    """Builds a Prometheus text exposition (format 0.0.4)."""
+
+    def __init__(self):
+        self.lines: List[str] = []
+        self._described = set()
+
+    def _describe(self, name: str, kind: str, description: str):
+        if name not in self._described:
+            self._described.add(name)
+            self.lines.append(f"# HELP {name} {description}")
+            self.lines.append(f"# TYPE {name} {kind}")
+
+    def counter(self, name: str, description: str, value: float, labels: Optional[Dict[str, str]] = None):
+        self._describe(name, "counter", description)
+        self.lines.append(f"{name}{_format_labels(labels)} {value}")
+
+    def gauge(self, name: str, description: str, value: float, labels: Optional[Dict[str, str]] = None):
+        self._describe(name, "gauge", description)
+        self.lines.append(f"{name}{_format_labels(labels)} {value}")
+
+    def histogram(self, name: str, description: str, histogram: Histogram, labels: Optional[Dict[str, str]] = None):
+        self._describe(name, "histogram", description)
+        cumulative = 0
+        for bound, count in zip(histogram.buckets + [None], histogram.counts):
+            cumulative += count
+            le = "+Inf" if bound is None else f"{bound:g}"
+            self.lines.append(f"{name}_bucket{_format_labels(labels, le)} {cumulative}")
+        self.lines.append(f"{name}_sum{_format_labels(labels)} {histogram.sum}")
+        self.lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+
+    def render(self) -> str:
+        return "\n".join(self.lines) + "\n"
@@ -0,0 +1,23 @@
+import argparse
+import asyncio
+from database import SessionLocal, engine
+from services.migration_service import MigrationService
+
+async def main(status_only: bool):
+    try:
+        async with SessionLocal() as db:
+            migration_service = MigrationService(db)
+            if status_only:
+                pending = await migration_service.get_pending()
+                print("\n".join(pending) if pending else "Schema is up to date.")
+            else:
+                applied = await migration_service.migrate()
+                print(f"Applied: {', '.join(applied)}" if applied else "Schema is up to date.")
+    finally:
+        await engine.dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Apply the backend's schema migrations")
+    parser.add_argument("--status", action="store_true", help="List pending migrations without applying them")
+    args = parser.parse_args()
+    asyncio.run(main(args.status))
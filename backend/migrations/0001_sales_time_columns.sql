@@ -0,0 +1,13 @@
+-- Stored date/weekday/hour columns so time filters can use plain indexes
+
+ALTER TABLE sales ADD COLUMN IF NOT EXISTS sale_date DATE GENERATED ALWAYS AS (CAST(created_at AS DATE)) STORED;
+ALTER TABLE sales ADD COLUMN IF NOT EXISTS iso_dow SMALLINT GENERATED ALWAYS AS (EXTRACT(ISODOW FROM created_at)) STORED;
+ALTER TABLE sales ADD COLUMN IF NOT EXISTS hour SMALLINT GENERATED ALWAYS AS (EXTRACT(HOUR FROM created_at)) STORED;
+
+-- Replaced by the sale_date index below; no query matched the DATE(created_at) expression
+DROP INDEX IF EXISTS idx_sales_date_status;
+
+CREATE INDEX IF NOT EXISTS idx_sales_sale_date_status ON sales(sale_date, sale_status_desc);
+CREATE INDEX IF NOT EXISTS idx_sales_completed_dow_hour ON sales(iso_dow, hour, sale_date)
+    INCLUDE (store_id, delivery_seconds)
+    WHERE sale_status_desc = 'COMPLETED';
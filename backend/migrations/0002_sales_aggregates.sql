@@ -0,0 +1,112 @@
+-- Daily rollup, product cube, dirty-day log and data versions used by the API
+
+CREATE TABLE IF NOT EXISTS sales_daily_rollup (
+    sale_date DATE NOT NULL,
+    store_id INTEGER,
+    channel_id INTEGER,
+    sub_brand_id INTEGER,
+    sale_status_desc VARCHAR(255),
+    sales_count INTEGER NOT NULL,
+    total_amount_sum DECIMAL(14, 2) NOT NULL,
+    total_amount_sum_sq DECIMAL(20, 4) NOT NULL,
+    total_discount_sum DECIMAL(14, 2) NOT NULL,
+    total_increase_sum DECIMAL(14, 2) NOT NULL,
+    delivery_fee_sum DECIMAL(14, 2) NOT NULL,
+    service_tax_fee_sum DECIMAL(14, 2) NOT NULL,
+    delivery_count INTEGER NOT NULL,
+    delivery_seconds_sum BIGINT NOT NULL,
+    delivery_seconds_sum_sq BIGINT NOT NULL,
+    delivery_seconds_min INTEGER,
+    delivery_seconds_max INTEGER
+);
+
+CREATE INDEX IF NOT EXISTS idx_sales_daily_rollup_date ON sales_daily_rollup(sale_date, sale_status_desc);
+
+CREATE TABLE IF NOT EXISTS product_sales_cube (
+    sale_date DATE NOT NULL,
+    product_id INTEGER NOT NULL,
+    store_id INTEGER,
+    channel_id INTEGER,
+    iso_dow SMALLINT NOT NULL, -- 1 = Monday, 7 = Sunday
+    hour SMALLINT NOT NULL,
+    total_revenue DECIMAL(14, 2) NOT NULL,
+    total_quantity INTEGER NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_product_sales_cube_date ON product_sales_cube(sale_date, iso_dow, hour);
+
+-- Append-only log of days whose aggregates must be recomputed
+CREATE TABLE IF NOT EXISTS sales_dirty_days (
+    id BIGSERIAL PRIMARY KEY,
+    sale_date DATE NOT NULL
+);
+
+-- Bumped for every day whose aggregates are recomputed; used to version cache keys
+CREATE SEQUENCE IF NOT EXISTS sales_data_version_seq;
+
+CREATE TABLE IF NOT EXISTS sales_day_versions (
+    sale_date DATE PRIMARY KEY,
+    version BIGINT NOT NULL
+);
+
+CREATE OR REPLACE FUNCTION mark_sales_days_dirty() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO sales_dirty_days (sale_date)
+        SELECT DISTINCT sale_date FROM new_rows WHERE sale_date IS NOT NULL;
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        INSERT INTO sales_dirty_days (sale_date)
+        SELECT DISTINCT sale_date FROM old_rows WHERE sale_date IS NOT NULL;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS sales_mark_dirty_insert ON sales;
+CREATE TRIGGER sales_mark_dirty_insert AFTER INSERT ON sales
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION mark_sales_days_dirty();
+
+DROP TRIGGER IF EXISTS sales_mark_dirty_update ON sales;
+CREATE TRIGGER sales_mark_dirty_update AFTER UPDATE ON sales
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION mark_sales_days_dirty();
+
+DROP TRIGGER IF EXISTS sales_mark_dirty_delete ON sales;
+CREATE TRIGGER sales_mark_dirty_delete AFTER DELETE ON sales
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION mark_sales_days_dirty();
+
+CREATE OR REPLACE FUNCTION mark_product_sales_days_dirty() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO sales_dirty_days (sale_date)
+        SELECT DISTINCT s.sale_date
+        FROM new_rows ps JOIN sales s ON ps.sale_id = s.id
+        WHERE s.sale_date IS NOT NULL;
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        INSERT INTO sales_dirty_days (sale_date)
+        SELECT DISTINCT s.sale_date
+        FROM old_rows ps JOIN sales s ON ps.sale_id = s.id
+        WHERE s.sale_date IS NOT NULL;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS product_sales_mark_dirty_insert ON product_sales;
+CREATE TRIGGER product_sales_mark_dirty_insert AFTER INSERT ON product_sales
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION mark_product_sales_days_dirty();
+
+DROP TRIGGER IF EXISTS product_sales_mark_dirty_update ON product_sales;
+CREATE TRIGGER product_sales_mark_dirty_update AFTER UPDATE ON product_sales
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION mark_product_sales_days_dirty();
+
+DROP TRIGGER IF EXISTS product_sales_mark_dirty_delete ON product_sales;
+CREATE TRIGGER product_sales_mark_dirty_delete AFTER DELETE ON product_sales
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION mark_product_sales_days_dirty();
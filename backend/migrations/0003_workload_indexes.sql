@@ -0,0 +1,39 @@
+-- Foreign key and covering indexes for the joins and filters in the repositories
+
+CREATE INDEX IF NOT EXISTS idx_sales_completed_created_at ON sales(created_at)
+    WHERE sale_status_desc = 'COMPLETED';
+
+-- Foreign keys
+CREATE INDEX IF NOT EXISTS idx_sales_customer_id ON sales(customer_id);
+CREATE INDEX IF NOT EXISTS idx_sales_store_id ON sales(store_id);
+CREATE INDEX IF NOT EXISTS idx_sales_channel_id ON sales(channel_id);
+CREATE INDEX IF NOT EXISTS idx_sales_sub_brand_id ON sales(sub_brand_id);
+CREATE INDEX IF NOT EXISTS idx_product_sales_product_sale ON product_sales(product_id, sale_id);
+CREATE INDEX IF NOT EXISTS idx_item_product_sales_product_sale_id ON item_product_sales(product_sale_id);
+CREATE INDEX IF NOT EXISTS idx_item_item_product_sales_item_product_sale_id ON item_item_product_sales(item_product_sale_id);
+CREATE INDEX IF NOT EXISTS idx_delivery_sales_sale_id ON delivery_sales(sale_id);
+CREATE INDEX IF NOT EXISTS idx_delivery_addresses_delivery_sale_id ON delivery_addresses(delivery_sale_id);
+CREATE INDEX IF NOT EXISTS idx_payments_sale_id ON payments(sale_id);
+CREATE INDEX IF NOT EXISTS idx_products_category_id ON products(category_id);
+
+-- Covering: product cube refresh and ticket composition (sale -> product lines)
+CREATE INDEX IF NOT EXISTS idx_product_sales_sale_id ON product_sales(sale_id)
+    INCLUDE (product_id, quantity, total_price);
+
+-- Covering: delivery performance by neighborhood/city
+CREATE INDEX IF NOT EXISTS idx_delivery_addresses_sale_id ON delivery_addresses(sale_id)
+    INCLUDE (neighborhood, city);
+
+-- Covering: delivery performance over a date range without a weekday filter
+CREATE INDEX IF NOT EXISTS idx_sales_completed_delivery ON sales(sale_date)
+    INCLUDE (store_id, delivery_seconds)
+    WHERE sale_status_desc = 'COMPLETED' AND delivery_seconds IS NOT NULL;
+
+-- Covering: churn risk (purchases and last purchase per customer)
+CREATE INDEX IF NOT EXISTS idx_sales_completed_customer ON sales(customer_id)
+    INCLUDE (sale_date)
+    WHERE sale_status_desc = 'COMPLETED';
+
+ANALYZE sales;
+ANALYZE product_sales;
+ANALYZE delivery_addresses;
@@ -0,0 +1,33 @@
+-- Copy of sales.created_at on every sale line table. It is the key those tables
+-- are partitioned on when sales is converted to monthly partitions (see partitions.py).
+-- Writers must set it to the parent sale's created_at.
+
+ALTER TABLE product_sales ADD COLUMN IF NOT EXISTS sale_created_at TIMESTAMP;
+ALTER TABLE item_product_sales ADD COLUMN IF NOT EXISTS sale_created_at TIMESTAMP;
+ALTER TABLE item_item_product_sales ADD COLUMN IF NOT EXISTS sale_created_at TIMESTAMP;
+ALTER TABLE payments ADD COLUMN IF NOT EXISTS sale_created_at TIMESTAMP;
+ALTER TABLE delivery_sales ADD COLUMN IF NOT EXISTS sale_created_at TIMESTAMP;
+ALTER TABLE delivery_addresses ADD COLUMN IF NOT EXISTS sale_created_at TIMESTAMP;
+
+-- The backfill does not change any aggregated value, so skip marking every day dirty.
+ALTER TABLE product_sales DISABLE TRIGGER product_sales_mark_dirty_update;
+
+UPDATE product_sales ps SET sale_created_at = s.created_at
+FROM sales s WHERE ps.sale_id = s.id AND ps.sale_created_at IS NULL;
+
+ALTER TABLE product_sales ENABLE TRIGGER product_sales_mark_dirty_update;
+
+UPDATE item_product_sales ips SET sale_created_at = ps.sale_created_at
+FROM product_sales ps WHERE ips.product_sale_id = ps.id AND ips.sale_created_at IS NULL;
+
+UPDATE item_item_product_sales iips SET sale_created_at = ips.sale_created_at
+FROM item_product_sales ips WHERE iips.item_product_sale_id = ips.id AND iips.sale_created_at IS NULL;
+
+UPDATE payments p SET sale_created_at = s.created_at
+FROM sales s WHERE p.sale_id = s.id AND p.sale_created_at IS NULL;
+
+UPDATE delivery_sales ds SET sale_created_at = s.created_at
+FROM sales s WHERE ds.sale_id = s.id AND ds.sale_created_at IS NULL;
+
+UPDATE delivery_addresses da SET sale_created_at = s.created_at
+FROM sales s WHERE da.sale_id = s.id AND da.sale_created_at IS NULL;
@@ -0,0 +1,55 @@
+-- Per-customer purchase statistics behind churn risk and RFM, refreshed with the sales aggregates
+
+CREATE TABLE IF NOT EXISTS customer_stats (
+    customer_id INTEGER PRIMARY KEY,
+    first_purchase_date DATE NOT NULL,
+    last_purchase_date DATE NOT NULL,
+    purchase_count INTEGER NOT NULL,
+    total_spent DECIMAL(14, 2) NOT NULL,
+    average_ticket DECIMAL(14, 2) NOT NULL,
+    favourite_channel_id INTEGER,
+    favourite_store_id INTEGER
+);
+
+-- Churn risk: inactive since a date, oldest first
+CREATE INDEX IF NOT EXISTS idx_customer_stats_last_purchase ON customer_stats(last_purchase_date, customer_id)
+    INCLUDE (purchase_count);
+
+-- Append-only log of customers whose statistics must be recomputed
+CREATE TABLE IF NOT EXISTS customer_stats_dirty (
+    id BIGSERIAL PRIMARY KEY,
+    customer_id INTEGER NOT NULL
+);
+
+CREATE OR REPLACE FUNCTION mark_customers_dirty() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO customer_stats_dirty (customer_id)
+        SELECT DISTINCT customer_id FROM new_rows WHERE customer_id IS NOT NULL;
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        INSERT INTO customer_stats_dirty (customer_id)
+        SELECT DISTINCT customer_id FROM old_rows WHERE customer_id IS NOT NULL;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS sales_mark_customers_dirty_insert ON sales;
+CREATE TRIGGER sales_mark_customers_dirty_insert AFTER INSERT ON sales
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION mark_customers_dirty();
+
+DROP TRIGGER IF EXISTS sales_mark_customers_dirty_update ON sales;
+CREATE TRIGGER sales_mark_customers_dirty_update AFTER UPDATE ON sales
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION mark_customers_dirty();
+
+DROP TRIGGER IF EXISTS sales_mark_customers_dirty_delete ON sales;
+CREATE TRIGGER sales_mark_customers_dirty_delete AFTER DELETE ON sales
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION mark_customers_dirty();
+
+-- Existing customers are computed by the next refresh
+INSERT INTO customer_stats_dirty (customer_id)
+SELECT DISTINCT customer_id FROM sales WHERE customer_id IS NOT NULL;
@@ -0,0 +1,26 @@
+-- Mergeable percentile sketches (DDSketch, 2% relative error) of delivery and
+-- production times, one per day and store / neighborhood / city
+
+CREATE OR REPLACE FUNCTION ddsketch_bucket(value DOUBLE PRECISION) RETURNS SMALLINT AS $$
+    SELECT CAST(CEIL(LN(GREATEST(value, 1)) / LN(1.02 / 0.98)) AS SMALLINT)
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Midpoint of the bucket; within 2% of every value that fell into it
+CREATE OR REPLACE FUNCTION ddsketch_value(bucket INTEGER) RETURNS DOUBLE PRECISION AS $$
+    SELECT 2 * POWER(1.02 / 0.98, bucket) / (1.02 / 0.98 + 1)
+$$ LANGUAGE sql IMMUTABLE;
+
+CREATE TABLE IF NOT EXISTS sales_time_sketches (
+    sale_date DATE NOT NULL,
+    grain VARCHAR(16) NOT NULL, -- 'store', 'neighborhood' or 'city'; the other key columns are NULL
+    store_id INTEGER,
+    neighborhood VARCHAR(255),
+    city VARCHAR(255),
+    measure VARCHAR(16) NOT NULL, -- 'delivery' or 'production'
+    sample_count INTEGER NOT NULL,
+    seconds_sum BIGINT NOT NULL,
+    buckets SMALLINT[] NOT NULL,
+    bucket_counts INTEGER[] NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_sales_time_sketches_grain_date ON sales_time_sketches(grain, measure, sale_date);
@@ -0,0 +1,26 @@
+-- Mergeable distinct-customer sketches (HyperLogLog, 2048 registers, ~2.3% standard
+-- error), one per day, store and channel. Registers are stored sparse: only the
+-- ones a customer hashed into, as parallel index/rank arrays.
+
+-- Low 11 bits of the customer hash pick the register
+CREATE OR REPLACE FUNCTION hll_register_index(customer_id INTEGER) RETURNS SMALLINT AS $$
+    SELECT CAST(hashtextextended(CAST(customer_id AS TEXT), 0) & 2047 AS SMALLINT)
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Position of the first set bit in the remaining 52 bits (53 when none is set)
+CREATE OR REPLACE FUNCTION hll_register_rank(customer_id INTEGER) RETURNS SMALLINT AS $$
+    SELECT CAST(53 - length(ltrim(CAST(CAST(
+        (hashtextextended(CAST(customer_id AS TEXT), 0) >> 11) & 4503599627370495
+    AS BIT(52)) AS TEXT), '0')) AS SMALLINT)
+$$ LANGUAGE sql IMMUTABLE;
+
+CREATE TABLE IF NOT EXISTS sales_customer_sketches (
+    sale_date DATE NOT NULL,
+    store_id INTEGER,
+    channel_id INTEGER,
+    customer_sales INTEGER NOT NULL, -- completed sales with an identified customer
+    register_indexes SMALLINT[] NOT NULL,
+    register_ranks SMALLINT[] NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_sales_customer_sketches_date ON sales_customer_sketches(sale_date);
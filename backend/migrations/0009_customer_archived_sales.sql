@@ -0,0 +1,42 @@
+-- Completed sales of archived partitions, folded per customer, store and channel before
+-- the partition is detached, so customer_stats keeps covering the whole history
+
+CREATE TABLE IF NOT EXISTS customer_archived_sales (
+    customer_id INTEGER NOT NULL,
+    store_id INTEGER,
+    channel_id INTEGER,
+    first_purchase_date DATE NOT NULL,
+    last_purchase_date DATE NOT NULL,
+    purchase_count INTEGER NOT NULL,
+    total_spent DECIMAL(14, 2) NOT NULL,
+    UNIQUE NULLS NOT DISTINCT (customer_id, store_id, channel_id)
+);
+
+-- Months archived before this table existed are still in the archive schema (dropped ones are lost)
+DO $$
+DECLARE
+    partition_table TEXT;
+BEGIN
+    FOR partition_table IN
+        SELECT tablename FROM pg_tables WHERE schemaname = 'archive' AND tablename ~ '^sales_p[0-9]{6}$'
+    LOOP
+        EXECUTE format($sql$
+            INSERT INTO customer_archived_sales (
+                customer_id, store_id, channel_id, first_purchase_date, last_purchase_date, purchase_count, total_spent
+            )
+            SELECT customer_id, store_id, channel_id, MIN(sale_date), MAX(sale_date), COUNT(id), COALESCE(SUM(total_amount), 0)
+            FROM archive.%I
+            WHERE sale_status_desc = 'COMPLETED' AND customer_id IS NOT NULL
+            GROUP BY customer_id, store_id, channel_id
+            ON CONFLICT (customer_id, store_id, channel_id) DO UPDATE SET
+                first_purchase_date = LEAST(customer_archived_sales.first_purchase_date, EXCLUDED.first_purchase_date),
+                last_purchase_date = GREATEST(customer_archived_sales.last_purchase_date, EXCLUDED.last_purchase_date),
+                purchase_count = customer_archived_sales.purchase_count + EXCLUDED.purchase_count,
+                total_spent = customer_archived_sales.total_spent + EXCLUDED.total_spent
+        $sql$, partition_table);
+    END LOOP;
+END;
+$$;
+
+INSERT INTO customer_stats_dirty (customer_id)
+SELECT DISTINCT customer_id FROM customer_archived_sales;
@@ -0,0 +1,9 @@
+-- Days loaded before the dirty-day triggers existed, queued once for their first refresh.
+-- Every later write marks its own days; workers no longer scan sales for this at startup.
+
+INSERT INTO sales_dirty_days (sale_date)
+SELECT d.sale_date
+FROM (SELECT DISTINCT sale_date FROM sales WHERE sale_date IS NOT NULL) d
+WHERE NOT EXISTS (
+    SELECT 1 FROM sales_daily_rollup r WHERE r.sale_date = d.sale_date
+);
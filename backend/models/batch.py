@@ -0,0 +1,76 @@
+from pydantic import BaseModel, Field, model_validator
+from datetime import date, timedelta
+from typing import Any, Dict, List, Literal, Optional
+from models.sales import CompareTo
+
+BatchRequestType = Literal[
+    'sales-overview',
+    'top-products',
+    'sales-breakdown',
+    'delivery-performance',
+    'ticket-trend',
+    'ticket-composition',
+    'customer-churn-risk'
+]
+
+def default_start_date() -> date:
+    return date.today() - timedelta(days=30)
+
+class DateRangeParams(BaseModel):
+    start_date: date = Field(default_factory=default_start_date)
+    end_date: date = Field(default_factory=date.today)
+
+class TimeSliceParams(DateRangeParams):
+    day_of_week: Optional[int] = Field(default=None, ge=1, le=7)
+    start_hour: Optional[int] = Field(default=None, ge=0, le=23)
+    end_hour: Optional[int] = Field(default=None, ge=0, le=23)
+
+    @model_validator(mode='after')
+    def check_hour_range(self):
+        if (self.start_hour is None) != (self.end_hour is None):
+            raise ValueError("Both start_hour and end_hour must be provided for time-based filtering.")
+        return self
+
+class TopProductsParams(TimeSliceParams):
+    limit: int = Field(default=10, ge=1, le=100)
+    channel_id: Optional[int] = None
+    store_id: Optional[int] = None
+
+class SalesOverviewParams(DateRangeParams):
+    compare_to: Optional[CompareTo] = None
+
+class SalesBreakdownParams(SalesOverviewParams):
+    dimension: Literal['channel', 'store']
+
+class DeliveryPerformanceParams(TimeSliceParams):
+    dimension: Literal['store', 'neighborhood', 'city']
+
+class ChurnRiskParams(BaseModel):
+    min_purchases: int = Field(default=3, ge=1)
+    inactive_days: int = Field(default=30, ge=1)
+    limit: int = Field(default=100, ge=1, le=1000)
+    cursor: Optional[str] = None
+
+class BatchSubRequest(BaseModel):
+    id: str
+    type: BatchRequestType
+    params: Dict[str, Any] = Field(default_factory=dict)
+
+class BatchRequest(BaseModel):
+    requests: List[BatchSubRequest] = Field(min_length=1, max_length=50)
+
+    @model_validator(mode='after')
+    def check_unique_ids(self):
+        if len({sub_request.id for sub_request in self.requests}) != len(self.requests):
+            raise ValueError("Sub-request ids must be unique within a batch.")
+        return self
+
+class BatchSubResponse(BaseModel):
+    id: str
+    status: int
+    cached: bool = False
+    data: Optional[Any] = None
+    error: Optional[str] = None
+
+class BatchResponse(BaseModel):
+    results: List[BatchSubResponse]
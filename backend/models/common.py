@@ -1,5 +1,70 @@
 from pydantic import BaseModel
+from datetime import datetime
+from typing import Dict, List, Literal, Optional
 
 class HealthCheckResponse(BaseModel):
     status: str
     database: str
+
+class PoolWaitBucket(BaseModel):
+    le_ms: Optional[float] = None
+    count: int
+
+class PoolStatusResponse(BaseModel):
+    pool_size: int
+    max_overflow: int
+    checked_out: int
+    checked_in: int
+    overflow: int
+    checkouts: int
+    overflow_events: int
+    timeouts: int
+    average_wait_ms: float
+    max_wait_ms: float
+    wait_histogram: List[PoolWaitBucket]
+
+class CachePayloadStats(BaseModel):
+    writes: int
+    raw_bytes: int
+    stored_bytes: int
+
+class CachePrefixStats(BaseModel):
+    l1_hits: int
+    redis_hits: int
+    misses: int
+    errors: int
+
+class CacheStatusResponse(BaseModel):
+    l1_entries: int
+    l1_bytes: int
+    l1_hits: int
+    l1_misses: int
+    l1_evictions: int
+    redis_hits: int
+    redis_misses: int
+    prefixes: Dict[str, CachePrefixStats]
+    payloads: Dict[str, CachePayloadStats]
+
+class SlowQuery(BaseModel):
+    recorded_at: datetime
+    source: str
+    duration_ms: float
+    rows: int
+    statement: str
+    parameter_types: List[str]
+    plan_status: Literal['not_sampled', 'pending', 'captured', 'failed']
+    plan: Optional[str] = None
+
+class QuerySourceStats(BaseModel):
+    source: str
+    calls: int
+    total_ms: float
+    average_ms: float
+    max_ms: float
+    rows: int
+
+class SlowQueryLogResponse(BaseModel):
+    threshold_ms: float
+    explain_sample_rate: float
+    queries: List[SlowQuery]
+    sources: List[QuerySourceStats]
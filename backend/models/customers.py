@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from datetime import date
-from typing import List
+from typing import List, Optional
 
 class ChurnRiskCustomer(BaseModel):
     customer_id: int
@@ -11,4 +11,22 @@ class ChurnRiskCustomer(BaseModel):
 class CustomerChurnRiskResponse(BaseModel):
     min_purchases: int
     inactive_days: int
+    limit: int
     churn_risk_customers: List[ChurnRiskCustomer]
+    # Pass back as `cursor` for the next page; None on the last page.
+    next_cursor: Optional[str] = None
+
+class ChurnRiskCountResponse(BaseModel):
+    min_purchases: int
+    inactive_days: int
+    total: int
+
+class RfmSegment(BaseModel):
+    segment: str
+    customers: int
+    average_recency_days: float
+    average_purchases: float
+    average_spent: float
+
+class CustomerRfmResponse(BaseModel):
+    segments: List[RfmSegment]
@@ -0,0 +1,85 @@
+from pydantic import BaseModel, Field, field_validator
+from datetime import date, datetime
+from decimal import Decimal
+from typing import List, Literal, Optional
+from config import INGEST_MAX_BATCH_SALES
+
+# Same shape as the per-sale dictionaries generate_data.py used to insert row by row.
+
+class IngestItem(BaseModel):
+    item_id: int
+    option_group_id: Optional[int] = None
+    quantity: int = Field(default=1, ge=1)
+    additional_price: Decimal = Field(ge=0)
+    price: Decimal = Field(ge=0)
+
+class IngestProduct(BaseModel):
+    product_id: int
+    quantity: int = Field(ge=1)
+    base_price: Decimal = Field(ge=0)
+    total_price: Decimal = Field(ge=0)
+    items: List[IngestItem] = Field(default_factory=list)
+
+class IngestAddress(BaseModel):
+    street: str = Field(max_length=255)
+    number: str = Field(max_length=255)
+    complement: Optional[str] = Field(default=None, max_length=255)
+    neighborhood: str = Field(max_length=255)
+    city: str = Field(max_length=255)
+    state: str = Field(max_length=2)
+    postal_code: str = Field(max_length=10)
+    latitude: Decimal = Field(ge=-90, le=90)
+    longitude: Decimal = Field(ge=-180, le=180)
+
+class IngestDelivery(BaseModel):
+    courier_name: str = Field(max_length=255)
+    courier_phone: str = Field(max_length=255)
+    courier_type: str = Field(max_length=255)
+    delivery_type: str = Field(max_length=255)
+    status: str = Field(max_length=255)
+    delivery_fee: Decimal = Field(ge=0)
+    courier_fee: Decimal = Field(ge=0)
+    address: IngestAddress
+
+class IngestPayment(BaseModel):
+    # payment_types.description, e.g. 'PIX' or 'Cartão de Crédito'
+    type: str
+    value: Decimal = Field(ge=0)
+
+class IngestSale(BaseModel):
+    store_id: int
+    customer_id: Optional[int] = None
+    customer_name: Optional[str] = Field(default=None, max_length=255)
+    channel_id: int
+    created_at: datetime
+    sale_status_desc: Literal['COMPLETED', 'CANCELLED']
+    total_items_value: Decimal = Field(ge=0)
+    discount: Decimal = Field(default=Decimal(0), ge=0)
+    discount_reason: Optional[str] = Field(default=None, max_length=255)
+    increase: Decimal = Field(default=Decimal(0), ge=0)
+    delivery_fee: Decimal = Field(default=Decimal(0), ge=0)
+    service_tax: Decimal = Field(default=Decimal(0), ge=0)
+    total_amount: Decimal = Field(ge=0)
+    value_paid: Decimal = Field(ge=0)
+    production_sec: Optional[int] = Field(default=None, ge=0)
+    delivery_sec: Optional[int] = Field(default=None, ge=0)
+    people_qty: Optional[int] = Field(default=None, ge=1)
+    origin: str = Field(default='POS', max_length=255)
+    products: List[IngestProduct] = Field(min_length=1)
+    delivery: Optional[IngestDelivery] = None
+    payments: List[IngestPayment] = Field(default_factory=list)
+
+    @field_validator('created_at')
+    @classmethod
+    def store_wall_clock(cls, value: datetime) -> datetime:
+        # sales.created_at holds the store's local time without a zone.
+        return value.replace(tzinfo=None)
+
+class IngestSalesRequest(BaseModel):
+    sales: List[IngestSale] = Field(min_length=1, max_length=INGEST_MAX_BATCH_SALES)
+
+class IngestSalesResponse(BaseModel):
+    sales_ingested: int
+    sale_ids: List[int]
+    sale_dates: List[date]
+    store_ids: List[int]
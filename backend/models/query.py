@@ -0,0 +1,54 @@
+from pydantic import BaseModel, Field, model_validator
+from datetime import date
+from typing import Any, Dict, List, Literal, Optional, Union
+from models.batch import DateRangeParams
+
+MetricName = Literal[
+    'revenue',
+    'sales_count',
+    'average_ticket',
+    'average_delivery_seconds',
+    'p90_delivery_seconds',
+    'product_revenue',
+    'quantity'
+]
+
+DimensionName = Literal['date', 'hour', 'weekday', 'store', 'channel', 'product', 'category', 'neighborhood', 'city']
+
+class QueryRequest(DateRangeParams):
+    metrics: List[MetricName] = Field(min_length=1)
+    dimensions: List[DimensionName] = Field(default_factory=list, max_length=3)
+    # Keys of the dimensions (ids for store/channel/product/category, names for neighborhood/city)
+    filters: Dict[DimensionName, List[Union[int, str]]] = Field(default_factory=dict)
+    order_by: Optional[MetricName] = None
+    descending: bool = True
+    limit: int = Field(default=100, ge=1, le=5000)
+
+    @model_validator(mode='after')
+    def check_query(self):
+        if len(set(self.metrics)) != len(self.metrics) or len(set(self.dimensions)) != len(self.dimensions):
+            raise ValueError("Metrics and dimensions must not repeat.")
+        if self.order_by and self.order_by not in self.metrics:
+            raise ValueError("order_by must be one of the requested metrics.")
+        if 'date' in self.filters:
+            raise ValueError("Filter dates with start_date and end_date.")
+        if any(not values for values in self.filters.values()):
+            raise ValueError("Filters need at least one value.")
+        return self
+
+class QueryResponse(BaseModel):
+    start_date: date
+    end_date: date
+    source: str
+    metrics: List[MetricName]
+    dimensions: List[DimensionName]
+    rows: List[Dict[str, Any]]
+
+class CatalogEntry(BaseModel):
+    name: str
+    description: str
+    sources: List[str]
+
+class CatalogResponse(BaseModel):
+    metrics: List[CatalogEntry]
+    dimensions: List[CatalogEntry]
@@ -1,13 +1,42 @@
 from pydantic import BaseModel
 from datetime import date
-from typing import List
+from typing import List, Literal, Optional
+
+CompareTo = Literal['previous_period', 'previous_month', 'previous_year']
+
+class PeriodComparison(BaseModel):
+    total_revenue: float
+    total_sales_count: int
+    average_ticket_value: float
+    unique_customers: Optional[int] = None
+    repeat_purchase_rate: Optional[float] = None
+    revenue_change_percentage: Optional[float] = None
+    sales_count_change_percentage: Optional[float] = None
+    average_ticket_change_percentage: Optional[float] = None
+    unique_customers_change_percentage: Optional[float] = None
 
 class SalesOverviewResponse(BaseModel):
     total_revenue: float
     total_sales_count: int
     average_ticket_value: float
+    # Estimated from HyperLogLog sketches; repeat_purchase_rate is the share of
+    # identified purchases made by a customer who had already bought in the period.
+    unique_customers: Optional[int] = None
+    repeat_purchase_rate: Optional[float] = None
     start_date: date
     end_date: date
+    compare_to: Optional[str] = None
+    comparison_start_date: Optional[date] = None
+    comparison_end_date: Optional[date] = None
+    comparison: Optional[PeriodComparison] = None
+
+class MonthlySummaryResponse(BaseModel):
+    current_month_revenue: float
+    previous_month_revenue_same_day: float
+    last_3_months_avg_revenue: float
+    current_month: SalesOverviewResponse
+    previous_month_same_day: SalesOverviewResponse
+    last_full_months: List[SalesOverviewResponse]
 
 class TopProduct(BaseModel):
     product_id: int
@@ -26,17 +55,25 @@ class SalesByDimensionItem(BaseModel):
     total_revenue: float
     total_sales_count: int
     average_ticket_value: float
+    unique_customers: Optional[int] = None
+    repeat_purchase_rate: Optional[float] = None
+    comparison: Optional[PeriodComparison] = None
 
 class SalesByDimensionResponse(BaseModel):
     start_date: date
     end_date: date
     dimension: str
     breakdown: List[SalesByDimensionItem]
+    compare_to: Optional[str] = None
+    comparison_start_date: Optional[date] = None
+    comparison_end_date: Optional[date] = None
 
 class DeliveryPerformanceItem(BaseModel):
     dimension_name: str
     average_delivery_seconds: float
+    p50_delivery_seconds: Optional[float] = None
     p90_delivery_seconds: float
+    p99_delivery_seconds: Optional[float] = None
     total_deliveries: int
 
 class DeliveryPerformanceResponse(BaseModel):
@@ -45,6 +82,20 @@ class DeliveryPerformanceResponse(BaseModel):
     dimension: str
     performance_breakdown: List[DeliveryPerformanceItem]
 
+class ProductionPerformanceItem(BaseModel):
+    dimension_name: str
+    average_production_seconds: float
+    p50_production_seconds: float
+    p90_production_seconds: float
+    p99_production_seconds: float
+    total_sales: int
+
+class ProductionPerformanceResponse(BaseModel):
+    start_date: date
+    end_date: date
+    dimension: str
+    performance_breakdown: List[ProductionPerformanceItem]
+
 class TimeSeriesDataPoint(BaseModel):
     date: date
     value: float
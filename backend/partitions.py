@@ -0,0 +1,38 @@
+import argparse
+import asyncio
+from database import SessionLocal, engine
+from services.partition_service import PartitionService
+from config import PARTITION_MONTHS_AHEAD
+
+async def main(args: argparse.Namespace):
+    try:
+        async with SessionLocal() as db:
+            partition_service = PartitionService(db)
+            if args.command == "status":
+                for table, partitions in (await partition_service.get_status()).items():
+                    print(f"{table}: {', '.join(partitions) if partitions else 'not partitioned'}")
+            elif args.command == "convert":
+                months = await partition_service.convert(args.months_ahead)
+                print(f"Partitioned by month from {months[0]:%Y-%m} to {months[-1]:%Y-%m}.")
+            elif args.command == "create-future":
+                created = await partition_service.create_future_partitions(args.months_ahead)
+                print(f"Created: {', '.join(created)}" if created else "Nothing to create.")
+            elif args.command == "archive":
+                archived = await partition_service.archive(args.retention_months, args.drop)
+                action = "Dropped" if args.drop else "Archived"
+                print(f"{action}: {', '.join(archived)}" if archived else "Nothing older than the retention window.")
+    finally:
+        await engine.dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage the monthly partitions of sales and its line tables")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("status", help="List the partitions of each table")
+    convert_parser = subparsers.add_parser("convert", help="Convert the tables to monthly partitions (copies every row)")
+    convert_parser.add_argument("--months-ahead", type=int, default=PARTITION_MONTHS_AHEAD)
+    future_parser = subparsers.add_parser("create-future", help="Create partitions for the coming months")
+    future_parser.add_argument("--months-ahead", type=int, default=PARTITION_MONTHS_AHEAD)
+    archive_parser = subparsers.add_parser("archive", help="Detach partitions older than the retention window")
+    archive_parser.add_argument("--retention-months", type=int, required=True)
+    archive_parser.add_argument("--drop", action="store_true", help="Drop detached partitions instead of moving them to the archive schema")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,235 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import text
+from datetime import date
+from typing import List
+from repositories.sales_repository import created_at_bounds
+from instrumentation import track_queries
+
+# Arbitrary key shared by every worker so only one refresh runs at a time.
+AGGREGATE_REFRESH_LOCK_ID = 7310001
+
+@track_queries
+class AggregateRepository:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def mark_missing_days_dirty(self) -> int:
+        # Every day with sales has rollup rows, while the cube and sketches can be empty for it;
+        # all of them are rebuilt together, so the rollup alone tells whether a day was ever refreshed.
+        query = text("""
+            INSERT INTO sales_dirty_days (sale_date)
+            SELECT d.sale_date
+            FROM (SELECT DISTINCT sale_date FROM sales WHERE sale_date IS NOT NULL) d
+            WHERE NOT EXISTS (
+                SELECT 1 FROM sales_daily_rollup r WHERE r.sale_date = d.sale_date
+            )
+        """)
+        marked = (await self.db.execute(query)).rowcount
+        await self.db.commit()
+        return marked
+
+    async def refresh_dirty_days(self) -> List[date]:
+        # Returns an empty list when another worker is already refreshing.
+        locked = (await self.db.execute(
+            text("SELECT pg_try_advisory_xact_lock(:lock_id)"),
+            {"lock_id": AGGREGATE_REFRESH_LOCK_ID}
+        )).scalar()
+        if not locked:
+            await self.db.rollback()
+            return []
+        # A large backfill can legitimately outlive the API statement timeout.
+        await self.db.execute(text("SET LOCAL statement_timeout = 0"))
+
+        results = (await self.db.execute(text("DELETE FROM sales_dirty_days RETURNING sale_date"))).fetchall()
+        days = sorted({result.sale_date for result in results})
+        if days:
+            await self._refresh_days(days)
+        # Same transaction as the days: a customer only changes when a sale does, so
+        # the day versions that key the churn cache move together with the stats.
+        results = (await self.db.execute(text("DELETE FROM customer_stats_dirty RETURNING customer_id"))).fetchall()
+        customer_ids = sorted({result.customer_id for result in results})
+        if customer_ids:
+            await self._refresh_customers(customer_ids)
+        await self.db.commit()
+        return days
+
+    async def _refresh_days(self, days: List[date]):
+        params = {"days": days, **created_at_bounds(days[0], days[-1])}
+        await self.db.execute(text("""
+            WITH v AS (SELECT nextval('sales_data_version_seq') as version)
+            INSERT INTO sales_day_versions (sale_date, version)
+            SELECT d.sale_date, v.version
+            FROM unnest(CAST(:days AS DATE[])) as d(sale_date), v
+            ON CONFLICT (sale_date) DO UPDATE SET version = EXCLUDED.version
+        """), params)
+        await self.db.execute(text("DELETE FROM sales_daily_rollup WHERE sale_date = ANY(:days)"), params)
+        await self.db.execute(text("""
+            INSERT INTO sales_daily_rollup (
+                sale_date, store_id, channel_id, sub_brand_id, sale_status_desc,
+                sales_count, total_amount_sum, total_amount_sum_sq,
+                total_discount_sum, total_increase_sum, delivery_fee_sum, service_tax_fee_sum,
+                delivery_count, delivery_seconds_sum, delivery_seconds_sum_sq,
+                delivery_seconds_min, delivery_seconds_max
+            )
+            SELECT
+                s.sale_date,
+                s.store_id,
+                s.channel_id,
+                s.sub_brand_id,
+                s.sale_status_desc,
+                COUNT(s.id),
+                COALESCE(SUM(s.total_amount), 0),
+                COALESCE(SUM(s.total_amount * s.total_amount), 0),
+                COALESCE(SUM(s.total_discount), 0),
+                COALESCE(SUM(s.total_increase), 0),
+                COALESCE(SUM(s.delivery_fee), 0),
+                COALESCE(SUM(s.service_tax_fee), 0),
+                COUNT(s.delivery_seconds),
+                COALESCE(SUM(s.delivery_seconds), 0),
+                COALESCE(SUM(s.delivery_seconds::bigint * s.delivery_seconds), 0),
+                MIN(s.delivery_seconds),
+                MAX(s.delivery_seconds)
+            FROM sales s
+            WHERE s.sale_date = ANY(:days)
+              AND s.created_at >= :created_at_start AND s.created_at < :created_at_end
+            GROUP BY s.sale_date, s.store_id, s.channel_id, s.sub_brand_id, s.sale_status_desc
+        """), params)
+        await self.db.execute(text("DELETE FROM product_sales_cube WHERE sale_date = ANY(:days)"), params)
+        await self.db.execute(text("""
+            INSERT INTO product_sales_cube (
+                sale_date, product_id, store_id, channel_id, iso_dow, hour,
+                total_revenue, total_quantity
+            )
+            SELECT
+                s.sale_date,
+                ps.product_id,
+                s.store_id,
+                s.channel_id,
+                s.iso_dow,
+                s.hour,
+                COALESCE(SUM(ps.total_price), 0),
+                COALESCE(SUM(ps.quantity), 0)
+            FROM sales s
+            JOIN product_sales ps ON ps.sale_id = s.id
+            WHERE s.sale_status_desc = 'COMPLETED'
+              AND s.sale_date = ANY(:days)
+              AND s.created_at >= :created_at_start AND s.created_at < :created_at_end
+              AND ps.sale_created_at >= :created_at_start AND ps.sale_created_at < :created_at_end
+            GROUP BY s.sale_date, ps.product_id, s.store_id, s.channel_id, s.iso_dow, s.hour
+        """), params)
+        await self.db.execute(text("DELETE FROM sales_time_sketches WHERE sale_date = ANY(:days)"), params)
+        await self.db.execute(text("""
+            INSERT INTO sales_time_sketches (
+                sale_date, grain, store_id, neighborhood, city, measure,
+                sample_count, seconds_sum, buckets, bucket_counts
+            )
+            SELECT
+                sale_date, grain, store_id, neighborhood, city, measure,
+                SUM(sample_count), SUM(seconds_sum),
+                array_agg(bucket ORDER BY bucket), array_agg(sample_count ORDER BY bucket)
+            FROM (
+                SELECT
+                    s.sale_date,
+                    g.grain,
+                    g.store_id,
+                    g.neighborhood,
+                    g.city,
+                    m.measure,
+                    ddsketch_bucket(m.seconds) as bucket,
+                    COUNT(*) as sample_count,
+                    SUM(m.seconds) as seconds_sum
+                FROM sales s
+                LEFT JOIN delivery_addresses da ON da.sale_id = s.id
+                    AND da.sale_created_at >= :created_at_start AND da.sale_created_at < :created_at_end
+                CROSS JOIN LATERAL (VALUES
+                    ('store', s.store_id, CAST(NULL AS VARCHAR), CAST(NULL AS VARCHAR)),
+                    ('neighborhood', NULL, da.neighborhood, NULL),
+                    ('city', NULL, NULL, da.city)
+                ) as g(grain, store_id, neighborhood, city)
+                -- Deliveries only count with an address, as in the delivery performance query.
+                CROSS JOIN LATERAL (VALUES
+                    ('delivery', CASE WHEN da.id IS NOT NULL THEN s.delivery_seconds END),
+                    ('production', s.production_seconds)
+                ) as m(measure, seconds)
+                WHERE s.sale_status_desc = 'COMPLETED'
+                  AND s.sale_date = ANY(:days)
+                  AND s.created_at >= :created_at_start AND s.created_at < :created_at_end
+                  AND m.seconds IS NOT NULL
+                  AND (g.grain = 'store' OR da.id IS NOT NULL)
+                GROUP BY s.sale_date, g.grain, g.store_id, g.neighborhood, g.city, m.measure, bucket
+            ) b
+            GROUP BY sale_date, grain, store_id, neighborhood, city, measure
+        """), params)
+        await self.db.execute(text("DELETE FROM sales_customer_sketches WHERE sale_date = ANY(:days)"), params)
+        await self.db.execute(text("""
+            INSERT INTO sales_customer_sketches (
+                sale_date, store_id, channel_id, customer_sales, register_indexes, register_ranks
+            )
+            SELECT
+                sale_date, store_id, channel_id, SUM(customer_sales),
+                array_agg(register_index ORDER BY register_index), array_agg(register_rank ORDER BY register_index)
+            FROM (
+                SELECT
+                    s.sale_date,
+                    s.store_id,
+                    s.channel_id,
+                    hll_register_index(s.customer_id) as register_index,
+                    MAX(hll_register_rank(s.customer_id)) as register_rank,
+                    COUNT(*) as customer_sales
+                FROM sales s
+                WHERE s.sale_status_desc = 'COMPLETED'
+                  AND s.customer_id IS NOT NULL
+                  AND s.sale_date = ANY(:days)
+                  AND s.created_at >= :created_at_start AND s.created_at < :created_at_end
+                GROUP BY s.sale_date, s.store_id, s.channel_id, register_index
+            ) r
+            GROUP BY sale_date, store_id, channel_id
+        """), params)
+
+    async def _refresh_customers(self, customer_ids: List[int]):
+        params = {"customer_ids": customer_ids}
+        await self.db.execute(text("DELETE FROM customer_stats WHERE customer_id = ANY(:customer_ids)"), params)
+        await self.db.execute(text("""
+            INSERT INTO customer_stats (
+                customer_id, first_purchase_date, last_purchase_date, purchase_count,
+                total_spent, average_ticket, favourite_channel_id, favourite_store_id
+            )
+            WITH history AS (
+                SELECT
+                    s.customer_id, s.store_id, s.channel_id,
+                    MIN(s.sale_date) as first_purchase_date,
+                    MAX(s.sale_date) as last_purchase_date,
+                    COUNT(s.id) as purchase_count,
+                    COALESCE(SUM(s.total_amount), 0) as total_spent
+                FROM sales s
+                WHERE s.sale_status_desc = 'COMPLETED'
+                  AND s.customer_id = ANY(:customer_ids)
+                GROUP BY s.customer_id, s.store_id, s.channel_id
+                UNION ALL
+                -- Months already moved out of sales by partition archival
+                SELECT
+                    a.customer_id, a.store_id, a.channel_id, a.first_purchase_date, a.last_purchase_date,
+                    a.purchase_count, a.total_spent
+                FROM customer_archived_sales a
+                WHERE a.customer_id = ANY(:customer_ids)
+            )
+            SELECT
+                h.customer_id,
+                MIN(h.first_purchase_date),
+                MAX(h.last_purchase_date),
+                SUM(h.purchase_count),
+                SUM(h.total_spent),
+                SUM(h.total_spent) / SUM(h.purchase_count),
+                (
+                    SELECT c.channel_id FROM history c
+                    WHERE c.customer_id = h.customer_id AND c.channel_id IS NOT NULL
+                    GROUP BY c.channel_id ORDER BY SUM(c.purchase_count) DESC, c.channel_id LIMIT 1
+                ),
+                (
+                    SELECT c.store_id FROM history c
+                    WHERE c.customer_id = h.customer_id AND c.store_id IS NOT NULL
+                    GROUP BY c.store_id ORDER BY SUM(c.purchase_count) DESC, c.store_id LIMIT 1
+                )
+            FROM history h
+            GROUP BY h.customer_id
+        """), params)
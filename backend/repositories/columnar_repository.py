@@ -0,0 +1,50 @@
+from datetime import date
+from typing import Any, List, Optional
+from columnar import columnar_store
+
+DELIVERY_DIMENSION_COLUMNS = {
+    'store': 'store_name',
+    'neighborhood': 'neighborhood',
+    'city': 'city'
+}
+
+class ColumnarRepository:
+    """Long-range scans over the Parquet snapshots; mirrors the SQL in SalesRepository."""
+
+    def _time_slice_filters(self, filters: List[str], params: List[Any], day_of_week: Optional[int], start_hour: Optional[int], end_hour: Optional[int]):
+        if day_of_week is not None:
+            filters.append("iso_dow = ?")
+            params.append(day_of_week)
+        if start_hour is not None and end_hour is not None:
+            filters.append("hour BETWEEN ? AND ?")
+            params += [start_hour, end_hour]
+
+    async def get_delivery_performance_by_dimension(self, months: List[date], start_date: date, end_date: date, dimension: str, day_of_week: Optional[int] = None, start_hour: Optional[int] = None, end_hour: Optional[int] = None) -> List[dict]:
+        if dimension not in DELIVERY_DIMENSION_COLUMNS:
+            raise ValueError("Invalid dimension for delivery performance.")
+        source = columnar_store.month_sources("sales", months)
+        if source is None:
+            return []
+        dimension_column = DELIVERY_DIMENSION_COLUMNS[dimension]
+        filters = [
+            "sale_status_desc = 'COMPLETED'",
+            "delivery_seconds IS NOT NULL",
+            "delivery_address_id IS NOT NULL",
+            "sale_date BETWEEN ? AND ?"
+        ]
+        params: List[Any] = [start_date, end_date]
+        self._time_slice_filters(filters, params, day_of_week, start_hour, end_hour)
+        return await columnar_store.query(f"""
+            SELECT
+                {dimension_column} as dimension_name,
+                COALESCE(AVG(delivery_seconds), 0) as average_delivery_seconds,
+                COALESCE(quantile_cont(delivery_seconds, 0.5), 0) as p50_delivery_seconds,
+                COALESCE(quantile_cont(delivery_seconds, 0.9), 0) as p90_delivery_seconds,
+                COALESCE(quantile_cont(delivery_seconds, 0.99), 0) as p99_delivery_seconds,
+                COUNT(*) as total_deliveries
+            FROM {source}
+            WHERE {" AND ".join(filters)}
+            GROUP BY {dimension_column}
+            HAVING COUNT(*) >= 10
+            ORDER BY average_delivery_seconds DESC
+        """, params)
@@ -1,40 +1,105 @@
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
 from datetime import date, timedelta
-from typing import List
+from typing import AsyncIterator, List, Optional, Tuple
+from instrumentation import track_queries
 
+# Ordered on the (last_purchase_date, customer_id) index so pages can resume after a key.
+CHURN_RISK_QUERY = """
+    SELECT
+        cs.customer_id,
+        c.customer_name,
+        cs.purchase_count as total_purchases,
+        cs.last_purchase_date
+    FROM customer_stats cs
+    JOIN customers c ON c.id = cs.customer_id
+    WHERE cs.purchase_count >= :min_purchases
+      AND cs.last_purchase_date <= :inactive_since_date
+      {keyset}
+    ORDER BY cs.last_purchase_date ASC, cs.customer_id ASC
+"""
+
+# Quintile scores (5 = best) over every customer; segments follow the usual
+# recency/frequency grid.
+RFM_SEGMENTS_QUERY = """
+    WITH scored AS (
+        SELECT
+            last_purchase_date,
+            purchase_count,
+            total_spent,
+            NTILE(5) OVER (ORDER BY last_purchase_date) as recency_score,
+            NTILE(5) OVER (ORDER BY purchase_count) as frequency_score,
+            NTILE(5) OVER (ORDER BY total_spent) as monetary_score
+        FROM customer_stats
+    ),
+    segmented AS (
+        SELECT
+            *,
+            CASE
+                WHEN recency_score >= 4 AND frequency_score >= 4 THEN 'champions'
+                WHEN recency_score >= 3 AND frequency_score >= 3 THEN 'loyal'
+                WHEN recency_score >= 4 THEN 'promising'
+                WHEN recency_score <= 2 AND frequency_score >= 4 THEN 'cant_lose'
+                WHEN recency_score <= 2 AND frequency_score >= 2 THEN 'at_risk'
+                WHEN recency_score <= 2 THEN 'hibernating'
+                ELSE 'needs_attention'
+            END as segment
+        FROM scored
+    )
+    SELECT
+        segment,
+        COUNT(*) as customers,
+        AVG(CAST(:today AS DATE) - last_purchase_date) as average_recency_days,
+        AVG(purchase_count) as average_purchases,
+        AVG(total_spent) as average_spent
+    FROM segmented
+    GROUP BY segment
+    ORDER BY AVG(recency_score + frequency_score + monetary_score) DESC
+"""
+
+@track_queries
 class CustomerRepository:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
 
-    def get_churn_risk_customers(self, min_purchases: int, inactive_days: int) -> List[dict]:
+    async def get_churn_risk_customers(self, min_purchases: int, inactive_days: int, limit: int, after: Optional[Tuple[date, int]] = None) -> List[dict]:
+        params = {
+            "min_purchases": min_purchases,
+            "inactive_since_date": date.today() - timedelta(days=inactive_days),
+            "limit": limit
+        }
+        keyset = ""
+        if after:
+            keyset = "AND (cs.last_purchase_date, cs.customer_id) > (:after_date, :after_customer_id)"
+            params["after_date"], params["after_customer_id"] = after
+        query = text(CHURN_RISK_QUERY.format(keyset=keyset) + " LIMIT :limit")
+
+        results = (await self.db.execute(query, params)).fetchall()
+        return [result._asdict() for result in results]
+
+    async def count_churn_risk_customers(self, min_purchases: int, inactive_days: int) -> int:
         query = text("""
-            WITH customer_purchase_summary AS (
-                SELECT
-                    c.id as customer_id,
-                    c.customer_name,
-                    COUNT(s.id) as total_purchases,
-                    MAX(s.created_at)::date as last_purchase_date
-                FROM customers c
-                JOIN sales s ON c.id = s.customer_id
-                WHERE s.sale_status_desc = 'COMPLETED'
-                GROUP BY c.id, c.customer_name
-            )
-            SELECT
-                customer_id,
-                customer_name,
-                total_purchases,
-                last_purchase_date
-            FROM customer_purchase_summary
-            WHERE total_purchases >= :min_purchases
-              AND last_purchase_date <= :inactive_since_date
-            ORDER BY last_purchase_date ASC, total_purchases DESC;
+            SELECT COUNT(*)
+            FROM customer_stats cs
+            JOIN customers c ON c.id = cs.customer_id
+            WHERE cs.purchase_count >= :min_purchases
+              AND cs.last_purchase_date <= :inactive_since_date
         """)
+        params = {
+            "min_purchases": min_purchases,
+            "inactive_since_date": date.today() - timedelta(days=inactive_days)
+        }
+        return int((await self.db.execute(query, params)).scalar())
 
+    async def stream_churn_risk_customers(self, min_purchases: int, inactive_days: int, batch_size: int) -> AsyncIterator[List[dict]]:
         params = {
             "min_purchases": min_purchases,
             "inactive_since_date": date.today() - timedelta(days=inactive_days)
         }
+        result = await self.db.stream(text(CHURN_RISK_QUERY.format(keyset="")), params)
+        async for partition in result.partitions(batch_size):
+            yield [row._asdict() for row in partition]
 
-        results = self.db.execute(query, params).fetchall()
+    async def get_rfm_segments(self) -> List[dict]:
+        results = (await self.db.execute(text(RFM_SEGMENTS_QUERY), {"today": date.today()})).fetchall()
         return [result._asdict() for result in results]
@@ -0,0 +1,25 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import text
+from datetime import date
+from typing import Dict
+from instrumentation import track_queries
+
+@track_queries
+class DataVersionRepository:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def get_day_versions(self, after_version: int = 0) -> Dict[date, int]:
+        query = text("SELECT sale_date, version FROM sales_day_versions WHERE version > :after_version")
+        results = (await self.db.execute(query, {"after_version": after_version})).fetchall()
+        return {result.sale_date: int(result.version) for result in results}
+
+    async def get_month_versions(self, start_date: date, end_date: date) -> Dict[date, int]:
+        query = text("""
+            SELECT CAST(date_trunc('month', sale_date) AS DATE) as month, MAX(version) as version
+            FROM sales_day_versions
+            WHERE sale_date BETWEEN :start_date AND :end_date
+            GROUP BY 1
+        """)
+        results = (await self.db.execute(query, {"start_date": start_date, "end_date": end_date})).fetchall()
+        return {result.month: int(result.version) for result in results}
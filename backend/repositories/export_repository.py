@@ -0,0 +1,86 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import text
+from datetime import date
+from typing import AsyncIterator, List
+from repositories.sales_repository import created_at_bounds
+from instrumentation import track_queries
+
+# Arbitrary key shared by every worker so only one of them exports at a time.
+COLUMNAR_EXPORT_LOCK_ID = 7310004
+
+FACT_QUERIES = {
+    "sales": """
+        SELECT
+            s.id as sale_id,
+            s.created_at,
+            s.sale_date,
+            s.iso_dow,
+            s.hour,
+            s.store_id,
+            st.name as store_name,
+            s.channel_id,
+            s.sub_brand_id,
+            s.customer_id,
+            s.sale_status_desc,
+            s.total_amount,
+            s.total_discount,
+            s.delivery_fee,
+            s.service_tax_fee,
+            s.production_seconds,
+            s.delivery_seconds,
+            da.id as delivery_address_id,
+            da.neighborhood,
+            da.city
+        FROM sales s
+        LEFT JOIN stores st ON st.id = s.store_id
+        LEFT JOIN LATERAL (
+            SELECT a.id, a.neighborhood, a.city
+            FROM delivery_addresses a
+            WHERE a.sale_id = s.id
+            ORDER BY a.id
+            LIMIT 1
+        ) da ON TRUE
+        WHERE s.created_at >= :created_at_start AND s.created_at < :created_at_end
+    """,
+    "product_sales": """
+        SELECT
+            ps.sale_id,
+            ps.product_id,
+            s.sale_date,
+            s.iso_dow,
+            s.hour,
+            s.store_id,
+            s.channel_id,
+            s.sale_status_desc,
+            ps.quantity,
+            ps.total_price
+        FROM product_sales ps
+        JOIN sales s ON s.id = ps.sale_id
+        WHERE s.created_at >= :created_at_start AND s.created_at < :created_at_end
+          AND ps.sale_created_at >= :created_at_start AND ps.sale_created_at < :created_at_end
+    """
+}
+
+@track_queries
+class ExportRepository:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def try_lock(self) -> bool:
+        locked = (await self.db.execute(
+            text("SELECT pg_try_advisory_xact_lock(:lock_id)"),
+            {"lock_id": COLUMNAR_EXPORT_LOCK_ID}
+        )).scalar()
+        if locked:
+            # A month of a large tenant can take longer than the API statement timeout.
+            await self.db.execute(text("SET LOCAL statement_timeout = 0"))
+        return bool(locked)
+
+    async def stream_fact_rows(self, fact: str, start_date: date, end_date: date, batch_size: int) -> AsyncIterator[List[dict]]:
+        # Server-side cursor: only one batch of rows is in memory at a time.
+        result = await self.db.stream(text(FACT_QUERIES[fact]), created_at_bounds(start_date, end_date))
+        async for partition in result.partitions(batch_size):
+            yield [row._asdict() for row in partition]
+
+    async def release(self):
+        await self.db.rollback()
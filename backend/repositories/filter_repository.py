@@ -1,17 +1,19 @@
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
 from typing import List
+from instrumentation import track_queries
 
+@track_queries
 class FilterRepository:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
 
-    def get_all_channels(self) -> List[dict]:
+    async def get_all_channels(self) -> List[dict]:
         query = text("SELECT id, name FROM channels ORDER BY name ASC")
-        results = self.db.execute(query).fetchall()
+        results = (await self.db.execute(query)).fetchall()
         return [result._asdict() for result in results]
 
-    def get_all_stores(self) -> List[dict]:
+    async def get_all_stores(self) -> List[dict]:
         query = text("SELECT id, name FROM stores ORDER BY name ASC")
-        results = self.db.execute(query).fetchall()
+        results = (await self.db.execute(query)).fetchall()
         return [result._asdict() for result in results]
@@ -1,16 +1,18 @@
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
+from instrumentation import track_queries
 
+@track_queries
 class GoalRepository:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
 
-    def get_average_ticket_goal(self) -> float:
+    async def get_average_ticket_goal(self) -> float:
         query = text("SELECT goal_value FROM goals WHERE goal_name = 'average_ticket_goal'")
-        result = self.db.execute(query).scalar()
+        result = (await self.db.execute(query)).scalar()
         return result if result is not None else 0.0
 
-    def set_average_ticket_goal(self, goal_value: float):
+    async def set_average_ticket_goal(self, goal_value: float):
         query = text("UPDATE goals SET goal_value = :goal_value WHERE goal_name = 'average_ticket_goal'")
-        self.db.execute(query, {"goal_value": goal_value, "goal_name": "average_ticket_goal"})
-        self.db.commit()
+        await self.db.execute(query, {"goal_value": goal_value, "goal_name": "average_ticket_goal"})
+        await self.db.commit()
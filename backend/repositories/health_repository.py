@@ -1,13 +1,15 @@
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
+from instrumentation import track_queries
 
+@track_queries
 class HealthRepository:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
 
-    def check_db_connection(self) -> bool:
+    async def check_db_connection(self) -> bool:
         try:
-            self.db.execute(text("SELECT 1"))
+            await self.db.execute(text("SELECT 1"))
             return True
         except Exception:
             return False
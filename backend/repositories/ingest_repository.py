@@ -0,0 +1,72 @@
+import time
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import text
+from typing import Dict, List, Sequence, Tuple
+from instrumentation import record_statement, track_queries
+
+# Referenced table per kind of id a batch can carry
+REFERENCE_TABLES = {
+    "store": "stores",
+    "channel": "channels",
+    "customer": "customers",
+    "product": "products",
+    "item": "items",
+    "option_group": "option_groups"
+}
+
+@track_queries
+class IngestRepository:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def get_missing_references(self, ids: Dict[str, List[int]]) -> List[Tuple[str, int]]:
+        """(kind, id) for every referenced id that does not exist, in one round trip."""
+        kinds = [kind for kind in REFERENCE_TABLES if ids.get(kind)]
+        if not kinds:
+            return []
+        query = text(" UNION ALL ".join(
+            f"""
+            SELECT '{kind}' as kind, r.id
+            FROM unnest(CAST(:{kind}_ids AS INTEGER[])) as r(id)
+            WHERE NOT EXISTS (SELECT 1 FROM {REFERENCE_TABLES[kind]} t WHERE t.id = r.id)
+            """
+            for kind in kinds
+        ))
+        results = (await self.db.execute(query, {f"{kind}_ids": ids[kind] for kind in kinds})).fetchall()
+        return [(result.kind, result.id) for result in results]
+
+    async def get_payment_type_ids(self) -> Dict[str, int]:
+        results = (await self.db.execute(text("SELECT id, description FROM payment_types ORDER BY id"))).fetchall()
+        payment_type_ids = {}
+        for result in results:
+            payment_type_ids.setdefault(result.description, result.id)
+        return payment_type_ids
+
+    async def reserve_ids(self, counts: Dict[str, int]) -> Dict[str, List[int]]:
+        # Ids are taken up front so children can be written with COPY without RETURNING.
+        query = text("""
+            SELECT t.name, ARRAY(
+                SELECT nextval(pg_get_serial_sequence(t.name, 'id'))
+                FROM generate_series(1, t.row_count)
+            ) as ids
+            FROM unnest(CAST(:tables AS TEXT[]), CAST(:row_counts AS INTEGER[])) as t(name, row_count)
+        """)
+        results = (await self.db.execute(query, {"tables": list(counts), "row_counts": list(counts.values())})).fetchall()
+        return {result.name: result.ids for result in results}
+
+    async def copy_rows(self, table: str, columns: Sequence[str], rows: List[tuple]):
+        if not rows:
+            return
+        # Runs on the session's connection, inside its open transaction.
+        connection = await self.db.connection()
+        driver_connection = (await connection.get_raw_connection()).driver_connection
+        # COPY goes straight to the driver, past the engine's cursor hooks.
+        started = time.perf_counter()
+        await driver_connection.copy_records_to_table(table, records=rows, columns=list(columns))
+        record_statement((time.perf_counter() - started) * 1000, len(rows))
+
+    async def commit(self):
+        await self.db.commit()
+
+    async def rollback(self):
+        await self.db.rollback()
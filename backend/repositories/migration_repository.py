@@ -0,0 +1,48 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import text
+from typing import Dict
+from instrumentation import track_queries
+
+# Arbitrary key shared by every worker so only one of them migrates at a time.
+MIGRATION_LOCK_ID = 7310002
+
+@track_queries
+class MigrationRepository:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def lock(self):
+        # Blocks until the worker holding the lock commits, so nobody starts on a half-migrated schema.
+        await self.db.execute(text("SELECT pg_advisory_xact_lock(:lock_id)"), {"lock_id": MIGRATION_LOCK_ID})
+        # Index builds on a large sales table can outlive the API statement timeout.
+        await self.db.execute(text("SET LOCAL statement_timeout = 0"))
+
+    async def ensure_migrations_table(self):
+        await self.db.execute(text("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version VARCHAR(255) PRIMARY KEY,
+                checksum VARCHAR(64) NOT NULL,
+                applied_at TIMESTAMP NOT NULL DEFAULT NOW()
+            )
+        """))
+
+    async def get_applied_migrations(self) -> Dict[str, str]:
+        results = (await self.db.execute(text("SELECT version, checksum FROM schema_migrations"))).fetchall()
+        return {result.version: result.checksum for result in results}
+
+    async def apply_migration(self, version: str, checksum: str, sql: str):
+        # Migration files hold several statements and dollar-quoted bodies, which
+        # text() cannot bind-parse; run them as a simple query on the driver connection.
+        connection = await self.db.connection()
+        raw_connection = await connection.get_raw_connection()
+        await raw_connection.driver_connection.execute(sql)
+        await self.db.execute(
+            text("INSERT INTO schema_migrations (version, checksum) VALUES (:version, :checksum)"),
+            {"version": version, "checksum": checksum}
+        )
+
+    async def commit(self):
+        await self.db.commit()
+
+    async def rollback(self):
+        await self.db.rollback()
@@ -0,0 +1,187 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import text
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+from instrumentation import track_queries
+
+# Arbitrary key shared by every worker so only one of them changes partitions at a time.
+PARTITION_LOCK_ID = 7310003
+
+# (table, partition column, [(foreign key column, referenced table)]).
+# Parents come before the tables that reference them.
+PARTITIONED_TABLES: List[Tuple[str, str, List[Tuple[str, str]]]] = [
+    ("sales", "created_at", []),
+    ("product_sales", "sale_created_at", [("sale_id", "sales")]),
+    ("item_product_sales", "sale_created_at", [("product_sale_id", "product_sales")]),
+    ("item_item_product_sales", "sale_created_at", [("item_product_sale_id", "item_product_sales")]),
+    ("payments", "sale_created_at", [("sale_id", "sales")]),
+    ("delivery_sales", "sale_created_at", [("sale_id", "sales")]),
+    ("delivery_addresses", "sale_created_at", [("sale_id", "sales"), ("delivery_sale_id", "delivery_sales")]),
+]
+PARTITION_COLUMNS = {table: column for table, column, _ in PARTITIONED_TABLES}
+ARCHIVE_SCHEMA = "archive"
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_p{month.strftime('%Y%m')}"
+
+def partition_month(table: str, name: str) -> Optional[date]:
+    suffix = name[len(table) + 2:]
+    if not name.startswith(f"{table}_p") or len(suffix) != 6 or not suffix.isdigit():
+        return None
+    return date(int(suffix[:4]), int(suffix[4:]), 1)
+
+@track_queries
+class PartitionRepository:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def lock(self):
+        await self.db.execute(text("SELECT pg_advisory_xact_lock(:lock_id)"), {"lock_id": PARTITION_LOCK_ID})
+        # Converting or detaching copies whole tables; no API timeout applies here.
+        await self.db.execute(text("SET LOCAL statement_timeout = 0"))
+
+    async def is_partitioned(self, table: str) -> bool:
+        query = text("""
+            SELECT EXISTS (
+                SELECT 1 FROM pg_partitioned_table pt
+                JOIN pg_class c ON c.oid = pt.partrelid
+                WHERE c.oid = to_regclass(:table)
+            )
+        """)
+        return bool((await self.db.execute(query, {"table": table})).scalar())
+
+    async def get_partitions(self, table: str) -> List[str]:
+        query = text("""
+            SELECT c.relname
+            FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = to_regclass(:table)
+            ORDER BY c.relname
+        """)
+        results = (await self.db.execute(query, {"table": table})).fetchall()
+        return [result.relname for result in results]
+
+    async def count_missing_partition_keys(self, table: str, column: str) -> int:
+        return int((await self.db.execute(text(f"SELECT COUNT(*) FROM {table} WHERE {column} IS NULL"))).scalar())
+
+    async def get_first_month(self) -> Optional[date]:
+        result = (await self.db.execute(text("SELECT MIN(created_at) FROM sales"))).scalar()
+        return result.date().replace(day=1) if result else None
+
+    async def get_table_definitions(self, table: str, partitioned_tables: List[str]) -> Dict[str, List[str]]:
+        # Everything LIKE does not copy: secondary indexes, triggers and the foreign
+        # keys to tables that stay unpartitioned (the others are rebuilt as composites).
+        params = {"table": table, "partitioned_tables": partitioned_tables}
+        indexes = (await self.db.execute(text("""
+            SELECT pg_get_indexdef(i.indexrelid) as definition
+            FROM pg_index i
+            WHERE i.indrelid = to_regclass(:table) AND NOT i.indisprimary
+        """), params)).fetchall()
+        triggers = (await self.db.execute(text("""
+            SELECT pg_get_triggerdef(t.oid) as definition
+            FROM pg_trigger t
+            WHERE t.tgrelid = to_regclass(:table) AND NOT t.tgisinternal
+        """), params)).fetchall()
+        foreign_keys = (await self.db.execute(text("""
+            SELECT format('ALTER TABLE %I ADD CONSTRAINT %I %s', CAST(:table AS TEXT), c.conname, pg_get_constraintdef(c.oid)) as definition
+            FROM pg_constraint c
+            WHERE c.conrelid = to_regclass(:table) AND c.contype = 'f'
+              AND c.confrelid::regclass::text <> ALL(:partitioned_tables)
+        """), params)).fetchall()
+        return {
+            "indexes": [result.definition for result in indexes],
+            "triggers": [result.definition for result in triggers],
+            "foreign_keys": [result.definition for result in foreign_keys]
+        }
+
+    async def get_id_sequence(self, table: str) -> Optional[str]:
+        return (await self.db.execute(text("SELECT pg_get_serial_sequence(:table, 'id')"), {"table": table})).scalar()
+
+    async def set_sequence_owner(self, sequence: str, owner: Optional[str]):
+        await self.db.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY {owner or 'NONE'}"))
+
+    async def rename_table(self, table: str, new_name: str):
+        await self.db.execute(text(f"ALTER TABLE {table} RENAME TO {new_name}"))
+
+    async def create_partitioned_table(self, table: str, column: str, source: str):
+        await self.db.execute(text(f"""
+            CREATE TABLE {table} (LIKE {source} INCLUDING DEFAULTS INCLUDING GENERATED INCLUDING STORAGE)
+            PARTITION BY RANGE ({column})
+        """))
+
+    async def create_month_partition(self, table: str, month: date, next_month: date) -> bool:
+        name = partition_name(table, month)
+        if (await self.db.execute(text("SELECT to_regclass(:name)"), {"name": name})).scalar():
+            return False
+        await self.db.execute(text(
+            f"CREATE TABLE {name} PARTITION OF {table} FOR VALUES FROM ('{month}') TO ('{next_month}')"
+        ))
+        return True
+
+    async def copy_rows(self, table: str, source: str):
+        # Generated columns cannot be inserted into; they are recomputed.
+        columns = (await self.db.execute(text("""
+            SELECT string_agg(quote_ident(attname), ', ' ORDER BY attnum)
+            FROM pg_attribute
+            WHERE attrelid = to_regclass(:source) AND attnum > 0
+              AND NOT attisdropped AND attgenerated = ''
+        """), {"source": source})).scalar()
+        await self.db.execute(text(f"INSERT INTO {table} ({columns}) SELECT {columns} FROM {source}"))
+
+    async def drop_table(self, table: str):
+        await self.db.execute(text(f"DROP TABLE {table} CASCADE"))
+
+    async def add_primary_key(self, table: str, column: str):
+        await self.db.execute(text(f"ALTER TABLE {table} ADD PRIMARY KEY (id, {column})"))
+
+    async def add_aligned_foreign_key(self, table: str, column: str, fk_column: str, referenced_table: str):
+        await self.db.execute(text(f"""
+            ALTER TABLE {table} ADD CONSTRAINT {table}_{fk_column}_fkey
+            FOREIGN KEY ({fk_column}, {column})
+            REFERENCES {referenced_table} (id, {PARTITION_COLUMNS[referenced_table]})
+        """))
+
+    async def execute_definition(self, definition: str):
+        await self.db.execute(text(definition.replace(":", "\\:")))
+
+    async def analyze(self, table: str):
+        await self.db.execute(text(f"ANALYZE {table}"))
+
+    async def fold_customer_sales(self, partition: str):
+        # customer_stats is recomputed from attached sales, so what leaves is carried forward.
+        await self.db.execute(text(f"""
+            INSERT INTO customer_archived_sales (
+                customer_id, store_id, channel_id, first_purchase_date, last_purchase_date, purchase_count, total_spent
+            )
+            SELECT customer_id, store_id, channel_id, MIN(sale_date), MAX(sale_date), COUNT(id), COALESCE(SUM(total_amount), 0)
+            FROM {partition}
+            WHERE sale_status_desc = 'COMPLETED' AND customer_id IS NOT NULL
+            GROUP BY customer_id, store_id, channel_id
+            ON CONFLICT (customer_id, store_id, channel_id) DO UPDATE SET
+                first_purchase_date = LEAST(customer_archived_sales.first_purchase_date, EXCLUDED.first_purchase_date),
+                last_purchase_date = GREATEST(customer_archived_sales.last_purchase_date, EXCLUDED.last_purchase_date),
+                purchase_count = customer_archived_sales.purchase_count + EXCLUDED.purchase_count,
+                total_spent = customer_archived_sales.total_spent + EXCLUDED.total_spent
+        """))
+
+    async def detach_partition(self, table: str, partition: str):
+        await self.db.execute(text(f"ALTER TABLE {table} DETACH PARTITION {partition}"))
+        # A detached line-item partition would otherwise keep pinning the sales rows
+        # it references and block detaching that month of sales.
+        foreign_keys = (await self.db.execute(text("""
+            SELECT conname FROM pg_constraint
+            WHERE conrelid = to_regclass(:partition) AND contype = 'f'
+              AND confrelid::regclass::text = ANY(:partitioned_tables)
+        """), {"partition": partition, "partitioned_tables": list(PARTITION_COLUMNS)})).fetchall()
+        for foreign_key in foreign_keys:
+            await self.db.execute(text(f"ALTER TABLE {partition} DROP CONSTRAINT {foreign_key.conname}"))
+
+    async def archive_partition(self, partition: str):
+        await self.db.execute(text(f"CREATE SCHEMA IF NOT EXISTS {ARCHIVE_SCHEMA}"))
+        await self.db.execute(text(f"ALTER TABLE {partition} SET SCHEMA {ARCHIVE_SCHEMA}"))
+
+    async def commit(self):
+        await self.db.commit()
+
+    async def rollback(self):
+        await self.db.rollback()
@@ -0,0 +1,168 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import text
+from datetime import date
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+from repositories.sales_repository import created_at_bounds
+from instrumentation import track_queries
+
+class Dimension(NamedTuple):
+    description: str
+    # Display column returned next to the key, and the joins it needs.
+    label: Optional[str] = None
+    joins: Tuple[str, ...] = ()
+    value_type: str = "INTEGER"
+
+class Source(NamedTuple):
+    conditions: Tuple[str, ...]
+    # dimension -> (key expression, joins needed to compute it)
+    dimensions: Dict[str, Tuple[str, Tuple[str, ...]]]
+    metrics: Dict[str, str]
+
+METRICS = {
+    'revenue': "Total amount of completed sales",
+    'sales_count': "Number of completed sales",
+    'average_ticket': "Average amount per completed sale",
+    'average_delivery_seconds': "Average delivery time in seconds",
+    'p90_delivery_seconds': "90th percentile of delivery time in seconds",
+    'product_revenue': "Revenue of the products sold (line totals)",
+    'quantity': "Units of products sold"
+}
+
+DIMENSIONS = {
+    'date': Dimension("Sale date", value_type="DATE"),
+    'hour': Dimension("Hour of the day (0-23)"),
+    'weekday': Dimension("ISO day of the week (1=Monday, 7=Sunday)"),
+    'store': Dimension("Store", "st.name", ("LEFT JOIN stores st ON st.id = f.store_id",)),
+    'channel': Dimension("Sales channel", "ch.name", ("LEFT JOIN channels ch ON ch.id = f.channel_id",)),
+    'product': Dimension("Product", "p.name"),
+    'category': Dimension("Product category", "cat.name", ("LEFT JOIN categories cat ON cat.id = p.category_id",)),
+    'neighborhood': Dimension("Delivery neighborhood", value_type="TEXT"),
+    'city': Dimension("Delivery city", value_type="TEXT")
+}
+
+PRODUCT_JOIN = "JOIN products p ON p.id = f.product_id"
+DELIVERY_ADDRESS_JOIN = (
+    "JOIN delivery_addresses da ON da.sale_id = f.id"
+    " AND da.sale_created_at >= :created_at_start AND da.sale_created_at < :created_at_end"
+)
+
+# Smallest first: a query goes to the first source that has every metric,
+# dimension and filter it asks for, so raw sales is only read as a fallback.
+SOURCES: Dict[str, Source] = {
+    'sales_daily_rollup': Source(
+        conditions=("f.sale_status_desc = 'COMPLETED'", "f.sale_date BETWEEN :start_date AND :end_date"),
+        dimensions={
+            'date': ("f.sale_date", ()),
+            'weekday': ("CAST(EXTRACT(ISODOW FROM f.sale_date) AS INTEGER)", ()),
+            'store': ("f.store_id", ()),
+            'channel': ("f.channel_id", ())
+        },
+        metrics={
+            'revenue': "COALESCE(SUM(f.total_amount_sum), 0)",
+            'sales_count': "COALESCE(SUM(f.sales_count), 0)",
+            'average_ticket': "COALESCE(SUM(f.total_amount_sum) / NULLIF(SUM(f.sales_count), 0), 0)",
+            'average_delivery_seconds': "SUM(f.delivery_seconds_sum) / NULLIF(SUM(f.delivery_count), 0)"
+        }
+    ),
+    'product_sales_cube': Source(
+        conditions=("f.sale_date BETWEEN :start_date AND :end_date",),
+        dimensions={
+            'date': ("f.sale_date", ()),
+            'hour': ("f.hour", ()),
+            'weekday': ("f.iso_dow", ()),
+            'store': ("f.store_id", ()),
+            'channel': ("f.channel_id", ()),
+            'product': ("f.product_id", (PRODUCT_JOIN,)),
+            'category': ("p.category_id", (PRODUCT_JOIN,))
+        },
+        metrics={
+            'product_revenue': "COALESCE(SUM(f.total_revenue), 0)",
+            'quantity': "COALESCE(SUM(f.total_quantity), 0)"
+        }
+    ),
+    'sales': Source(
+        conditions=(
+            "f.sale_status_desc = 'COMPLETED'",
+            "f.sale_date BETWEEN :start_date AND :end_date",
+            "f.created_at >= :created_at_start AND f.created_at < :created_at_end"
+        ),
+        dimensions={
+            'date': ("f.sale_date", ()),
+            'hour': ("f.hour", ()),
+            'weekday': ("f.iso_dow", ()),
+            'store': ("f.store_id", ()),
+            'channel': ("f.channel_id", ()),
+            'neighborhood': ("da.neighborhood", (DELIVERY_ADDRESS_JOIN,)),
+            'city': ("da.city", (DELIVERY_ADDRESS_JOIN,))
+        },
+        metrics={
+            'revenue': "COALESCE(SUM(f.total_amount), 0)",
+            'sales_count': "COUNT(f.id)",
+            'average_ticket': "COALESCE(AVG(f.total_amount), 0)",
+            'average_delivery_seconds': "AVG(f.delivery_seconds)",
+            'p90_delivery_seconds': "PERCENTILE_CONT(0.9) WITHIN GROUP (ORDER BY f.delivery_seconds)"
+        }
+    )
+}
+
+def choose_source(metrics: List[str], dimensions: List[str]) -> str:
+    for name, source in SOURCES.items():
+        if all(metric in source.metrics for metric in metrics) and all(dimension in source.dimensions for dimension in dimensions):
+            return name
+    raise ValueError(f"No table can answer {', '.join(metrics)} by {', '.join(dimensions)}; see /analytics/query/catalog for the metrics each dimension supports.")
+
+def compile_query(source_name: str, metrics: List[str], dimensions: List[str], filters: Dict[str, List[Any]], order_by: Optional[str], descending: bool) -> str:
+    source = SOURCES[source_name]
+    joins: List[str] = []
+    select_columns: List[str] = []
+    group_by: List[str] = []
+    for dimension in dimensions + list(filters):
+        key, key_joins = source.dimensions[dimension]
+        joins += [join for join in key_joins if join not in joins]
+    for dimension in dimensions:
+        key, _ = source.dimensions[dimension]
+        definition = DIMENSIONS[dimension]
+        joins += [join for join in definition.joins if join not in joins]
+        if definition.label:
+            select_columns += [f"{key} as {dimension}_id", f"{definition.label} as {dimension}"]
+            group_by += [key, definition.label]
+        else:
+            select_columns.append(f"{key} as {dimension}")
+            group_by.append(key)
+    select_columns += [f"{source.metrics[metric]} as {metric}" for metric in metrics]
+
+    where_clauses = list(source.conditions)
+    for dimension in filters:
+        key, _ = source.dimensions[dimension]
+        where_clauses.append(f"{key} = ANY(CAST(:filter_{dimension} AS {DIMENSIONS[dimension].value_type}[]))")
+
+    query = f"""
+        SELECT {", ".join(select_columns)}
+        FROM {source_name} f
+        {" ".join(joins)}
+        WHERE {" AND ".join(where_clauses)}
+    """
+    if group_by:
+        query += f" GROUP BY {', '.join(group_by)}"
+    if order_by:
+        query += f" ORDER BY {order_by} {'DESC' if descending else 'ASC'} NULLS LAST"
+    elif dimensions:
+        query += f" ORDER BY {', '.join(dimensions)}"
+    return query + " LIMIT :limit"
+
+@track_queries
+class QueryRepository:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def run_query(self, source_name: str, start_date: date, end_date: date, metrics: List[str], dimensions: List[str], filters: Dict[str, List[Any]], order_by: Optional[str], descending: bool, limit: int) -> List[dict]:
+        query = text(compile_query(source_name, metrics, dimensions, filters, order_by, descending))
+        params = {
+            "start_date": start_date,
+            "end_date": end_date,
+            "limit": limit,
+            **created_at_bounds(start_date, end_date),
+            **{f"filter_{dimension}": values for dimension, values in filters.items()}
+        }
+        results = (await self.db.execute(query, params)).fetchall()
+        return [result._asdict() for result in results]
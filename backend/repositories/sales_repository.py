@@ -1,75 +1,181 @@
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
-from datetime import date, timedelta
-from typing import List, Optional
+from datetime import date, datetime, time, timedelta
+from typing import List, Optional, Tuple
+from dateutil.relativedelta import relativedelta
+from columnar import columnar_store, month_starts
+from repositories.columnar_repository import ColumnarRepository
+from repositories.data_version_repository import DataVersionRepository
+from config import COLUMNAR_MIN_RANGE_DAYS
+from instrumentation import track_queries
 
+def created_at_bounds(start_date: date, end_date: date) -> dict:
+    # The same range as sale_date, stated on the partition keys (sales.created_at and
+    # the line tables' sale_created_at) so partitioned tables can be pruned.
+    return {
+        "created_at_start": datetime.combine(start_date, time.min),
+        "created_at_end": datetime.combine(end_date + timedelta(days=1), time.min)
+    }
+
+# dimension -> (name column, join) over sales_time_sketches k
+SKETCH_DIMENSIONS = {
+    'store': ("st.name", "LEFT JOIN stores st ON st.id = k.store_id"),
+    'neighborhood': ("k.neighborhood", ""),
+    'city': ("k.city", "")
+}
+
+# HyperLogLog register count of sales_customer_sketches (see migration 0007).
+HLL_REGISTERS = 2048
+HLL_ALPHA = 0.7213 / (1 + 1.079 / HLL_REGISTERS)
+
+@track_queries
 class SalesRepository:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
+        self.columnar_repository = ColumnarRepository()
+
+    async def _columnar_cold_end(self, start_date: date, end_date: date) -> Optional[date]:
+        # Last day of the leading run of closed months whose Parquet snapshot is
+        # current. Short ranges stay in Postgres, and so does anything an aggregate
+        # answers: the snapshots are only for what must otherwise read raw rows.
+        if not columnar_store.enabled or (end_date - start_date).days + 1 < COLUMNAR_MIN_RANGE_DAYS:
+            return None
+        current_month = date.today().replace(day=1)
+        versions = await DataVersionRepository(self.db).get_month_versions(start_date.replace(day=1), end_date)
+        cold_end = None
+        for month in month_starts(start_date, end_date):
+            if month >= current_month or not columnar_store.is_fresh(month, versions.get(month, 0)):
+                break
+            cold_end = min(end_date, month + relativedelta(months=1) - timedelta(days=1))
+        return cold_end
 
-    def get_sales_overview(self, start_date: date, end_date: date) -> dict:
+    async def get_sales_overview(self, start_date: date, end_date: date) -> dict:
         query = text("""
             SELECT
-                COALESCE(SUM(s.total_amount), 0) as total_revenue,
-                COALESCE(COUNT(s.id), 0) as total_sales_count,
-                COALESCE(AVG(s.total_amount), 0) as average_ticket_value
-            FROM sales s
-            WHERE s.sale_status_desc = 'COMPLETED'
-              AND s.created_at >= :start_date
-              AND s.created_at < :end_date_plus_one
+                COALESCE(SUM(r.total_amount_sum), 0) as total_revenue,
+                COALESCE(SUM(r.sales_count), 0) as total_sales_count,
+                COALESCE(SUM(r.total_amount_sum) / NULLIF(SUM(r.sales_count), 0), 0) as average_ticket_value
+            FROM sales_daily_rollup r
+            WHERE r.sale_status_desc = 'COMPLETED'
+              AND r.sale_date BETWEEN :start_date AND :end_date
         """)
-        result = self.db.execute(query, {
+        result = (await self.db.execute(query, {
             "start_date": start_date,
-            "end_date_plus_one": end_date + timedelta(days=1)
-        }).fetchone()
+            "end_date": end_date
+        })).fetchone()
         return result._asdict() if result else {
             "total_revenue": 0,
             "total_sales_count": 0,
             "average_ticket_value": 0
         }
 
-    def get_top_products(self, start_date: date, end_date: date, limit: int, channel_id: Optional[int] = None, store_id: Optional[int] = None, day_of_week: Optional[int] = None, start_hour: Optional[int] = None, end_hour: Optional[int] = None) -> List[dict]:
+    async def get_period_comparison(self, periods: List[Tuple[date, date]]) -> List[dict]:
+        # One scan over the union of the periods; each period is a FILTERed aggregate.
+        params, columns = self._period_filters(periods)
+        query = text(f"""
+            SELECT {", ".join(columns)}
+            FROM sales_daily_rollup r
+            WHERE r.sale_status_desc = 'COMPLETED'
+              AND r.sale_date BETWEEN :range_start AND :range_end
+        """)
+        result = (await self.db.execute(query, params)).fetchone()
+        return self._split_periods(result._asdict(), len(periods))
+
+    async def get_sales_breakdown_comparison(self, periods: List[Tuple[date, date]], dimension: str) -> List[dict]:
+        if dimension not in ['channel', 'store']:
+            raise ValueError("Invalid dimension specified. Must be 'channel' or 'store'.")
+        dimension_table = "channels" if dimension == 'channel' else "stores"
+        dimension_fk = f"{dimension}_id"
+        params, columns = self._period_filters(periods)
+        query = text(f"""
+            SELECT
+                d.id as dimension_id,
+                d.name as dimension_name,
+                {", ".join(columns)}
+            FROM sales_daily_rollup r
+            JOIN {dimension_table} d ON r.{dimension_fk} = d.id
+            WHERE r.sale_status_desc = 'COMPLETED'
+              AND r.sale_date BETWEEN :range_start AND :range_end
+            GROUP BY d.id, d.name
+            ORDER BY total_revenue_0 DESC
+        """)
+        results = (await self.db.execute(query, params)).fetchall()
+        breakdown = []
+        for result in results:
+            row = result._asdict()
+            breakdown.append({
+                "dimension_id": row["dimension_id"],
+                "dimension_name": row["dimension_name"],
+                "periods": self._split_periods(row, len(periods))
+            })
+        return breakdown
+
+    @staticmethod
+    def _period_filters(periods: List[Tuple[date, date]]) -> Tuple[dict, List[str]]:
+        params = {
+            "range_start": min(start_date for start_date, _ in periods),
+            "range_end": max(end_date for _, end_date in periods)
+        }
+        columns = []
+        for i, (start_date, end_date) in enumerate(periods):
+            params[f"start_date_{i}"] = start_date
+            params[f"end_date_{i}"] = end_date
+            in_period = f"FILTER (WHERE r.sale_date BETWEEN :start_date_{i} AND :end_date_{i})"
+            columns += [
+                f"COALESCE(SUM(r.total_amount_sum) {in_period}, 0) as total_revenue_{i}",
+                f"COALESCE(SUM(r.sales_count) {in_period}, 0) as total_sales_count_{i}",
+                f"COALESCE(SUM(r.total_amount_sum) {in_period} / NULLIF(SUM(r.sales_count) {in_period}, 0), 0) as average_ticket_value_{i}"
+            ]
+        return params, columns
+
+    @staticmethod
+    def _split_periods(row: dict, count: int) -> List[dict]:
+        return [
+            {
+                "total_revenue": row[f"total_revenue_{i}"],
+                "total_sales_count": row[f"total_sales_count_{i}"],
+                "average_ticket_value": row[f"average_ticket_value_{i}"]
+            }
+            for i in range(count)
+        ]
+
+    async def get_top_products(self, start_date: date, end_date: date, limit: int, channel_id: Optional[int] = None, store_id: Optional[int] = None, day_of_week: Optional[int] = None, start_hour: Optional[int] = None, end_hour: Optional[int] = None) -> List[dict]:
         params = {
             "start_date": start_date,
-            "end_date_plus_one": end_date + timedelta(days=1),
+            "end_date": end_date,
             "limit": limit
         }
-        query_str = """
-            SELECT
-                p.id as product_id,
-                p.name as product_name,
-                SUM(ps.total_price) as total_revenue,
-                SUM(ps.quantity) as total_sales_count
-            FROM product_sales ps
-            JOIN products p ON ps.product_id = p.id
-            JOIN sales s ON ps.sale_id = s.id
-            WHERE s.sale_status_desc = 'COMPLETED'
-              AND s.created_at >= :start_date
-              AND s.created_at < :end_date_plus_one
-        """
+        where_clauses = ["c.sale_date BETWEEN :start_date AND :end_date"]
         if channel_id:
-            query_str += " AND s.channel_id = :channel_id"
+            where_clauses.append("c.channel_id = :channel_id")
             params["channel_id"] = channel_id
         if store_id:
-            query_str += " AND s.store_id = :store_id"
+            where_clauses.append("c.store_id = :store_id")
             params["store_id"] = store_id
         if day_of_week is not None:
-            query_str += " AND EXTRACT(ISODOW FROM s.created_at) = :day_of_week"
+            where_clauses.append("c.iso_dow = :day_of_week")
             params["day_of_week"] = day_of_week
         if start_hour is not None and end_hour is not None:
-            query_str += " AND EXTRACT(HOUR FROM s.created_at) BETWEEN :start_hour AND :end_hour"
+            where_clauses.append("c.hour BETWEEN :start_hour AND :end_hour")
             params["start_hour"] = start_hour
             params["end_hour"] = end_hour
-        query_str += """
+        query = text(f"""
+            SELECT
+                p.id as product_id,
+                p.name as product_name,
+                SUM(c.total_revenue) as total_revenue,
+                SUM(c.total_quantity) as total_sales_count
+            FROM product_sales_cube c
+            JOIN products p ON c.product_id = p.id
+            WHERE {" AND ".join(where_clauses)}
             GROUP BY p.id, p.name
             ORDER BY total_revenue DESC
             LIMIT :limit
-        """
-        query = text(query_str)
-        results = self.db.execute(query, params).fetchall()
+        """)
+        results = (await self.db.execute(query, params)).fetchall()
         return [result._asdict() for result in results]
 
-    def get_sales_breakdown_by_dimension(self, start_date: date, end_date: date, dimension: str) -> List[dict]:
+    async def get_sales_breakdown_by_dimension(self, start_date: date, end_date: date, dimension: str) -> List[dict]:
         if dimension not in ['channel', 'store']:
             raise ValueError("Invalid dimension specified. Must be 'channel' or 'store'.")
         dimension_table = "channels" if dimension == 'channel' else "stores"
@@ -78,31 +184,95 @@ class SalesRepository:
             SELECT
                 d.id as dimension_id,
                 d.name as dimension_name,
-                COALESCE(SUM(s.total_amount), 0) as total_revenue,
-                COALESCE(COUNT(s.id), 0) as total_sales_count,
-                COALESCE(AVG(s.total_amount), 0) as average_ticket_value
-            FROM sales s
-            JOIN {dimension_table} d ON s.{dimension_fk} = d.id
-            WHERE s.sale_status_desc = 'COMPLETED'
-              AND s.created_at >= :start_date
-              AND s.created_at < :end_date_plus_one
+                COALESCE(SUM(r.total_amount_sum), 0) as total_revenue,
+                COALESCE(SUM(r.sales_count), 0) as total_sales_count,
+                COALESCE(SUM(r.total_amount_sum) / NULLIF(SUM(r.sales_count), 0), 0) as average_ticket_value
+            FROM sales_daily_rollup r
+            JOIN {dimension_table} d ON r.{dimension_fk} = d.id
+            WHERE r.sale_status_desc = 'COMPLETED'
+              AND r.sale_date BETWEEN :start_date AND :end_date
             GROUP BY d.id, d.name
             ORDER BY total_revenue DESC
         """)
         params = {
             "start_date": start_date,
-            "end_date_plus_one": end_date + timedelta(days=1)
+            "end_date": end_date
         }
-        results = self.db.execute(query, params).fetchall()
+        results = (await self.db.execute(query, params)).fetchall()
         return [result._asdict() for result in results]
 
-    def get_delivery_performance_by_dimension(self, start_date: date, end_date: date, dimension: str, day_of_week: Optional[int] = None, start_hour: Optional[int] = None, end_hour: Optional[int] = None) -> List[dict]:
+    async def get_customer_estimates(self, start_date: date, end_date: date, dimension: Optional[str] = None) -> List[dict]:
+        # Unions the daily HyperLogLog sketches in range (highest rank per register)
+        # and estimates the distinct customers, per store or channel or overall.
+        if dimension not in [None, 'channel', 'store']:
+            raise ValueError("Invalid dimension specified. Must be 'channel' or 'store'.")
+        dimension_column = f"k.{dimension}_id" if dimension else "0"
+        registers = HLL_REGISTERS
+        query = text(f"""
+            WITH registers AS (
+                SELECT {dimension_column} as dimension_id, r.register_index, MAX(r.register_rank) as register_rank
+                FROM sales_customer_sketches k
+                CROSS JOIN LATERAL unnest(k.register_indexes, k.register_ranks) as r(register_index, register_rank)
+                WHERE k.sale_date BETWEEN :start_date AND :end_date
+                GROUP BY 1, 2
+            ),
+            estimates AS (
+                SELECT
+                    dimension_id,
+                    COUNT(*) as filled_registers,
+                    SUM(POWER(2, -CAST(register_rank AS DOUBLE PRECISION))) as rank_sum
+                FROM registers
+                GROUP BY dimension_id
+            ),
+            totals AS (
+                SELECT {dimension_column} as dimension_id, SUM(k.customer_sales) as customer_sales
+                FROM sales_customer_sketches k
+                WHERE k.sale_date BETWEEN :start_date AND :end_date
+                GROUP BY 1
+            )
+            SELECT
+                t.dimension_id,
+                t.customer_sales,
+                -- Linear counting while many registers are still empty; never more
+                -- customers than sales they made.
+                LEAST(t.customer_sales, ROUND(CASE
+                    WHEN x.raw_estimate <= 2.5 * {registers} AND e.filled_registers < {registers}
+                        THEN {registers} * LN({registers}.0 / ({registers} - e.filled_registers))
+                    ELSE x.raw_estimate
+                END)) as unique_customers
+            FROM totals t
+            JOIN estimates e ON e.dimension_id = t.dimension_id
+            CROSS JOIN LATERAL (
+                SELECT {HLL_ALPHA} * {registers} * {registers} / (e.rank_sum + {registers} - e.filled_registers) as raw_estimate
+            ) x
+        """)
+        params = {
+            "start_date": start_date,
+            "end_date": end_date
+        }
+        results = (await self.db.execute(query, params)).fetchall()
+        return [result._asdict() for result in results]
+
+    async def get_delivery_performance_by_dimension(self, start_date: date, end_date: date, dimension: str, day_of_week: Optional[int] = None, start_hour: Optional[int] = None, end_hour: Optional[int] = None) -> List[dict]:
         if dimension not in ['store', 'neighborhood', 'city']:
             raise ValueError("Invalid dimension for delivery performance.")
 
+        # Daily sketches cannot slice by hour; those queries read the rows.
+        if start_hour is None or end_hour is None:
+            return await self.get_time_percentiles_by_dimension("delivery", "total_deliveries", start_date, end_date, dimension, day_of_week)
+
+        # Percentiles cannot be merged from two engines, so only a range that is
+        # entirely in the snapshots goes to the columnar engine.
+        if await self._columnar_cold_end(start_date, end_date) == end_date:
+            return await self.columnar_repository.get_delivery_performance_by_dimension(
+                month_starts(start_date, end_date), start_date, end_date,
+                dimension, day_of_week, start_hour, end_hour
+            )
+
         params = {
             "start_date": start_date,
-            "end_date_plus_one": end_date + timedelta(days=1)
+            "end_date": end_date,
+            **created_at_bounds(start_date, end_date)
         }
 
         group_by_clause = ""
@@ -116,15 +286,16 @@ class SalesRepository:
         where_clauses = [
             "s.sale_status_desc = 'COMPLETED'",
             "s.delivery_seconds IS NOT NULL",
-            "s.created_at >= :start_date",
-            "s.created_at < :end_date_plus_one"
+            "s.sale_date BETWEEN :start_date AND :end_date",
+            "s.created_at >= :created_at_start AND s.created_at < :created_at_end",
+            "da.sale_created_at >= :created_at_start AND da.sale_created_at < :created_at_end"
         ]
 
         if day_of_week is not None:
-            where_clauses.append("EXTRACT(ISODOW FROM s.created_at) = :day_of_week")
+            where_clauses.append("s.iso_dow = :day_of_week")
             params["day_of_week"] = day_of_week
         if start_hour is not None and end_hour is not None:
-            where_clauses.append("EXTRACT(HOUR FROM s.created_at) BETWEEN :start_hour AND :end_hour")
+            where_clauses.append("s.hour BETWEEN :start_hour AND :end_hour")
             params["start_hour"] = start_hour
             params["end_hour"] = end_hour
 
@@ -134,7 +305,9 @@ class SalesRepository:
             SELECT
                 {group_by_clause} as dimension_name,
                 COALESCE(AVG(s.delivery_seconds), 0) as average_delivery_seconds,
+                COALESCE(PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY s.delivery_seconds), 0) as p50_delivery_seconds,
                 COALESCE(PERCENTILE_CONT(0.9) WITHIN GROUP (ORDER BY s.delivery_seconds), 0) as p90_delivery_seconds,
+                COALESCE(PERCENTILE_CONT(0.99) WITHIN GROUP (ORDER BY s.delivery_seconds), 0) as p99_delivery_seconds,
                 COUNT(s.id) as total_deliveries
             FROM sales s
             JOIN delivery_addresses da ON s.id = da.sale_id
@@ -145,46 +318,115 @@ class SalesRepository:
             ORDER BY average_delivery_seconds DESC;
         """)
         
-        results = self.db.execute(query, params).fetchall()
+        results = (await self.db.execute(query, params)).fetchall()
+        return [result._asdict() for result in results]
+
+    async def get_time_percentiles_by_dimension(self, measure: str, count_alias: str, start_date: date, end_date: date, dimension: str, day_of_week: Optional[int] = None) -> List[dict]:
+        # Merges the daily DDSketches in range: bucket counts are summed per group and
+        # each quantile is the first bucket whose running count passes its rank.
+        if dimension not in SKETCH_DIMENSIONS:
+            raise ValueError("Invalid dimension. Must be 'store', 'neighborhood' or 'city'.")
+        dimension_column, dimension_join = SKETCH_DIMENSIONS[dimension]
+        where_clauses = [
+            "k.grain = :grain",
+            "k.measure = :measure",
+            "k.sale_date BETWEEN :start_date AND :end_date"
+        ]
+        params = {
+            "grain": dimension,
+            "measure": measure,
+            "start_date": start_date,
+            "end_date": end_date
+        }
+        if day_of_week is not None:
+            where_clauses.append("EXTRACT(ISODOW FROM k.sale_date) = :day_of_week")
+            params["day_of_week"] = day_of_week
+        where_sql = " AND ".join(where_clauses)
+
+        query = text(f"""
+            WITH merged AS (
+                SELECT {dimension_column} as dimension_name, b.bucket, SUM(b.sample_count) as sample_count
+                FROM sales_time_sketches k
+                {dimension_join}
+                CROSS JOIN LATERAL unnest(k.buckets, k.bucket_counts) as b(bucket, sample_count)
+                WHERE {where_sql}
+                GROUP BY 1, 2
+            ),
+            ranked AS (
+                SELECT
+                    dimension_name,
+                    bucket,
+                    SUM(sample_count) OVER (PARTITION BY dimension_name ORDER BY bucket) as running_count,
+                    SUM(sample_count) OVER (PARTITION BY dimension_name) as total_count
+                FROM merged
+            ),
+            quantiles AS (
+                SELECT
+                    dimension_name,
+                    ddsketch_value(MIN(bucket) FILTER (WHERE running_count > 0.5 * (total_count - 1))) as p50,
+                    ddsketch_value(MIN(bucket) FILTER (WHERE running_count > 0.9 * (total_count - 1))) as p90,
+                    ddsketch_value(MIN(bucket) FILTER (WHERE running_count > 0.99 * (total_count - 1))) as p99
+                FROM ranked
+                GROUP BY dimension_name
+            ),
+            totals AS (
+                SELECT
+                    {dimension_column} as dimension_name,
+                    SUM(k.seconds_sum) / NULLIF(SUM(k.sample_count), 0) as average_seconds,
+                    SUM(k.sample_count) as sample_count
+                FROM sales_time_sketches k
+                {dimension_join}
+                WHERE {where_sql}
+                GROUP BY 1
+            )
+            SELECT
+                t.dimension_name,
+                COALESCE(t.average_seconds, 0) as average_{measure}_seconds,
+                COALESCE(q.p50, 0) as p50_{measure}_seconds,
+                COALESCE(q.p90, 0) as p90_{measure}_seconds,
+                COALESCE(q.p99, 0) as p99_{measure}_seconds,
+                t.sample_count as {count_alias}
+            FROM totals t
+            JOIN quantiles q ON q.dimension_name = t.dimension_name
+            WHERE t.sample_count >= 10
+            ORDER BY average_{measure}_seconds DESC
+        """)
+        results = (await self.db.execute(query, params)).fetchall()
         return [result._asdict() for result in results]
 
-    def get_ticket_trend(self, start_date: date, end_date: date) -> List[dict]:
+    async def get_ticket_trend(self, start_date: date, end_date: date) -> List[dict]:
         query = text("""
             SELECT
-                DATE(s.created_at) as date,
-                COALESCE(AVG(s.total_amount), 0) as value
-            FROM sales s
-            WHERE s.sale_status_desc = 'COMPLETED'
-              AND s.created_at >= :start_date
-              AND s.created_at < :end_date_plus_one
-            GROUP BY DATE(s.created_at)
+                r.sale_date as date,
+                COALESCE(SUM(r.total_amount_sum) / NULLIF(SUM(r.sales_count), 0), 0) as value
+            FROM sales_daily_rollup r
+            WHERE r.sale_status_desc = 'COMPLETED'
+              AND r.sale_date BETWEEN :start_date AND :end_date
+            GROUP BY r.sale_date
             ORDER BY date ASC
         """)
         params = {
             "start_date": start_date,
-            "end_date_plus_one": end_date + timedelta(days=1)
+            "end_date": end_date
         }
-        results = self.db.execute(query, params).fetchall()
+        results = (await self.db.execute(query, params)).fetchall()
         return [result._asdict() for result in results]
 
-    def get_sales_composition_by_category(self, start_date: date, end_date: date) -> List[dict]:
+    async def get_sales_composition_by_category(self, start_date: date, end_date: date) -> List[dict]:
         query = text("""
             SELECT
-                c.name as category_name,
-                COALESCE(SUM(ps.total_price), 0) as total_revenue
-            FROM sales s
-            JOIN product_sales ps ON s.id = ps.sale_id
-            JOIN products p ON ps.product_id = p.id
-            JOIN categories c ON p.category_id = c.id
-            WHERE s.sale_status_desc = 'COMPLETED'
-              AND s.created_at >= :start_date
-              AND s.created_at < :end_date_plus_one
-            GROUP BY c.name
+                cat.name as category_name,
+                COALESCE(SUM(c.total_revenue), 0) as total_revenue
+            FROM product_sales_cube c
+            JOIN products p ON c.product_id = p.id
+            JOIN categories cat ON p.category_id = cat.id
+            WHERE c.sale_date BETWEEN :start_date AND :end_date
+            GROUP BY cat.name
             ORDER BY total_revenue DESC
         """)
         params = {
             "start_date": start_date,
-            "end_date_plus_one": end_date + timedelta(days=1)
+            "end_date": end_date
         }
-        results = self.db.execute(query, params).fetchall()
+        results = (await self.db.execute(query, params)).fetchall()
         return [result._asdict() for result in results]
@@ -0,0 +1,17 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_db
+from services.batch_service import BatchService
+from models.batch import BatchRequest, BatchResponse
+from instrumentation import InstrumentedRoute
+
+router = APIRouter(
+    prefix="/analytics",
+    tags=["Analytics"],
+    route_class=InstrumentedRoute
+)
+
+@router.post("/batch", response_model=BatchResponse)
+async def run_analytics_batch(batch: BatchRequest, db: AsyncSession = Depends(get_db)):
+    batch_service = BatchService(db)
+    return await batch_service.run(batch)
@@ -1,23 +1,47 @@
-from fastapi import APIRouter, Depends, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Query, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
 from database import get_db
 from services.customer_service import CustomerService
-from models.customers import CustomerChurnRiskResponse
+from models.customers import CustomerChurnRiskResponse, ChurnRiskCountResponse, CustomerRfmResponse
+from instrumentation import InstrumentedRoute
 
 router = APIRouter(
     prefix="/analytics",
-    tags=["Customer Analytics"]
+    tags=["Customer Analytics"],
+    route_class=InstrumentedRoute
 )
 
 @router.get("/customer-churn-risk", response_model=CustomerChurnRiskResponse)
 async def get_customer_churn_risk(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     min_purchases: int = Query(default=3, ge=1, description="Minimum number of total purchases a customer must have to be considered."),
-    inactive_days: int = Query(default=30, ge=1, description="Number of days since the last purchase to consider a customer inactive.")
+    inactive_days: int = Query(default=30, ge=1, description="Number of days since the last purchase to consider a customer inactive."),
+    limit: int = Query(default=100, ge=1, le=1000, description="Maximum number of customers per page."),
+    cursor: Optional[str] = Query(default=None, description="next_cursor from the previous page.")
 ):
     customer_service = CustomerService(db)
-    churn_risk_customers = customer_service.get_churn_risk_customers(
-        min_purchases=min_purchases, 
-        inactive_days=inactive_days
-    )
+    try:
+        churn_risk_customers = await customer_service.get_churn_risk_customers(
+            min_purchases=min_purchases, 
+            inactive_days=inactive_days,
+            limit=limit,
+            cursor=cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     return churn_risk_customers
+
+@router.get("/customer-churn-risk/count", response_model=ChurnRiskCountResponse)
+async def count_customer_churn_risk(
+    db: AsyncSession = Depends(get_db),
+    min_purchases: int = Query(default=3, ge=1, description="Minimum number of total purchases a customer must have to be considered."),
+    inactive_days: int = Query(default=30, ge=1, description="Number of days since the last purchase to consider a customer inactive.")
+):
+    customer_service = CustomerService(db)
+    return await customer_service.count_churn_risk_customers(min_purchases=min_purchases, inactive_days=inactive_days)
+
+@router.get("/customer-rfm", response_model=CustomerRfmResponse)
+async def get_customer_rfm(db: AsyncSession = Depends(get_db)):
+    customer_service = CustomerService(db)
+    return await customer_service.get_rfm_segments()
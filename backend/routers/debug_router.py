@@ -0,0 +1,15 @@
+from fastapi import APIRouter
+from services.debug_service import DebugService
+from models.common import SlowQueryLogResponse
+from instrumentation import InstrumentedRoute
+
+router = APIRouter(
+    prefix="/debug",
+    tags=["Debug"],
+    route_class=InstrumentedRoute
+)
+
+@router.get("/slow-queries", response_model=SlowQueryLogResponse)
+async def slow_queries():
+    debug_service = DebugService()
+    return debug_service.get_slow_queries()
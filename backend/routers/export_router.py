@@ -0,0 +1,33 @@
+from fastapi import APIRouter, Query, HTTPException
+from fastapi.responses import StreamingResponse
+from datetime import date, timedelta
+from typing import Literal
+from services.export_service import ExportService, EXPORT_MEDIA_TYPES
+from instrumentation import InstrumentedRoute
+
+router = APIRouter(
+    prefix="/analytics",
+    tags=["Analytics"],
+    route_class=InstrumentedRoute
+)
+
+@router.get("/export")
+async def export_dataset(
+    dataset: Literal['sales', 'product_sales', 'churn_risk'] = Query(description="Dataset to export ('sales', 'product_sales' or 'churn_risk')"),
+    format: Literal['csv', 'ndjson', 'parquet'] = Query(default='csv', description="Output format ('csv', 'ndjson' or 'parquet')"),
+    start_date: date = Query(default=date.today() - timedelta(days=30), description="Start date for sales and product_sales (YYYY-MM-DD)"),
+    end_date: date = Query(default=date.today(), description="End date for sales and product_sales (YYYY-MM-DD)"),
+    min_purchases: int = Query(default=3, ge=1, description="churn_risk: minimum number of total purchases"),
+    inactive_days: int = Query(default=30, ge=1, description="churn_risk: days since the last purchase")
+):
+    export_service = ExportService()
+    try:
+        body = await export_service.stream(dataset, format, start_date, end_date, min_purchases, inactive_days)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    filename = f"{dataset}.{format}" if dataset == 'churn_risk' else f"{dataset}_{start_date}_{end_date}.{format}"
+    return StreamingResponse(
+        body,
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
@@ -1,15 +1,17 @@
 from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from database import get_db
 from services.filter_service import FilterService
 from models.filters import FilterOptionsResponse
+from instrumentation import InstrumentedRoute
 
 router = APIRouter(
     prefix="/filters",
-    tags=["Filters"]
+    tags=["Filters"],
+    route_class=InstrumentedRoute
 )
 
 @router.get("/options", response_model=FilterOptionsResponse)
-async def get_filter_options(db: Session = Depends(get_db)):
+async def get_filter_options(db: AsyncSession = Depends(get_db)):
     filter_service = FilterService(db)
-    return filter_service.get_filter_options()
+    return await filter_service.get_filter_options()
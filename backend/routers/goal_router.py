@@ -1,22 +1,24 @@
 from fastapi import APIRouter, Depends, Body
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from database import get_db
 from services.goal_service import GoalService
 from models.goal import AverageTicketGoal
+from instrumentation import InstrumentedRoute
 
 router = APIRouter(
     prefix="/goal",
-    tags=["Goal"]
+    tags=["Goal"],
+    route_class=InstrumentedRoute
 )
 
 @router.get("/average-ticket-goal", response_model=AverageTicketGoal)
-async def get_average_ticket_goal(db: Session = Depends(get_db)):
+async def get_average_ticket_goal(db: AsyncSession = Depends(get_db)):
     goal_service = GoalService(db)
-    goal_value = goal_service.get_goal()
+    goal_value = await goal_service.get_goal()
     return AverageTicketGoal(goal_value=goal_value)
 
 @router.put("/average-ticket-goal")
-async def update_average_ticket_goal(goal: AverageTicketGoal, db: Session = Depends(get_db)):
+async def update_average_ticket_goal(goal: AverageTicketGoal, db: AsyncSession = Depends(get_db)):
     goal_service = GoalService(db)
-    goal_service.update_goal(goal.goal_value)
+    await goal_service.update_goal(goal.goal_value)
     return {"message": "Goal updated successfully"}
@@ -1,19 +1,37 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi.responses import PlainTextResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from database import get_db
 from services.health_service import HealthService
-from models.common import HealthCheckResponse
+from services.metrics_service import MetricsService
+from models.common import HealthCheckResponse, PoolStatusResponse, CacheStatusResponse
+from instrumentation import InstrumentedRoute
 
-router = APIRouter()
+router = APIRouter(route_class=InstrumentedRoute)
 
 @router.get("/", response_model=dict)
 async def read_root():
     return {"message": "Welcome to the God Level Analytics API!"}
 
 @router.get("/health", response_model=HealthCheckResponse)
-async def health_check(db: Session = Depends(get_db)):
+async def health_check(db: AsyncSession = Depends(get_db)):
     health_service = HealthService(db)
-    status = health_service.get_health_status()
+    status = await health_service.get_health_status()
     if status.database == "disconnected":
         raise HTTPException(status_code=500, detail="Database connection failed")
     return status
+
+@router.get("/health/pool", response_model=PoolStatusResponse)
+async def pool_status(db: AsyncSession = Depends(get_db)):
+    health_service = HealthService(db)
+    return health_service.get_pool_status()
+
+@router.get("/health/cache", response_model=CacheStatusResponse)
+async def cache_status(db: AsyncSession = Depends(get_db)):
+    health_service = HealthService(db)
+    return health_service.get_cache_status()
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    metrics_service = MetricsService()
+    return PlainTextResponse(metrics_service.render(), media_type="text/plain; version=0.0.4")
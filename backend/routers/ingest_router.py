@@ -0,0 +1,20 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_db
+from services.ingest_service import IngestService
+from models.ingest import IngestSalesRequest, IngestSalesResponse
+from instrumentation import InstrumentedRoute
+
+router = APIRouter(
+    prefix="/ingest",
+    tags=["Ingest"],
+    route_class=InstrumentedRoute
+)
+
+@router.post("/sales", response_model=IngestSalesResponse, status_code=201)
+async def ingest_sales(request: IngestSalesRequest, db: AsyncSession = Depends(get_db)):
+    ingest_service = IngestService(db)
+    try:
+        return await ingest_service.ingest_sales(request)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
@@ -0,0 +1,25 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_db
+from services.query_service import QueryService
+from models.query import QueryRequest, QueryResponse, CatalogResponse
+from instrumentation import InstrumentedRoute
+
+router = APIRouter(
+    prefix="/analytics",
+    tags=["Analytics"],
+    route_class=InstrumentedRoute
+)
+
+@router.get("/query/catalog", response_model=CatalogResponse)
+async def get_query_catalog(db: AsyncSession = Depends(get_db)):
+    query_service = QueryService(db)
+    return query_service.get_catalog()
+
+@router.post("/query", response_model=QueryResponse)
+async def run_analytics_query(request: QueryRequest, db: AsyncSession = Depends(get_db)):
+    query_service = QueryService(db)
+    try:
+        return await query_service.run_query(request)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
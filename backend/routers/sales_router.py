@@ -1,41 +1,47 @@
 from fastapi import APIRouter, Depends, Query, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import date, timedelta
-from typing import Optional, Literal, Dict, Any
+from typing import Optional, Literal
 from database import get_db
 from services.sales_service import SalesService
 from models.sales import (
     SalesOverviewResponse, 
+    MonthlySummaryResponse,
+    CompareTo,
     TopProductsResponse, 
     SalesByDimensionResponse,
     DeliveryPerformanceResponse,
+    ProductionPerformanceResponse,
     TicketTrendResponse,
     TicketCompositionResponse
 )
+from instrumentation import InstrumentedRoute
 
 router = APIRouter(
     prefix="/analytics",
-    tags=["Analytics"]
+    tags=["Analytics"],
+    route_class=InstrumentedRoute
 )
 
-@router.get("/monthly-summary", response_model=Dict[str, Any])
-async def get_monthly_summary(db: Session = Depends(get_db)):
+@router.get("/monthly-summary", response_model=MonthlySummaryResponse)
+async def get_monthly_summary(db: AsyncSession = Depends(get_db)):
     sales_service = SalesService(db)
-    return sales_service.get_monthly_kpis()
+    return await sales_service.get_monthly_summary()
 
 @router.get("/sales-overview", response_model=SalesOverviewResponse)
 async def get_sales_overview(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     start_date: date = Query(default=date.today() - timedelta(days=30), description="Start date for the analysis period (YYYY-MM-DD)"),
-    end_date: date = Query(default=date.today(), description="End date for the analysis period (YYYY-MM-DD)")
+    end_date: date = Query(default=date.today(), description="End date for the analysis period (YYYY-MM-DD)"),
+    compare_to: Optional[CompareTo] = Query(default=None, description="Also return KPIs for a comparison period ('previous_period', 'previous_month' or 'previous_year')")
 ):
     sales_service = SalesService(db)
-    overview = sales_service.get_sales_overview(start_date=start_date, end_date=end_date)
+    overview = await sales_service.get_sales_overview(start_date=start_date, end_date=end_date, compare_to=compare_to)
     return overview
 
 @router.get("/top-products", response_model=TopProductsResponse)
 async def get_top_products(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     start_date: date = Query(default=date.today() - timedelta(days=30), description="Start date for the analysis period (YYYY-MM-DD)"),
     end_date: date = Query(default=date.today(), description="End date for the analysis period (YYYY-MM-DD)"),
     limit: int = Query(default=10, ge=1, le=100, description="The number of top products to return"),
@@ -49,7 +55,7 @@ async def get_top_products(
         raise HTTPException(status_code=400, detail="Both start_hour and end_hour must be provided for time-based filtering.")
 
     sales_service = SalesService(db)
-    top_products = sales_service.get_top_products(
+    top_products = await sales_service.get_top_products(
         start_date=start_date, 
         end_date=end_date, 
         limit=limit, 
@@ -63,17 +69,19 @@ async def get_top_products(
 
 @router.get("/sales-breakdown", response_model=SalesByDimensionResponse)
 async def get_sales_breakdown(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     dimension: Literal['channel', 'store'] = Query(description="The dimension to break down sales by ('channel' or 'store')"),
     start_date: date = Query(default=date.today() - timedelta(days=30), description="Start date for the analysis period (YYYY-MM-DD)"),
-    end_date: date = Query(default=date.today(), description="End date for the analysis period (YYYY-MM-DD)")
+    end_date: date = Query(default=date.today(), description="End date for the analysis period (YYYY-MM-DD)"),
+    compare_to: Optional[CompareTo] = Query(default=None, description="Also return KPIs for a comparison period ('previous_period', 'previous_month' or 'previous_year')")
 ):
     try:
         sales_service = SalesService(db)
-        breakdown = sales_service.get_sales_breakdown(
+        breakdown = await sales_service.get_sales_breakdown(
             start_date=start_date, 
             end_date=end_date, 
-            dimension=dimension
+            dimension=dimension,
+            compare_to=compare_to
         )
         return breakdown
     except ValueError as e:
@@ -81,7 +89,7 @@ async def get_sales_breakdown(
 
 @router.get("/delivery-performance", response_model=DeliveryPerformanceResponse)
 async def get_delivery_performance(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     dimension: Literal['store', 'neighborhood', 'city'] = Query(description="The dimension to analyze delivery performance by ('store' or 'neighborhood')"),
     start_date: date = Query(default=date.today() - timedelta(days=30), description="Start date for the analysis period (YYYY-MM-DD)"),
     end_date: date = Query(default=date.today(), description="End date for the analysis period (YYYY-MM-DD)"),
@@ -94,7 +102,7 @@ async def get_delivery_performance(
 
     try:
         sales_service = SalesService(db)
-        performance = sales_service.get_delivery_performance(
+        performance = await sales_service.get_delivery_performance(
             start_date=start_date, 
             end_date=end_date, 
             dimension=dimension,
@@ -106,20 +114,39 @@ async def get_delivery_performance(
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+@router.get("/production-performance", response_model=ProductionPerformanceResponse)
+async def get_production_performance(
+    db: AsyncSession = Depends(get_db),
+    dimension: Literal['store', 'neighborhood', 'city'] = Query(default='store', description="The dimension to analyze production time by ('store', 'neighborhood' or 'city')"),
+    start_date: date = Query(default=date.today() - timedelta(days=30), description="Start date for the analysis period (YYYY-MM-DD)"),
+    end_date: date = Query(default=date.today(), description="End date for the analysis period (YYYY-MM-DD)"),
+    day_of_week: Optional[int] = Query(default=None, ge=1, le=7, description="Filter by day of the week (1=Monday, 7=Sunday)")
+):
+    try:
+        sales_service = SalesService(db)
+        return await sales_service.get_production_performance(
+            start_date=start_date,
+            end_date=end_date,
+            dimension=dimension,
+            day_of_week=day_of_week
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @router.get("/ticket-trend", response_model=TicketTrendResponse)
 async def get_ticket_trend(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     start_date: date = Query(default=date.today() - timedelta(days=30), description="Start date for the analysis period (YYYY-MM-DD)"),
     end_date: date = Query(default=date.today(), description="End date for the analysis period (YYYY-MM-DD)")
 ):
     sales_service = SalesService(db)
-    return sales_service.get_ticket_trend(start_date=start_date, end_date=end_date)
+    return await sales_service.get_ticket_trend(start_date=start_date, end_date=end_date)
 
 @router.get("/ticket-composition", response_model=TicketCompositionResponse)
 async def get_ticket_composition(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     start_date: date = Query(default=date.today() - timedelta(days=30), description="Start date for the analysis period (YYYY-MM-DD)"),
     end_date: date = Query(default=date.today(), description="End date for the analysis period (YYYY-MM-DD)")
 ):
     sales_service = SalesService(db)
-    return sales_service.get_ticket_composition(start_date=start_date, end_date=end_date)
+    return await sales_service.get_ticket_composition(start_date=start_date, end_date=end_date)
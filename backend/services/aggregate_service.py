@@ -0,0 +1,61 @@
+import asyncio
+import logging
+import time
+from datetime import date
+from typing import List
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import SessionLocal
+from repositories.aggregate_repository import AggregateRepository
+from repositories.data_version_repository import DataVersionRepository
+from data_versions import sync_day_versions
+from config import AGGREGATE_REFRESH_INTERVAL_SECONDS, AGGREGATE_REFRESH_MIN_INTERVAL_SECONDS
+from events import on_sales_changed
+from cache import publish_day_versions
+
+logger = logging.getLogger(__name__)
+
+# Set when sales are ingested so the refresher runs as soon as its minimum interval allows.
+refresh_requested = asyncio.Event()
+
+@on_sales_changed
+def request_refresh(event: dict):
+    refresh_requested.set()
+
+class AggregateService:
+    def __init__(self, db: AsyncSession):
+        self.aggregate_repository = AggregateRepository(db)
+        self.data_version_repository = DataVersionRepository(db)
+
+    async def backfill(self) -> int:
+        # Full scan of sales: for one-off use (see migration 0010), not the refresher loop.
+        return await self.aggregate_repository.mark_missing_days_dirty()
+
+    async def refresh(self) -> List[date]:
+        days = await self.aggregate_repository.refresh_dirty_days()
+        # Also catches up on versions bumped by another worker whose publish was missed.
+        changed = await sync_day_versions(self.data_version_repository)
+        if days:
+            await publish_day_versions(changed)
+        return days
+
+async def _run_once() -> List[date]:
+    async with SessionLocal() as db:
+        return await AggregateService(db).refresh()
+
+async def refresh_aggregates_periodically():
+    while True:
+        refresh_requested.clear()
+        started = time.monotonic()
+        try:
+            days = await _run_once()
+            if days:
+                logger.info("Refreshed aggregates for %d day(s): %s .. %s", len(days), days[0], days[-1])
+        except Exception:
+            logger.exception("Aggregate refresh failed")
+        try:
+            await asyncio.wait_for(refresh_requested.wait(), AGGREGATE_REFRESH_INTERVAL_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+        # Every run rebuilds whole days and bumps their versions, so a steady stream of
+        # ingests is coalesced instead of refreshing (and invalidating today) per batch.
+        await asyncio.sleep(max(0.0, started + AGGREGATE_REFRESH_MIN_INTERVAL_SECONDS - time.monotonic()))
@@ -0,0 +1,110 @@
+import asyncio
+import logging
+from typing import Dict
+from pydantic import BaseModel, ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import SessionLocal
+from services.sales_service import SalesService
+from services.customer_service import CustomerService
+from models.batch import (
+    BatchRequest,
+    BatchResponse,
+    BatchSubResponse,
+    DateRangeParams,
+    SalesOverviewParams,
+    TopProductsParams,
+    SalesBreakdownParams,
+    DeliveryPerformanceParams,
+    ChurnRiskParams
+)
+from cache import get_many_from_cache
+from config import BATCH_MAX_CONCURRENCY
+
+logger = logging.getLogger(__name__)
+
+BATCH_PARAMS = {
+    'sales-overview': SalesOverviewParams,
+    'top-products': TopProductsParams,
+    'sales-breakdown': SalesBreakdownParams,
+    'delivery-performance': DeliveryPerformanceParams,
+    'ticket-trend': DateRangeParams,
+    'ticket-composition': DateRangeParams,
+    'customer-churn-risk': ChurnRiskParams
+}
+
+SALES_METHODS = {
+    'sales-overview': 'get_sales_overview',
+    'top-products': 'get_top_products',
+    'sales-breakdown': 'get_sales_breakdown',
+    'delivery-performance': 'get_delivery_performance',
+    'ticket-trend': 'get_ticket_trend',
+    'ticket-composition': 'get_ticket_composition'
+}
+
+SALES_CACHE_KEYS = {
+    'sales-overview': 'sales_overview_cache_key',
+    'top-products': 'top_products_cache_key',
+    'sales-breakdown': 'sales_breakdown_cache_key',
+    'delivery-performance': 'delivery_performance_cache_key',
+    'ticket-trend': 'ticket_trend_cache_key',
+    'ticket-composition': 'ticket_composition_cache_key'
+}
+
+class BatchService:
+    def __init__(self, db: AsyncSession):
+        self.sales_service = SalesService(db)
+        self.customer_service = CustomerService(db)
+
+    async def run(self, batch: BatchRequest) -> BatchResponse:
+        results: Dict[str, BatchSubResponse] = {}
+        pending = []
+        for sub_request in batch.requests:
+            try:
+                params = BATCH_PARAMS[sub_request.type](**sub_request.params)
+            except ValidationError as e:
+                results[sub_request.id] = BatchSubResponse(id=sub_request.id, status=422, error=str(e))
+                continue
+            cache_key = await self._cache_key(sub_request.type, params)
+            pending.append((sub_request, params, cache_key))
+
+        cached_values = await get_many_from_cache([cache_key for _, _, cache_key in pending])
+        misses = []
+        for sub_request, params, cache_key in pending:
+            if cache_key in cached_values:
+                results[sub_request.id] = BatchSubResponse(
+                    id=sub_request.id, status=200, cached=True, data=cached_values[cache_key]
+                )
+            else:
+                misses.append((sub_request, params))
+
+        semaphore = asyncio.Semaphore(BATCH_MAX_CONCURRENCY)
+        computed = await asyncio.gather(*[
+            self._compute(semaphore, sub_request.id, sub_request.type, params)
+            for sub_request, params in misses
+        ])
+        for sub_response in computed:
+            results[sub_response.id] = sub_response
+
+        return BatchResponse(results=[results[sub_request.id] for sub_request in batch.requests])
+
+    async def _cache_key(self, request_type: str, params: BaseModel) -> str:
+        # The services' own key builders, called with the same arguments as _compute.
+        if request_type == 'customer-churn-risk':
+            return await self.customer_service.churn_risk_cache_key(**params.model_dump())
+        return await getattr(self.sales_service, SALES_CACHE_KEYS[request_type])(**params.model_dump())
+
+    async def _compute(self, semaphore: asyncio.Semaphore, request_id: str, request_type: str, params: BaseModel) -> BatchSubResponse:
+        # Each sub-request gets its own session so misses can run concurrently.
+        async with semaphore:
+            try:
+                async with SessionLocal() as db:
+                    if request_type == 'customer-churn-risk':
+                        response = await CustomerService(db).get_churn_risk_customers(**params.model_dump())
+                    else:
+                        response = await getattr(SalesService(db), SALES_METHODS[request_type])(**params.model_dump())
+                return BatchSubResponse(id=request_id, status=200, data=response.model_dump(mode='json'))
+            except ValueError as e:
+                return BatchSubResponse(id=request_id, status=400, error=str(e))
+            except Exception:
+                logger.exception("Batch sub-request %s (%s) failed", request_id, request_type)
+                return BatchSubResponse(id=request_id, status=500, error="Internal Server Error")
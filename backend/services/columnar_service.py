@@ -0,0 +1,57 @@
+import asyncio
+import logging
+from datetime import date, timedelta
+from typing import List
+from dateutil.relativedelta import relativedelta
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import SessionLocal
+from columnar import columnar_store, SNAPSHOT_FACTS
+from repositories.export_repository import ExportRepository
+from repositories.data_version_repository import DataVersionRepository
+from config import COLUMNAR_EXPORT_BATCH_ROWS, COLUMNAR_EXPORT_INTERVAL_SECONDS
+
+logger = logging.getLogger(__name__)
+
+class ColumnarService:
+    def __init__(self, db: AsyncSession):
+        self.export_repository = ExportRepository(db)
+        self.data_version_repository = DataVersionRepository(db)
+
+    async def export_closed_months(self, force: bool = False) -> List[date]:
+        # Only months that can no longer receive new sales are snapshotted; the current
+        # month always stays in Postgres. Returns an empty list when another worker is exporting.
+        if not columnar_store.enabled:
+            raise ValueError("COLUMNAR_DATA_DIR is not set.")
+        repository = self.export_repository
+        try:
+            if not await repository.try_lock():
+                return []
+            last_closed_day = date.today().replace(day=1) - timedelta(days=1)
+            # Read before the rows: an edit made while exporting bumps the version
+            # past the one recorded, so the month is exported again next time.
+            versions = await self.data_version_repository.get_month_versions(date.min, last_closed_day)
+            exported = []
+            for month, version in sorted(versions.items()):
+                if not force and columnar_store.is_fresh(month, version):
+                    continue
+                month_end = month + relativedelta(months=1) - timedelta(days=1)
+                for fact in SNAPSHOT_FACTS:
+                    with columnar_store.month_writer(fact, month) as writer:
+                        async for rows in repository.stream_fact_rows(fact, month, month_end, COLUMNAR_EXPORT_BATCH_ROWS):
+                            await asyncio.to_thread(columnar_store.write_batch, writer, fact, rows)
+                columnar_store.record_export(month, version)
+                exported.append(month)
+            return exported
+        finally:
+            await repository.release()
+
+async def export_columnar_periodically():
+    while True:
+        try:
+            async with SessionLocal() as db:
+                exported = await ColumnarService(db).export_closed_months()
+            if exported:
+                logger.info("Exported %d month(s) to Parquet: %s", len(exported), ", ".join(f"{month:%Y-%m}" for month in exported))
+        except Exception:
+            logger.exception("Columnar export failed")
+        await asyncio.sleep(COLUMNAR_EXPORT_INTERVAL_SECONDS)
@@ -1,30 +1,95 @@
-from sqlalchemy.orm import Session
+import base64
+import binascii
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import date
+from typing import Optional, Tuple
 from repositories.customer_repository import CustomerRepository
-from models.customers import CustomerChurnRiskResponse, ChurnRiskCustomer
+from repositories.data_version_repository import DataVersionRepository
+from data_versions import day_versions, ensure_day_versions
+from models.customers import CustomerChurnRiskResponse, ChurnRiskCustomer, ChurnRiskCountResponse, CustomerRfmResponse, RfmSegment
 from cache import get_from_cache, set_in_cache
 
+def encode_cursor(last_purchase_date: date, customer_id: int) -> str:
+    return base64.urlsafe_b64encode(f"{last_purchase_date.isoformat()}|{customer_id}".encode()).decode()
+
+def decode_cursor(cursor: str) -> Tuple[date, int]:
+    try:
+        last_purchase_date, customer_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return date.fromisoformat(last_purchase_date), int(customer_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError("Invalid cursor.")
+
 class CustomerService:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.customer_repository = CustomerRepository(db)
+        self.data_version_repository = DataVersionRepository(db)
+
+    async def build_cache_key(self, min_purchases: int, inactive_days: int, *parts) -> str:
+        # Inactivity is measured from today, so the date is part of the key too.
+        await ensure_day_versions(self.data_version_repository)
+        version = day_versions.latest
+        return ":".join([f"churn_risk:v{version}:{date.today()}:{min_purchases}:{inactive_days}"] + [str(part) for part in parts])
 
-    def get_churn_risk_customers(self, min_purchases: int, inactive_days: int) -> CustomerChurnRiskResponse:
-        cache_key = f"churn_risk:{min_purchases}:{inactive_days}"
-        cached_data = get_from_cache(cache_key)
+    async def churn_risk_cache_key(self, min_purchases: int, inactive_days: int, limit: int = 100, cursor: Optional[str] = None) -> str:
+        # Shared with BatchService, which looks results up before computing them.
+        return await self.build_cache_key(min_purchases, inactive_days, limit, cursor)
+
+    async def get_churn_risk_customers(self, min_purchases: int, inactive_days: int, limit: int = 100, cursor: Optional[str] = None) -> CustomerChurnRiskResponse:
+        after = decode_cursor(cursor) if cursor else None
+        cache_key = await self.churn_risk_cache_key(min_purchases, inactive_days, limit, cursor)
+        cached_data = await get_from_cache(cache_key)
 
         if cached_data:
             return CustomerChurnRiskResponse(**cached_data)
 
-        churn_risk_data = self.customer_repository.get_churn_risk_customers(
-            min_purchases=min_purchases, 
-            inactive_days=inactive_days
+        # One extra row tells whether another page follows.
+        churn_risk_data = await self.customer_repository.get_churn_risk_customers(
+            min_purchases=min_purchases,
+            inactive_days=inactive_days,
+            limit=limit + 1,
+            after=after
         )
 
-        churn_risk_customers = [ChurnRiskCustomer(**customer) for customer in churn_risk_data]
+        churn_risk_customers = [ChurnRiskCustomer(**customer) for customer in churn_risk_data[:limit]]
+        next_cursor = None
+        if len(churn_risk_data) > limit:
+            last_customer = churn_risk_customers[-1]
+            next_cursor = encode_cursor(last_customer.last_purchase_date, last_customer.customer_id)
         response = CustomerChurnRiskResponse(
             min_purchases=min_purchases,
             inactive_days=inactive_days,
-            churn_risk_customers=churn_risk_customers
+            limit=limit,
+            churn_risk_customers=churn_risk_customers,
+            next_cursor=next_cursor
         )
 
-        set_in_cache(cache_key, response.model_dump(mode='json'))
+        await set_in_cache(cache_key, response.model_dump(mode='json'))
+        return response
+
+    async def count_churn_risk_customers(self, min_purchases: int, inactive_days: int) -> ChurnRiskCountResponse:
+        cache_key = await self.build_cache_key(min_purchases, inactive_days, "count")
+        cached_data = await get_from_cache(cache_key)
+
+        if cached_data:
+            return ChurnRiskCountResponse(**cached_data)
+
+        total = await self.customer_repository.count_churn_risk_customers(min_purchases, inactive_days)
+        response = ChurnRiskCountResponse(min_purchases=min_purchases, inactive_days=inactive_days, total=total)
+
+        await set_in_cache(cache_key, response.model_dump(mode='json'))
+        return response
+
+    async def get_rfm_segments(self) -> CustomerRfmResponse:
+        await ensure_day_versions(self.data_version_repository)
+        version = day_versions.latest
+        cache_key = f"customer_rfm:v{version}:{date.today()}"
+        cached_data = await get_from_cache(cache_key)
+
+        if cached_data:
+            return CustomerRfmResponse(**cached_data)
+
+        segments_data = await self.customer_repository.get_rfm_segments()
+        response = CustomerRfmResponse(segments=[RfmSegment(**segment) for segment in segments_data])
+
+        await set_in_cache(cache_key, response.model_dump(mode='json'))
         return response
@@ -0,0 +1,6 @@
+from models.common import SlowQueryLogResponse
+from instrumentation import get_slow_query_log
+
+class DebugService:
+    def get_slow_queries(self) -> SlowQueryLogResponse:
+        return SlowQueryLogResponse(**get_slow_query_log())
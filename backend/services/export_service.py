@@ -0,0 +1,114 @@
+import csv
+import io
+from datetime import date
+from decimal import Decimal
+from typing import Any, AsyncIterator, Dict, List, Optional
+import orjson
+import pyarrow as pa
+import pyarrow.parquet as pq
+from database import SessionLocal
+from columnar import FACT_SCHEMAS
+from repositories.export_repository import ExportRepository
+from repositories.customer_repository import CustomerRepository
+from config import EXPORT_BATCH_ROWS
+
+EXPORT_SCHEMAS = {
+    **FACT_SCHEMAS,
+    "churn_risk": pa.schema([
+        ("customer_id", pa.int32()),
+        ("customer_name", pa.string()),
+        ("total_purchases", pa.int64()),
+        ("last_purchase_date", pa.date32()),
+    ]),
+}
+
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet"
+}
+
+def json_default(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError
+
+class ChunkSink(io.RawIOBase):
+    """Write-only file for ParquetWriter that hands back what was written since the last drain."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        # Parquet records absolute offsets in the footer, so this keeps counting after drains.
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+class ExportService:
+    """Streams raw datasets batch by batch; memory stays flat whatever the row count."""
+
+    async def _batches(self, dataset: str, start_date: date, end_date: date, min_purchases: int, inactive_days: int) -> AsyncIterator[List[Dict[str, Any]]]:
+        # A session of its own: the response body is produced after the endpoint returns.
+        async with SessionLocal() as db:
+            if dataset == "churn_risk":
+                batches = CustomerRepository(db).stream_churn_risk_customers(min_purchases, inactive_days, EXPORT_BATCH_ROWS)
+            else:
+                batches = ExportRepository(db).stream_fact_rows(dataset, start_date, end_date, EXPORT_BATCH_ROWS)
+            async for rows in batches:
+                yield rows
+
+    async def stream(self, dataset: str, export_format: str, start_date: date, end_date: date, min_purchases: int = 3, inactive_days: int = 30) -> AsyncIterator[bytes]:
+        if dataset not in EXPORT_SCHEMAS:
+            raise ValueError(f"Unknown dataset '{dataset}'.")
+        schema = EXPORT_SCHEMAS[dataset]
+        batches = self._batches(dataset, start_date, end_date, min_purchases, inactive_days)
+        if export_format == "csv":
+            return self._csv(schema, batches)
+        if export_format == "ndjson":
+            return self._ndjson(batches)
+        if export_format == "parquet":
+            return self._parquet(schema, batches)
+        raise ValueError(f"Unknown format '{export_format}'. Must be 'csv', 'ndjson' or 'parquet'.")
+
+    async def _csv(self, schema: pa.Schema, batches: AsyncIterator[List[Dict[str, Any]]]) -> AsyncIterator[bytes]:
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=schema.names)
+        writer.writeheader()
+        yield buffer.getvalue().encode()
+        async for rows in batches:
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerows(rows)
+            yield buffer.getvalue().encode()
+
+    async def _ndjson(self, batches: AsyncIterator[List[Dict[str, Any]]]) -> AsyncIterator[bytes]:
+        async for rows in batches:
+            yield b"".join(orjson.dumps(row, default=json_default) + b"\n" for row in rows)
+
+    async def _parquet(self, schema: pa.Schema, batches: AsyncIterator[List[Dict[str, Any]]]) -> AsyncIterator[bytes]:
+        # One row group per batch, sent as soon as it is encoded; the footer comes last.
+        sink = ChunkSink()
+        writer: Optional[pq.ParquetWriter] = pq.ParquetWriter(sink, schema, compression="zstd")
+        try:
+            async for rows in batches:
+                writer.write_batch(pa.RecordBatch.from_pylist(rows, schema=schema))
+                yield sink.drain()
+            writer.close()
+            writer = None
+            yield sink.drain()
+        finally:
+            if writer is not None:
+                writer.close()
@@ -1,14 +1,14 @@
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from repositories.filter_repository import FilterRepository
 from models.filters import FilterOptionsResponse, Channel, Store
 
 class FilterService:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.filter_repository = FilterRepository(db)
 
-    def get_filter_options(self) -> FilterOptionsResponse:
-        channels_data = self.filter_repository.get_all_channels()
-        stores_data = self.filter_repository.get_all_stores()
+    async def get_filter_options(self) -> FilterOptionsResponse:
+        channels_data = await self.filter_repository.get_all_channels()
+        stores_data = await self.filter_repository.get_all_stores()
 
         channels = [Channel(**ch) for ch in channels_data]
         stores = [Store(**st) for st in stores_data]
@@ -1,12 +1,12 @@
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from repositories.goal_repository import GoalRepository
 
 class GoalService:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.goal_repository = GoalRepository(db)
 
-    def get_goal(self) -> float:
-        return self.goal_repository.get_average_ticket_goal()
+    async def get_goal(self) -> float:
+        return await self.goal_repository.get_average_ticket_goal()
 
-    def update_goal(self, goal_value: float):
-        self.goal_repository.set_average_ticket_goal(goal_value)
+    async def update_goal(self, goal_value: float):
+        await self.goal_repository.set_average_ticket_goal(goal_value)
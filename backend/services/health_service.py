@@ -1,12 +1,20 @@
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from repositories.health_repository import HealthRepository
-from models.common import HealthCheckResponse
+from models.common import HealthCheckResponse, PoolStatusResponse, CacheStatusResponse
+from database import get_pool_status
+from cache import get_cache_stats
 
 class HealthService:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.health_repository = HealthRepository(db)
 
-    def get_health_status(self) -> HealthCheckResponse:
-        is_db_connected = self.health_repository.check_db_connection()
+    async def get_health_status(self) -> HealthCheckResponse:
+        is_db_connected = await self.health_repository.check_db_connection()
         db_status = "connected" if is_db_connected else "disconnected"
         return HealthCheckResponse(status="ok", database=db_status)
+
+    def get_pool_status(self) -> PoolStatusResponse:
+        return PoolStatusResponse(**get_pool_status())
+
+    def get_cache_status(self) -> CacheStatusResponse:
+        return CacheStatusResponse(**get_cache_stats())
@@ -0,0 +1,144 @@
+import asyncpg
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, List
+from repositories.ingest_repository import IngestRepository
+from models.ingest import IngestSalesRequest, IngestSalesResponse
+from events import emit_sales_changed
+
+# Reported back to the client at most; the batch is rejected either way.
+MAX_REPORTED_ERRORS = 20
+
+SALES_COLUMNS = [
+    'id', 'store_id', 'customer_id', 'channel_id', 'customer_name', 'created_at', 'sale_status_desc',
+    'total_amount_items', 'total_discount', 'total_increase', 'delivery_fee', 'service_tax_fee',
+    'total_amount', 'value_paid', 'production_seconds', 'delivery_seconds', 'discount_reason',
+    'people_quantity', 'origin'
+]
+PRODUCT_SALES_COLUMNS = ['id', 'sale_id', 'product_id', 'quantity', 'base_price', 'total_price', 'sale_created_at']
+ITEM_PRODUCT_SALES_COLUMNS = [
+    'id', 'product_sale_id', 'item_id', 'option_group_id', 'quantity', 'additional_price', 'price',
+    'amount', 'sale_created_at'
+]
+DELIVERY_SALES_COLUMNS = [
+    'id', 'sale_id', 'courier_name', 'courier_phone', 'courier_type', 'delivery_type', 'status',
+    'delivery_fee', 'courier_fee', 'sale_created_at'
+]
+DELIVERY_ADDRESSES_COLUMNS = [
+    'id', 'sale_id', 'delivery_sale_id', 'street', 'number', 'complement', 'neighborhood', 'city',
+    'state', 'postal_code', 'latitude', 'longitude', 'sale_created_at'
+]
+PAYMENTS_COLUMNS = ['id', 'sale_id', 'payment_type_id', 'value', 'sale_created_at']
+
+class IngestService:
+    def __init__(self, db: AsyncSession):
+        self.ingest_repository = IngestRepository(db)
+
+    async def validate(self, request: IngestSalesRequest) -> Dict[str, int]:
+        """Checks every reference of the batch at once; returns the payment type ids by description."""
+        references: Dict[str, set] = {kind: set() for kind in ("store", "channel", "customer", "product", "item", "option_group")}
+        for sale in request.sales:
+            references["store"].add(sale.store_id)
+            references["channel"].add(sale.channel_id)
+            if sale.customer_id is not None:
+                references["customer"].add(sale.customer_id)
+            for product in sale.products:
+                references["product"].add(product.product_id)
+                for item in product.items:
+                    references["item"].add(item.item_id)
+                    if item.option_group_id is not None:
+                        references["option_group"].add(item.option_group_id)
+
+        errors = [
+            f"Unknown {kind} id {missing_id}."
+            for kind, missing_id in await self.ingest_repository.get_missing_references(
+                {kind: sorted(ids) for kind, ids in references.items()}
+            )
+        ]
+        payment_type_ids = await self.ingest_repository.get_payment_type_ids()
+        for index, sale in enumerate(request.sales):
+            for payment_index, payment in enumerate(sale.payments):
+                if payment.type not in payment_type_ids:
+                    errors.append(f"sales[{index}].payments[{payment_index}]: unknown payment type '{payment.type}'.")
+        if errors:
+            more = f" (and {len(errors) - MAX_REPORTED_ERRORS} more)" if len(errors) > MAX_REPORTED_ERRORS else ""
+            raise ValueError(" ".join(errors[:MAX_REPORTED_ERRORS]) + more)
+        return payment_type_ids
+
+    async def ingest_sales(self, request: IngestSalesRequest) -> IngestSalesResponse:
+        payment_type_ids = await self.validate(request)
+        sales = request.sales
+        deliveries = [sale for sale in sales if sale.delivery is not None]
+        ids = await self.ingest_repository.reserve_ids({
+            'sales': len(sales),
+            'product_sales': sum(len(sale.products) for sale in sales),
+            'item_product_sales': sum(len(product.items) for sale in sales for product in sale.products),
+            'delivery_sales': len(deliveries),
+            'delivery_addresses': len(deliveries),
+            'payments': sum(len(sale.payments) for sale in sales)
+        })
+        product_sale_ids = iter(ids['product_sales'])
+        item_product_sale_ids = iter(ids['item_product_sales'])
+        delivery_sale_ids = iter(ids['delivery_sales'])
+        delivery_address_ids = iter(ids['delivery_addresses'])
+        payment_ids = iter(ids['payments'])
+
+        rows: Dict[str, List[tuple]] = {table: [] for table in ids}
+        for sale_id, sale in zip(ids['sales'], sales):
+            created_at = sale.created_at
+            rows['sales'].append((
+                sale_id, sale.store_id, sale.customer_id, sale.channel_id, sale.customer_name, created_at,
+                sale.sale_status_desc, sale.total_items_value, sale.discount, sale.increase, sale.delivery_fee,
+                sale.service_tax, sale.total_amount, sale.value_paid, sale.production_sec, sale.delivery_sec,
+                sale.discount_reason, sale.people_qty, sale.origin
+            ))
+            for product in sale.products:
+                product_sale_id = next(product_sale_ids)
+                rows['product_sales'].append((
+                    product_sale_id, sale_id, product.product_id, product.quantity, product.base_price,
+                    product.total_price, created_at
+                ))
+                for item in product.items:
+                    rows['item_product_sales'].append((
+                        next(item_product_sale_ids), product_sale_id, item.item_id, item.option_group_id,
+                        item.quantity, item.additional_price, item.price, 1, created_at
+                    ))
+            if sale.delivery is not None:
+                delivery, address = sale.delivery, sale.delivery.address
+                delivery_sale_id = next(delivery_sale_ids)
+                rows['delivery_sales'].append((
+                    delivery_sale_id, sale_id, delivery.courier_name, delivery.courier_phone, delivery.courier_type,
+                    delivery.delivery_type, delivery.status, delivery.delivery_fee, delivery.courier_fee, created_at
+                ))
+                rows['delivery_addresses'].append((
+                    next(delivery_address_ids), sale_id, delivery_sale_id, address.street, address.number,
+                    address.complement, address.neighborhood, address.city, address.state, address.postal_code,
+                    address.latitude, address.longitude, created_at
+                ))
+            for payment in sale.payments:
+                rows['payments'].append((
+                    next(payment_ids), sale_id, payment_type_ids[payment.type], payment.value, created_at
+                ))
+
+        try:
+            # Parents first, so every foreign key already resolves within the transaction.
+            await self.ingest_repository.copy_rows('sales', SALES_COLUMNS, rows['sales'])
+            await self.ingest_repository.copy_rows('product_sales', PRODUCT_SALES_COLUMNS, rows['product_sales'])
+            await self.ingest_repository.copy_rows('item_product_sales', ITEM_PRODUCT_SALES_COLUMNS, rows['item_product_sales'])
+            await self.ingest_repository.copy_rows('delivery_sales', DELIVERY_SALES_COLUMNS, rows['delivery_sales'])
+            await self.ingest_repository.copy_rows('delivery_addresses', DELIVERY_ADDRESSES_COLUMNS, rows['delivery_addresses'])
+            await self.ingest_repository.copy_rows('payments', PAYMENTS_COLUMNS, rows['payments'])
+            await self.ingest_repository.commit()
+        except (asyncpg.IntegrityConstraintViolationError, asyncpg.DataError) as e:
+            # e.g. a sale dated before the oldest partition, or a value too large for its column
+            await self.ingest_repository.rollback()
+            raise ValueError(str(e))
+
+        sale_dates = sorted({sale.created_at.date() for sale in sales})
+        store_ids = sorted({sale.store_id for sale in sales})
+        await emit_sales_changed(sale_dates, store_ids, len(sales))
+        return IngestSalesResponse(
+            sales_ingested=len(sales),
+            sale_ids=ids['sales'],
+            sale_dates=sale_dates,
+            store_ids=store_ids
+        )
@@ -0,0 +1,51 @@
+from metrics import Histogram, MetricsWriter
+from database import get_pool_status, pool_stats, POOL_WAIT_BUCKETS_MS
+from cache import local_cache, prefix_stats
+from instrumentation import route_metrics, query_stats
+
+class MetricsService:
+    def render(self) -> str:
+        writer = MetricsWriter()
+        self._write_routes(writer)
+        self._write_cache(writer)
+        self._write_pool(writer)
+        self._write_queries(writer)
+        return writer.render()
+
+    def _write_routes(self, writer: MetricsWriter):
+        for (method, path), metrics in sorted(route_metrics.items()):
+            labels = {"method": method, "route": path}
+            writer.histogram("http_request_duration_seconds", "Time spent handling requests, by route.", metrics.duration, labels)
+        for (method, path), metrics in sorted(route_metrics.items()):
+            writer.gauge("http_requests_in_flight", "Requests currently being handled, by route.", metrics.in_flight, {"method": method, "route": path})
+
+    def _write_cache(self, writer: MetricsWriter):
+        for prefix, stats in sorted(prefix_stats.items()):
+            for result, value in (("l1_hit", stats.l1_hits), ("redis_hit", stats.redis_hits), ("miss", stats.misses)):
+                writer.counter("cache_lookups_total", "Cache lookups by key prefix and the tier that answered.", value, {"prefix": prefix, "result": result})
+        for prefix, stats in sorted(prefix_stats.items()):
+            writer.counter("cache_redis_errors_total", "Failed Redis calls by key prefix.", stats.errors, {"prefix": prefix})
+        writer.gauge("cache_l1_entries", "Entries held in the in-process cache.", len(local_cache))
+        writer.gauge("cache_l1_bytes", "Bytes held in the in-process cache.", local_cache.total_bytes)
+        writer.counter("cache_l1_evictions_total", "Entries evicted from the in-process cache.", local_cache.evictions)
+
+    def _write_pool(self, writer: MetricsWriter):
+        status = get_pool_status()
+        writer.gauge("db_pool_size", "Connections the pool keeps open.", status["pool_size"])
+        writer.gauge("db_pool_max_overflow", "Connections allowed beyond the pool size.", status["max_overflow"])
+        writer.gauge("db_pool_checked_out", "Connections currently in use.", status["checked_out"])
+        writer.gauge("db_pool_checked_in", "Idle connections in the pool.", status["checked_in"])
+        writer.gauge("db_pool_overflow", "Connections currently open beyond the pool size.", status["overflow"])
+        writer.counter("db_pool_timeouts_total", "Checkouts that gave up waiting for a connection.", status["timeouts"])
+        # Checkout waits are kept in milliseconds; exposed in seconds like the other durations.
+        wait = Histogram([bound / 1000 for bound in POOL_WAIT_BUCKETS_MS])
+        wait.counts = list(pool_stats.wait_buckets)
+        wait.sum = pool_stats.wait_total_ms / 1000
+        wait.count = pool_stats.checkouts
+        writer.histogram("db_pool_checkout_wait_seconds", "Time spent waiting for a pooled connection.", wait)
+
+    def _write_queries(self, writer: MetricsWriter):
+        for source, stats in sorted(query_stats.items()):
+            writer.histogram("db_query_duration_seconds", "Statement duration by repository method.", stats.duration, {"source": source})
+        for source, stats in sorted(query_stats.items()):
+            writer.counter("db_query_rows_total", "Rows returned or affected by repository method.", stats.rows, {"source": source})
@@ -0,0 +1,56 @@
+import hashlib
+import logging
+from pathlib import Path
+from typing import List, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import SessionLocal
+from repositories.migration_repository import MigrationRepository
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_DIR = Path(__file__).resolve().parent.parent / "migrations"
+
+def discover_migrations() -> List[Tuple[str, str]]:
+    # Files are named NNNN_description.sql and applied in name order.
+    return [(path.stem, path.read_text()) for path in sorted(MIGRATIONS_DIR.glob("*.sql"))]
+
+def checksum(sql: str) -> str:
+    return hashlib.sha256(sql.encode("utf-8")).hexdigest()
+
+class MigrationService:
+    def __init__(self, db: AsyncSession):
+        self.migration_repository = MigrationRepository(db)
+
+    async def get_pending(self) -> List[str]:
+        await self.migration_repository.ensure_migrations_table()
+        applied = await self.migration_repository.get_applied_migrations()
+        await self.migration_repository.commit()
+        return [version for version, _ in discover_migrations() if version not in applied]
+
+    async def migrate(self) -> List[str]:
+        # All pending migrations run in one transaction: either the schema reaches
+        # the latest version or nothing changes.
+        try:
+            await self.migration_repository.lock()
+            await self.migration_repository.ensure_migrations_table()
+            applied = await self.migration_repository.get_applied_migrations()
+            applied_now = []
+            for version, sql in discover_migrations():
+                if version in applied:
+                    if applied[version] != checksum(sql):
+                        logger.warning("Migration %s was edited after it was applied; edits are not re-run", version)
+                    continue
+                await self.migration_repository.apply_migration(version, checksum(sql), sql)
+                applied_now.append(version)
+            await self.migration_repository.commit()
+            return applied_now
+        except Exception:
+            await self.migration_repository.rollback()
+            raise
+
+async def run_migrations() -> List[str]:
+    async with SessionLocal() as db:
+        applied = await MigrationService(db).migrate()
+    if applied:
+        logger.info("Applied %d migration(s): %s", len(applied), ", ".join(applied))
+    return applied
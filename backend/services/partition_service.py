@@ -0,0 +1,151 @@
+import asyncio
+import logging
+from datetime import date
+from typing import Dict, List
+from dateutil.relativedelta import relativedelta
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import SessionLocal
+from repositories.partition_repository import (
+    PartitionRepository,
+    PARTITIONED_TABLES,
+    partition_month
+)
+from config import PARTITION_MONTHS_AHEAD, PARTITION_MAINTENANCE_INTERVAL_SECONDS
+
+logger = logging.getLogger(__name__)
+
+def month_range(first_month: date, last_month: date) -> List[date]:
+    months = []
+    month = first_month
+    while month <= last_month:
+        months.append(month)
+        month += relativedelta(months=1)
+    return months
+
+class PartitionService:
+    def __init__(self, db: AsyncSession):
+        self.partition_repository = PartitionRepository(db)
+
+    async def get_status(self) -> Dict[str, List[str]]:
+        status = {}
+        for table, _, _ in PARTITIONED_TABLES:
+            if await self.partition_repository.is_partitioned(table):
+                status[table] = await self.partition_repository.get_partitions(table)
+            else:
+                status[table] = []
+        return status
+
+    async def convert(self, months_ahead: int = PARTITION_MONTHS_AHEAD) -> List[date]:
+        # One-off, all-or-nothing rewrite of sales and its line tables into monthly
+        # partitions. It copies every row, so run it in a maintenance window.
+        repository = self.partition_repository
+        try:
+            await repository.lock()
+            if await repository.is_partitioned("sales"):
+                raise ValueError("sales is already partitioned.")
+            for table, column, _ in PARTITIONED_TABLES:
+                missing = await repository.count_missing_partition_keys(table, column)
+                if missing:
+                    raise ValueError(f"{missing} row(s) in {table} have no {column}; they cannot be routed to a partition.")
+
+            current_month = date.today().replace(day=1)
+            months = month_range(
+                await repository.get_first_month() or current_month,
+                current_month + relativedelta(months=months_ahead)
+            )
+            partitioned_tables = [table for table, _, _ in PARTITIONED_TABLES]
+            definitions = {}
+            sequences = {}
+            for table in partitioned_tables:
+                definitions[table] = await repository.get_table_definitions(table, partitioned_tables)
+                sequences[table] = await repository.get_id_sequence(table)
+            for table in partitioned_tables:
+                if sequences[table]:
+                    await repository.set_sequence_owner(sequences[table], None)
+                await repository.rename_table(table, f"{table}_unpartitioned")
+
+            for table, column, _ in PARTITIONED_TABLES:
+                await repository.create_partitioned_table(table, column, f"{table}_unpartitioned")
+                for month in months:
+                    await repository.create_month_partition(table, month, month + relativedelta(months=1))
+                await repository.copy_rows(table, f"{table}_unpartitioned")
+
+            for table in reversed(partitioned_tables):
+                await repository.drop_table(f"{table}_unpartitioned")
+
+            for table, column, references in PARTITIONED_TABLES:
+                await repository.add_primary_key(table, column)
+                for fk_column, referenced_table in references:
+                    await repository.add_aligned_foreign_key(table, column, fk_column, referenced_table)
+                for definition in definitions[table]["foreign_keys"] + definitions[table]["indexes"] + definitions[table]["triggers"]:
+                    await repository.execute_definition(definition)
+                if sequences[table]:
+                    await repository.set_sequence_owner(sequences[table], f"{table}.id")
+                await repository.analyze(table)
+            await repository.commit()
+            return months
+        except Exception:
+            await repository.rollback()
+            raise
+
+    async def create_future_partitions(self, months_ahead: int = PARTITION_MONTHS_AHEAD) -> List[str]:
+        repository = self.partition_repository
+        try:
+            await repository.lock()
+            if not await repository.is_partitioned("sales"):
+                await repository.rollback()
+                return []
+            current_month = date.today().replace(day=1)
+            created = []
+            for table, _, _ in PARTITIONED_TABLES:
+                for month in month_range(current_month, current_month + relativedelta(months=months_ahead)):
+                    if await repository.create_month_partition(table, month, month + relativedelta(months=1)):
+                        created.append(f"{table}:{month:%Y-%m}")
+            await repository.commit()
+            return created
+        except Exception:
+            await repository.rollback()
+            raise
+
+    async def archive(self, retention_months: int, drop: bool = False) -> List[str]:
+        # Detached partitions move to the archive schema (or are dropped). The daily
+        # aggregates for those months are kept, so dashboards still cover them.
+        if retention_months < 1:
+            raise ValueError("retention_months must be at least 1.")
+        repository = self.partition_repository
+        cutoff = date.today().replace(day=1) - relativedelta(months=retention_months)
+        try:
+            await repository.lock()
+            if not await repository.is_partitioned("sales"):
+                raise ValueError("sales is not partitioned; run the convert command first.")
+            archived = []
+            # Line tables first: a sales partition cannot leave while rows still reference it.
+            for table, _, _ in reversed(PARTITIONED_TABLES):
+                for partition in await repository.get_partitions(table):
+                    month = partition_month(table, partition)
+                    if month is None or month >= cutoff:
+                        continue
+                    if table == "sales":
+                        await repository.fold_customer_sales(partition)
+                    await repository.detach_partition(table, partition)
+                    if drop:
+                        await repository.drop_table(partition)
+                    else:
+                        await repository.archive_partition(partition)
+                    archived.append(partition)
+            await repository.commit()
+            return archived
+        except Exception:
+            await repository.rollback()
+            raise
+
+async def maintain_partitions_periodically():
+    while True:
+        try:
+            async with SessionLocal() as db:
+                created = await PartitionService(db).create_future_partitions()
+            if created:
+                logger.info("Created %d partition(s): %s", len(created), ", ".join(created))
+        except Exception:
+            logger.exception("Partition maintenance failed")
+        await asyncio.sleep(PARTITION_MAINTENANCE_INTERVAL_SECONDS)
@@ -0,0 +1,72 @@
+import hashlib
+from decimal import Decimal
+from sqlalchemy.ext.asyncio import AsyncSession
+from repositories.query_repository import QueryRepository, METRICS, DIMENSIONS, SOURCES, choose_source
+from repositories.data_version_repository import DataVersionRepository
+from data_versions import day_versions, ensure_day_versions
+from models.query import QueryRequest, QueryResponse, CatalogEntry, CatalogResponse
+from cache import get_from_cache, set_in_cache, range_cache_ttl
+
+class QueryService:
+    def __init__(self, db: AsyncSession):
+        self.query_repository = QueryRepository(db)
+        self.data_version_repository = DataVersionRepository(db)
+
+    async def build_cache_key(self, request: QueryRequest) -> str:
+        await ensure_day_versions(self.data_version_repository)
+        version = day_versions.range_version(request.start_date, request.end_date)
+        digest = hashlib.sha1(request.model_dump_json(exclude={'start_date', 'end_date'}).encode()).hexdigest()
+        return f"query:v{version}:{request.start_date}:{request.end_date}:{digest}"
+
+    def get_catalog(self) -> CatalogResponse:
+        return CatalogResponse(
+            metrics=[
+                CatalogEntry(name=name, description=description, sources=[source for source, definition in SOURCES.items() if name in definition.metrics])
+                for name, description in METRICS.items()
+            ],
+            dimensions=[
+                CatalogEntry(name=name, description=dimension.description, sources=[source for source, definition in SOURCES.items() if name in definition.dimensions])
+                for name, dimension in DIMENSIONS.items()
+            ]
+        )
+
+    async def run_query(self, request: QueryRequest) -> QueryResponse:
+        source = choose_source(request.metrics, request.dimensions + list(request.filters))
+        filters = {}
+        for dimension, values in request.filters.items():
+            if DIMENSIONS[dimension].value_type == "INTEGER":
+                try:
+                    filters[dimension] = [int(value) for value in values]
+                except ValueError:
+                    raise ValueError(f"Filter values for {dimension} must be integers.")
+            else:
+                filters[dimension] = [str(value) for value in values]
+
+        cache_key = await self.build_cache_key(request)
+        cached_data = await get_from_cache(cache_key)
+
+        if cached_data:
+            return QueryResponse(**cached_data)
+
+        rows = await self.query_repository.run_query(
+            source_name=source,
+            start_date=request.start_date,
+            end_date=request.end_date,
+            metrics=request.metrics,
+            dimensions=request.dimensions,
+            filters=filters,
+            order_by=request.order_by,
+            descending=request.descending,
+            limit=request.limit
+        )
+        response = QueryResponse(
+            start_date=request.start_date,
+            end_date=request.end_date,
+            source=source,
+            metrics=request.metrics,
+            dimensions=request.dimensions,
+            rows=[{key: float(value) if isinstance(value, Decimal) else value for key, value in row.items()} for row in rows]
+        )
+
+        await set_in_cache(cache_key, response.model_dump(mode='json'), range_cache_ttl(request.end_date))
+        return response
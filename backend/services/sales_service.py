@@ -1,83 +1,185 @@
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import date, timedelta
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 from repositories.sales_repository import SalesRepository
+from repositories.data_version_repository import DataVersionRepository
+from data_versions import day_versions, ensure_day_versions
 from models.sales import (
     SalesOverviewResponse, 
+    MonthlySummaryResponse,
+    PeriodComparison,
     TopProductsResponse, 
     TopProduct,
     SalesByDimensionResponse,
     SalesByDimensionItem,
     DeliveryPerformanceResponse,
     DeliveryPerformanceItem,
+    ProductionPerformanceResponse,
+    ProductionPerformanceItem,
     TicketTrendResponse,
     TimeSeriesDataPoint,
     TicketCompositionItem,
     TicketCompositionResponse
 )
-from cache import get_from_cache, set_in_cache
+from cache import get_from_cache, set_in_cache, range_cache_ttl
 from dateutil.relativedelta import relativedelta
 
+MONTHLY_SUMMARY_FULL_MONTHS = 12
+
+def comparison_range(start_date: date, end_date: date, compare_to: str) -> Tuple[date, date]:
+    if compare_to == 'previous_period':
+        comparison_end_date = start_date - timedelta(days=1)
+        return comparison_end_date - (end_date - start_date), comparison_end_date
+    if compare_to == 'previous_month':
+        return start_date - relativedelta(months=1), end_date - relativedelta(months=1)
+    if compare_to == 'previous_year':
+        return start_date - relativedelta(years=1), end_date - relativedelta(years=1)
+    raise ValueError("Invalid comparison. Must be 'previous_period', 'previous_month' or 'previous_year'.")
+
+def change_percentage(current: float, previous: float) -> Optional[float]:
+    if not previous:
+        return None
+    return (current - previous) / previous * 100
+
+NO_CUSTOMERS = {"customer_sales": 0, "unique_customers": 0}
+
+def build_period_kpis(data: Dict[str, Any]) -> Dict[str, Any]:
+    kpis = {
+        "total_revenue": float(data.get('total_revenue') or 0),
+        "total_sales_count": int(data.get('total_sales_count') or 0),
+        "average_ticket_value": float(data.get('average_ticket_value') or 0)
+    }
+    if 'unique_customers' in data:
+        customer_sales = int(data['customer_sales'] or 0)
+        kpis["unique_customers"] = int(data['unique_customers'] or 0)
+        kpis["repeat_purchase_rate"] = (customer_sales - kpis["unique_customers"]) / customer_sales if customer_sales else None
+    return kpis
+
+def build_period_comparison(current_data: Dict[str, Any], previous_data: Dict[str, Any]) -> PeriodComparison:
+    current, previous = build_period_kpis(current_data), build_period_kpis(previous_data)
+    return PeriodComparison(
+        **previous,
+        revenue_change_percentage=change_percentage(current['total_revenue'], previous['total_revenue']),
+        sales_count_change_percentage=change_percentage(current['total_sales_count'], previous['total_sales_count']),
+        average_ticket_change_percentage=change_percentage(current['average_ticket_value'], previous['average_ticket_value']),
+        unique_customers_change_percentage=change_percentage(current.get('unique_customers') or 0, previous.get('unique_customers') or 0)
+    )
+
 class SalesService:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.sales_repository = SalesRepository(db)
+        self.data_version_repository = DataVersionRepository(db)
+
+    async def get_customer_estimates(self, start_date: date, end_date: date, dimension: Optional[str] = None) -> Dict[int, Dict[str, Any]]:
+        estimates = await self.sales_repository.get_customer_estimates(start_date, end_date, dimension)
+        return {estimate['dimension_id']: estimate for estimate in estimates}
+
+    async def build_cache_key(self, prefix: str, start_date: date, end_date: date, *parts: Any, version_start_date: Optional[date] = None) -> str:
+        await ensure_day_versions(self.data_version_repository)
+        version = day_versions.range_version(version_start_date or start_date, end_date)
+        return ":".join([prefix, f"v{version}", str(start_date), str(end_date)] + [str(part) for part in parts])
+
+    async def build_comparison_cache_key(self, prefix: str, start_date: date, end_date: date, compare_to: Optional[str], *parts: Any) -> str:
+        version_start_date = None
+        if compare_to:
+            version_start_date = min(start_date, comparison_range(start_date, end_date, compare_to)[0])
+        return await self.build_cache_key(prefix, start_date, end_date, compare_to, *parts, version_start_date=version_start_date)
+
+    # One key builder per cached endpoint, taking the endpoint's own arguments, so the
+    # endpoints and BatchService look results up under the same keys.
+    async def sales_overview_cache_key(self, start_date: date, end_date: date, compare_to: Optional[str] = None) -> str:
+        return await self.build_comparison_cache_key("sales_overview", start_date, end_date, compare_to)
+
+    async def top_products_cache_key(self, start_date: date, end_date: date, limit: int, channel_id: Optional[int] = None, store_id: Optional[int] = None, day_of_week: Optional[int] = None, start_hour: Optional[int] = None, end_hour: Optional[int] = None) -> str:
+        return await self.build_cache_key("top_products", start_date, end_date, limit, channel_id, store_id, day_of_week, start_hour, end_hour)
 
-    def get_sales_overview(self, start_date: date, end_date: date) -> SalesOverviewResponse:
-        cache_key = f"sales_overview:{start_date}:{end_date}"
-        cached_data = get_from_cache(cache_key)
+    async def sales_breakdown_cache_key(self, start_date: date, end_date: date, dimension: str, compare_to: Optional[str] = None) -> str:
+        return await self.build_comparison_cache_key("sales_breakdown", start_date, end_date, compare_to, dimension)
+
+    async def delivery_performance_cache_key(self, start_date: date, end_date: date, dimension: str, day_of_week: Optional[int] = None, start_hour: Optional[int] = None, end_hour: Optional[int] = None) -> str:
+        return await self.build_cache_key("delivery_performance", start_date, end_date, dimension, day_of_week, start_hour, end_hour)
+
+    async def ticket_trend_cache_key(self, start_date: date, end_date: date) -> str:
+        return await self.build_cache_key("ticket_trend", start_date, end_date)
+
+    async def ticket_composition_cache_key(self, start_date: date, end_date: date) -> str:
+        return await self.build_cache_key("ticket_composition", start_date, end_date)
+
+    async def get_sales_overview(self, start_date: date, end_date: date, compare_to: Optional[str] = None) -> SalesOverviewResponse:
+        cache_key = await self.sales_overview_cache_key(start_date, end_date, compare_to)
+        cached_data = await get_from_cache(cache_key)
 
         if cached_data:
             return SalesOverviewResponse(**cached_data)
 
-        overview_data = self.sales_repository.get_sales_overview(start_date, end_date)
-        response = SalesOverviewResponse(
-            total_revenue=float(overview_data.get('total_revenue', 0)),
-            total_sales_count=int(overview_data.get('total_sales_count', 0)),
-            average_ticket_value=float(overview_data.get('average_ticket_value', 0)),
-            start_date=start_date,
-            end_date=end_date
-        )
-
-        set_in_cache(cache_key, response.model_dump(mode='json'))
+        if compare_to:
+            comparison_start_date, comparison_end_date = comparison_range(start_date, end_date, compare_to)
+            overview_data, comparison_data = await self.sales_repository.get_period_comparison(
+                [(start_date, end_date), (comparison_start_date, comparison_end_date)]
+            )
+            overview_customers = await self.get_customer_estimates(start_date, end_date)
+            comparison_customers = await self.get_customer_estimates(comparison_start_date, comparison_end_date)
+            overview_data = {**overview_data, **overview_customers.get(0, NO_CUSTOMERS)}
+            comparison_data = {**comparison_data, **comparison_customers.get(0, NO_CUSTOMERS)}
+            response = SalesOverviewResponse(
+                **build_period_kpis(overview_data),
+                start_date=start_date,
+                end_date=end_date,
+                compare_to=compare_to,
+                comparison_start_date=comparison_start_date,
+                comparison_end_date=comparison_end_date,
+                comparison=build_period_comparison(overview_data, comparison_data)
+            )
+        else:
+            overview_data = await self.sales_repository.get_sales_overview(start_date, end_date)
+            overview_customers = await self.get_customer_estimates(start_date, end_date)
+            overview_data = {**overview_data, **overview_customers.get(0, NO_CUSTOMERS)}
+            response = SalesOverviewResponse(
+                **build_period_kpis(overview_data),
+                start_date=start_date,
+                end_date=end_date
+            )
+
+        await set_in_cache(cache_key, response.model_dump(mode='json'), range_cache_ttl(end_date))
         return response
 
-    def get_monthly_summary(self) -> Dict[str, Any]:
+    async def get_monthly_summary(self) -> MonthlySummaryResponse:
         today = date.today()
-        cache_key = f"monthly_summary:{today.strftime('%Y-%m-%d')}"
-        cached_data = get_from_cache(cache_key)
-        if cached_data:
-            return cached_data
-
         start_of_current_month = today.replace(day=1)
-        current_month_overview = self.sales_repository.get_sales_overview(start_date=start_of_current_month, end_date=today)
-        current_month_revenue = current_month_overview.get('total_revenue') or 0.0
-
         start_of_previous_month = start_of_current_month - relativedelta(months=1)
-        end_of_previous_month_same_day = min(today.replace(month=start_of_previous_month.month, year=start_of_previous_month.year), start_of_previous_month + relativedelta(months=1) - timedelta(days=1))
-        
-        previous_month_overview_same_day = self.sales_repository.get_sales_overview(start_date=start_of_previous_month, end_date=end_of_previous_month_same_day)
-        previous_month_revenue_same_day = previous_month_overview_same_day.get('total_revenue') or 0.0
-
-        total_revenue_last_3_full_months = 0.0
-        for i in range(1, 4):
-            month_end = start_of_current_month - relativedelta(months=i, days=1)
-            month_start = month_end.replace(day=1)
-            
-            monthly_overview = self.sales_repository.get_sales_overview(start_date=month_start, end_date=month_end)
-            total_revenue_last_3_full_months += monthly_overview.get('total_revenue') or 0.0
-        
-        last_3_months_avg_revenue = (total_revenue_last_3_full_months / 3) if total_revenue_last_3_full_months > 0 else 0.0
-
-        response = {
-            "current_month_revenue": current_month_revenue,
-            "previous_month_revenue_same_day": previous_month_revenue_same_day,
-            "last_3_months_avg_revenue": last_3_months_avg_revenue,
-        }
+        # relativedelta clamps to the last day of a shorter previous month.
+        end_of_previous_month_same_day = today - relativedelta(months=1)
+        full_months = []
+        for i in range(1, MONTHLY_SUMMARY_FULL_MONTHS + 1):
+            month_start = start_of_current_month - relativedelta(months=i)
+            full_months.append((month_start, month_start + relativedelta(months=1) - timedelta(days=1)))
+
+        cache_key = await self.build_cache_key("monthly_summary", full_months[-1][0], today)
+        cached_data = await get_from_cache(cache_key)
+        if cached_data:
+            return MonthlySummaryResponse(**cached_data)
+
+        periods = [(start_of_current_month, today), (start_of_previous_month, end_of_previous_month_same_day)] + full_months
+        period_data = await self.sales_repository.get_period_comparison(periods)
+        overviews = [
+            SalesOverviewResponse(**build_period_kpis(data), start_date=period_start, end_date=period_end)
+            for (period_start, period_end), data in zip(periods, period_data)
+        ]
+        current_month, previous_month_same_day, last_full_months = overviews[0], overviews[1], overviews[2:]
+
+        response = MonthlySummaryResponse(
+            current_month_revenue=current_month.total_revenue,
+            previous_month_revenue_same_day=previous_month_same_day.total_revenue,
+            last_3_months_avg_revenue=sum(month.total_revenue for month in last_full_months[:3]) / 3,
+            current_month=current_month,
+            previous_month_same_day=previous_month_same_day,
+            last_full_months=last_full_months
+        )
 
-        set_in_cache(cache_key, response)
+        await set_in_cache(cache_key, response.model_dump(mode='json'), range_cache_ttl(today))
         return response
 
-    def get_top_products(
+    async def get_top_products(
         self, 
         start_date: date, 
         end_date: date, 
@@ -88,13 +190,13 @@ class SalesService:
         start_hour: Optional[int] = None,
         end_hour: Optional[int] = None
     ) -> TopProductsResponse:
-        cache_key = f"top_products:{start_date}:{end_date}:{limit}:{channel_id}:{store_id}:{day_of_week}:{start_hour}:{end_hour}"
-        cached_data = get_from_cache(cache_key)
+        cache_key = await self.top_products_cache_key(start_date, end_date, limit, channel_id, store_id, day_of_week, start_hour, end_hour)
+        cached_data = await get_from_cache(cache_key)
 
         if cached_data:
             return TopProductsResponse(**cached_data)
 
-        top_products_data = self.sales_repository.get_top_products(
+        top_products_data = await self.sales_repository.get_top_products(
             start_date=start_date, 
             end_date=end_date, 
             limit=limit, 
@@ -112,41 +214,76 @@ class SalesService:
             top_products=top_products
         )
 
-        set_in_cache(cache_key, response.model_dump(mode='json'))
+        await set_in_cache(cache_key, response.model_dump(mode='json'), range_cache_ttl(end_date))
         return response
 
-    def get_sales_breakdown(self, start_date: date, end_date: date, dimension: str) -> SalesByDimensionResponse:
-        cache_key = f"sales_breakdown:{start_date}:{end_date}:{dimension}"
-        cached_data = get_from_cache(cache_key)
+    async def get_sales_breakdown(self, start_date: date, end_date: date, dimension: str, compare_to: Optional[str] = None) -> SalesByDimensionResponse:
+        cache_key = await self.sales_breakdown_cache_key(start_date, end_date, dimension, compare_to)
+        cached_data = await get_from_cache(cache_key)
 
         if cached_data:
             return SalesByDimensionResponse(**cached_data)
 
-        breakdown_data = self.sales_repository.get_sales_breakdown_by_dimension(
-            start_date=start_date, 
-            end_date=end_date, 
-            dimension=dimension
-        )
-
-        breakdown_items = [SalesByDimensionItem(**item) for item in breakdown_data]
-        response = SalesByDimensionResponse(
-            start_date=start_date,
-            end_date=end_date,
-            dimension=dimension,
-            breakdown=breakdown_items
-        )
-
-        set_in_cache(cache_key, response.model_dump(mode='json'))
+        if compare_to:
+            comparison_start_date, comparison_end_date = comparison_range(start_date, end_date, compare_to)
+            breakdown_data = await self.sales_repository.get_sales_breakdown_comparison(
+                periods=[(start_date, end_date), (comparison_start_date, comparison_end_date)],
+                dimension=dimension
+            )
+            current_customers = await self.get_customer_estimates(start_date, end_date, dimension)
+            comparison_customers = await self.get_customer_estimates(comparison_start_date, comparison_end_date, dimension)
+            breakdown_items = []
+            for item in breakdown_data:
+                current = {**item['periods'][0], **current_customers.get(item['dimension_id'], NO_CUSTOMERS)}
+                previous = {**item['periods'][1], **comparison_customers.get(item['dimension_id'], NO_CUSTOMERS)}
+                breakdown_items.append(SalesByDimensionItem(
+                    dimension_id=item['dimension_id'],
+                    dimension_name=item['dimension_name'],
+                    **build_period_kpis(current),
+                    comparison=build_period_comparison(current, previous)
+                ))
+            response = SalesByDimensionResponse(
+                start_date=start_date,
+                end_date=end_date,
+                dimension=dimension,
+                breakdown=breakdown_items,
+                compare_to=compare_to,
+                comparison_start_date=comparison_start_date,
+                comparison_end_date=comparison_end_date
+            )
+        else:
+            breakdown_data = await self.sales_repository.get_sales_breakdown_by_dimension(
+                start_date=start_date, 
+                end_date=end_date, 
+                dimension=dimension
+            )
+            customers = await self.get_customer_estimates(start_date, end_date, dimension)
+            breakdown_items = [
+                SalesByDimensionItem(
+                    dimension_id=item['dimension_id'],
+                    dimension_name=item['dimension_name'],
+                    **build_period_kpis({**item, **customers.get(item['dimension_id'], NO_CUSTOMERS)})
+                )
+                for item in breakdown_data
+            ]
+            response = SalesByDimensionResponse(
+                start_date=start_date,
+                end_date=end_date,
+                dimension=dimension,
+                breakdown=breakdown_items
+            )
+
+        await set_in_cache(cache_key, response.model_dump(mode='json'), range_cache_ttl(end_date))
         return response
 
-    def get_delivery_performance(self, start_date: date, end_date: date, dimension: str, day_of_week: Optional[int] = None, start_hour: Optional[int] = None, end_hour: Optional[int] = None) -> DeliveryPerformanceResponse:
-        cache_key = f"delivery_performance:{start_date}:{end_date}:{dimension}:{day_of_week}:{start_hour}:{end_hour}"
-        cached_data = get_from_cache(cache_key)
+    async def get_delivery_performance(self, start_date: date, end_date: date, dimension: str, day_of_week: Optional[int] = None, start_hour: Optional[int] = None, end_hour: Optional[int] = None) -> DeliveryPerformanceResponse:
+        cache_key = await self.delivery_performance_cache_key(start_date, end_date, dimension, day_of_week, start_hour, end_hour)
+        cached_data = await get_from_cache(cache_key)
 
         if cached_data:
             return DeliveryPerformanceResponse(**cached_data)
 
-        performance_data = self.sales_repository.get_delivery_performance_by_dimension(
+        performance_data = await self.sales_repository.get_delivery_performance_by_dimension(
             start_date=start_date, 
             end_date=end_date, 
             dimension=dimension,
@@ -163,17 +300,43 @@ class SalesService:
             performance_breakdown=performance_items
         )
 
-        set_in_cache(cache_key, response.model_dump(mode='json'))
+        await set_in_cache(cache_key, response.model_dump(mode='json'), range_cache_ttl(end_date))
+        return response
+
+    async def get_production_performance(self, start_date: date, end_date: date, dimension: str, day_of_week: Optional[int] = None) -> ProductionPerformanceResponse:
+        cache_key = await self.build_cache_key("production_performance", start_date, end_date, dimension, day_of_week)
+        cached_data = await get_from_cache(cache_key)
+
+        if cached_data:
+            return ProductionPerformanceResponse(**cached_data)
+
+        performance_data = await self.sales_repository.get_time_percentiles_by_dimension(
+            measure="production",
+            count_alias="total_sales",
+            start_date=start_date,
+            end_date=end_date,
+            dimension=dimension,
+            day_of_week=day_of_week
+        )
+
+        response = ProductionPerformanceResponse(
+            start_date=start_date,
+            end_date=end_date,
+            dimension=dimension,
+            performance_breakdown=[ProductionPerformanceItem(**item) for item in performance_data]
+        )
+
+        await set_in_cache(cache_key, response.model_dump(mode='json'), range_cache_ttl(end_date))
         return response
 
-    def get_ticket_trend(self, start_date: date, end_date: date) -> TicketTrendResponse:
-        cache_key = f"ticket_trend:{start_date}:{end_date}"
-        cached_data = get_from_cache(cache_key)
+    async def get_ticket_trend(self, start_date: date, end_date: date) -> TicketTrendResponse:
+        cache_key = await self.ticket_trend_cache_key(start_date, end_date)
+        cached_data = await get_from_cache(cache_key)
 
         if cached_data:
             return TicketTrendResponse(**cached_data)
 
-        trend_data = self.sales_repository.get_ticket_trend(start_date, end_date)
+        trend_data = await self.sales_repository.get_ticket_trend(start_date, end_date)
         
         response = TicketTrendResponse(
             start_date=start_date,
@@ -181,17 +344,17 @@ class SalesService:
             trend=[TimeSeriesDataPoint(**point) for point in trend_data]
         )
 
-        set_in_cache(cache_key, response.model_dump(mode='json'))
+        await set_in_cache(cache_key, response.model_dump(mode='json'), range_cache_ttl(end_date))
         return response
 
-    def get_ticket_composition(self, start_date: date, end_date: date) -> TicketCompositionResponse:
-        cache_key = f"ticket_composition:{start_date}:{end_date}"
-        cached_data = get_from_cache(cache_key)
+    async def get_ticket_composition(self, start_date: date, end_date: date) -> TicketCompositionResponse:
+        cache_key = await self.ticket_composition_cache_key(start_date, end_date)
+        cached_data = await get_from_cache(cache_key)
 
         if cached_data:
             return TicketCompositionResponse(**cached_data)
 
-        composition_data = self.sales_repository.get_sales_composition_by_category(start_date, end_date)
+        composition_data = await self.sales_repository.get_sales_composition_by_category(start_date, end_date)
         
         composition_items = [TicketCompositionItem(**item) for item in composition_data]
         response = TicketCompositionResponse(
@@ -200,5 +363,5 @@ class SalesService:
             composition=composition_items
         )
 
-        set_in_cache(cache_key, response.model_dump(mode='json'))
+        await set_in_cache(cache_key, response.model_dump(mode='json'), range_cache_ttl(end_date))
         return response
@@ -109,7 +109,11 @@ CREATE TABLE sales (
     delivery_seconds INTEGER,
     discount_reason VARCHAR(255),
     people_quantity INTEGER,
-    origin VARCHAR(255)
+    origin VARCHAR(255),
+    -- Stored so date, weekday and hour filters can use plain indexes
+    sale_date DATE GENERATED ALWAYS AS (CAST(created_at AS DATE)) STORED,
+    iso_dow SMALLINT GENERATED ALWAYS AS (EXTRACT(ISODOW FROM created_at)) STORED,
+    hour SMALLINT GENERATED ALWAYS AS (EXTRACT(HOUR FROM created_at)) STORED
 );
 
 CREATE TABLE product_sales (
@@ -119,7 +123,8 @@ CREATE TABLE product_sales (
     quantity INTEGER,
     base_price DECIMAL(10, 2),
     total_price DECIMAL(10, 2),
-    observations TEXT
+    observations TEXT,
+    sale_created_at TIMESTAMP
 );
 
 CREATE TABLE item_product_sales (
@@ -131,7 +136,8 @@ CREATE TABLE item_product_sales (
     additional_price DECIMAL(10, 2),
     price DECIMAL(10, 2),
     amount INTEGER,
-    observations TEXT
+    observations TEXT,
+    sale_created_at TIMESTAMP
 );
 
 CREATE TABLE item_item_product_sales (
@@ -141,7 +147,8 @@ CREATE TABLE item_item_product_sales (
     option_group_id INTEGER REFERENCES option_groups(id),
     quantity INTEGER,
     additional_price DECIMAL(10, 2),
-    price DECIMAL(10, 2)
+    price DECIMAL(10, 2),
+    sale_created_at TIMESTAMP
 );
 
 CREATE TABLE delivery_sales (
@@ -153,7 +160,8 @@ CREATE TABLE delivery_sales (
     delivery_type VARCHAR(255),
     status VARCHAR(255),
     delivery_fee DECIMAL(10, 2),
-    courier_fee DECIMAL(10, 2)
+    courier_fee DECIMAL(10, 2),
+    sale_created_at TIMESTAMP
 );
 
 CREATE TABLE delivery_addresses (
@@ -168,7 +176,8 @@ CREATE TABLE delivery_addresses (
     state VARCHAR(2),
     postal_code VARCHAR(10),
     latitude DECIMAL(10, 8),
-    longitude DECIMAL(11, 8)
+    longitude DECIMAL(11, 8),
+    sale_created_at TIMESTAMP
 );
 
 CREATE TABLE payments (
@@ -176,5 +185,6 @@ CREATE TABLE payments (
     sale_id INTEGER REFERENCES sales(id),
     payment_type_id INTEGER REFERENCES payment_types(id),
     value DECIMAL(10, 2),
-    is_online BOOLEAN
+    is_online BOOLEAN,
+    sale_created_at TIMESTAMP
 );
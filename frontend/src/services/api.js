@@ -63,8 +63,16 @@ export const getFilterOptions = () => {
   return apiClient.get('/filters/options');
 };
 
-export const getCustomerChurnRisk = (minPurchases, inactiveDays) => {
-  return apiClient.get('/analytics/customer-churn-risk', {
+export const getCustomerChurnRisk = (minPurchases, inactiveDays, cursor = null, limit = 100) => {
+  const params = { min_purchases: minPurchases, inactive_days: inactiveDays, limit };
+  if (cursor) {
+    params.cursor = cursor;
+  }
+  return apiClient.get('/analytics/customer-churn-risk', { params });
+};
+
+export const getCustomerChurnRiskCount = (minPurchases, inactiveDays) => {
+  return apiClient.get('/analytics/customer-churn-risk/count', {
     params: { min_purchases: minPurchases, inactive_days: inactiveDays }
   });
 };
@@ -4,12 +4,16 @@ God Level Coder Challenge - Data Generator
 Generates realistic restaurant data based on Arcca's actual models
 """
 
+import io
+import os
 import random
+import struct
 import argparse
-from datetime import datetime, timedelta
+import multiprocessing
+from datetime import date, datetime, timedelta
 from decimal import Decimal
+import numpy as np
 import psycopg2
-from psycopg2.extras import execute_batch
 from faker import Faker
 
 fake = Faker('pt_BR')
@@ -69,6 +73,18 @@ DISCOUNT_REASONS = [
 
 DELIVERY_TYPES = ['DELIVERY', 'TAKEOUT', 'INDOOR']
 COURIER_TYPES = ['PLATFORM', 'OWN', 'THIRD_PARTY']
+COMPLEMENTS = ['Apto 101', 'Casa', 'Bloco A', 'Fundos', None, None]
+
+# Scale factor 1 is the original dataset: 50 stores, 10k customers, ~2700 sales a day
+BASE_STORES = 50
+BASE_CUSTOMERS = 10000
+SALES_PER_STORE_DAY = 2700 / BASE_STORES
+DAILY_SALES_STDDEV = 400 / 2700
+
+# Sharding: one shard per block of stores and days, each with its own random streams
+STORES_PER_SHARD = 50
+DAYS_PER_SHARD = 7
+FAKE_POOL_SIZE = 2000
 
 
 def get_db_connection(db_url):
@@ -123,11 +139,14 @@ def setup_base_data(conn):
     return sub_brand_ids, channel_ids
 
 
-def generate_stores(conn, sub_brand_ids, num_stores=50):
+def generate_stores(conn, sub_brand_ids, num_stores=50, end_date=None):
     """Generate realistic stores"""
     print(f"Generating {num_stores} stores...")
     cursor = conn.cursor()
     stores = []
+    # Dates are relative to the end of the data, not today, so a seeded run is reproducible
+    end_date = end_date or date.today()
+    end_time = datetime.combine(end_date, datetime.min.time())
     
     cities = [fake.city() for _ in range(20)]
     
@@ -158,8 +177,8 @@ def generate_stores(conn, sub_brand_ids, num_stores=50):
             Decimal(str(round(base_lat, 6))),
             Decimal(str(round(base_long, 6))),
             is_active, is_own,
-            fake.date_between(start_date='-2y', end_date='-6m'),
-            datetime.now() - timedelta(days=random.randint(180, 720))
+            fake.date_between(start_date=end_date - timedelta(days=730), end_date=end_date - timedelta(days=182)),
+            end_time - timedelta(days=random.randint(180, 720))
         ))
         stores.append(cursor.fetchone()[0])
     
@@ -272,31 +291,28 @@ def generate_products_and_items(conn, sub_brand_ids, num_products=500, num_items
     return products, items, option_groups
 
 
-def generate_customers(conn, num_customers=10000):
+def generate_customers(conn, num_customers=10000, end_date=None):
     """Generate customers"""
     print(f"Generating {num_customers} customers...")
     cursor = conn.cursor()
+    end_date = end_date or date.today()
+    end_time = datetime.combine(end_date, datetime.min.time())
     
     batch = []
     for _ in range(num_customers):
         batch.append((
             fake.name(), fake.email(), fake.phone_number(), fake.cpf(),
-            fake.date_of_birth(minimum_age=18, maximum_age=75),
+            fake.date_between(start_date=end_date - timedelta(days=75 * 365), end_date=end_date - timedelta(days=18 * 365)),
             random.choice(['M', 'F', 'NB', 'O']),
             random.choice([True, False]),
             random.choice([True, False, False]),  # 33% accept email
             random.choice(['qr_code', 'link', 'balcony', 'pos']),
-            datetime.now() - timedelta(days=random.randint(0, 720))
+            end_time - timedelta(days=random.randint(0, 720))
         ))
     
-    execute_batch(cursor, """
-        INSERT INTO customers (
-            customer_name, email, phone_number, cpf, birth_date, gender,
-            agree_terms, receive_promotions_email, registration_origin, created_at
-        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-    """, batch, page_size=1000)
+    copy_rows(cursor, 'customers', CUSTOMERS_COLUMNS, batch)
     
-    cursor.execute("SELECT id FROM customers")
+    cursor.execute("SELECT id FROM customers ORDER BY id")
     customer_ids = [row[0] for row in cursor.fetchall()]
     
     conn.commit()
@@ -304,339 +320,517 @@ def generate_customers(conn, num_customers=10000):
     return customer_ids
 
 
-def generate_sales(conn, stores, channels, products, items, option_groups, customers, months=6):
-    """Generate sales with realistic patterns"""
-    print(f"Generating sales for {months} months...")
-    
+PG_EPOCH = datetime(2000, 1, 1)
+COPY_HEADER = b'PGCOPY\n\xff\r\n\x00' + struct.pack('!ii', 0, 0)
+COPY_NULL = struct.pack('!i', -1)
+
+
+def encode_int(value):
+    return struct.pack('!i', value)
+
+
+def encode_bool(value):
+    return b'\x01' if value else b'\x00'
+
+
+def encode_text(value):
+    return value.encode('utf-8')
+
+
+def encode_date(value):
+    return struct.pack('!i', (value - PG_EPOCH.date()).days)
+
+
+def encode_timestamp(value):
+    delta = value - PG_EPOCH
+    return struct.pack('!q', (delta.days * 86400 + delta.seconds) * 1000000 + delta.microseconds)
+
+
+def numeric_encoder(scale):
+    """Binary NUMERIC with a fixed scale: base-10000 digits, a weight and a sign"""
+    fraction_groups = (scale + 3) // 4
+    # Shifts the decimal point onto a base-10000 digit boundary
+    padding = 10 ** (fraction_groups * 4 - scale)
+    multiplier = 10 ** scale
+
+    def encode(value):
+        scaled = round(value * multiplier) * padding
+        number = abs(scaled)
+        groups = []
+        while number:
+            number, group = divmod(number, 10000)
+            groups.append(group)
+        weight = len(groups) - 1 - fraction_groups
+        groups.reverse()
+        while groups and groups[-1] == 0:
+            groups.pop()
+        return struct.pack(f'!hhhh{len(groups)}h', len(groups), weight if groups else 0, 0x4000 if scaled < 0 else 0, scale, *groups)
+
+    return encode
+
+
+encode_money = numeric_encoder(2)
+encode_coordinate = numeric_encoder(8)
+
+
+def copy_rows(cursor, table, columns, rows):
+    """Stream rows into a table with COPY ... FROM STDIN in binary format"""
+    buffer = io.BytesIO()
+    buffer.write(COPY_HEADER)
+    field_count = struct.pack('!h', len(columns))
+    encoders = [encoder for _, encoder in columns]
+    for row in rows:
+        buffer.write(field_count)
+        for encoder, value in zip(encoders, row):
+            if value is None:
+                buffer.write(COPY_NULL)
+            else:
+                data = encoder(value)
+                buffer.write(struct.pack('!i', len(data)))
+                buffer.write(data)
+    buffer.write(struct.pack('!h', -1))
+    buffer.seek(0)
+    column_names = ', '.join(name for name, _ in columns)
+    cursor.copy_expert(f"COPY {table} ({column_names}) FROM STDIN WITH (FORMAT binary)", buffer)
+
+
+CUSTOMERS_COLUMNS = [
+    ('customer_name', encode_text), ('email', encode_text),
+    ('phone_number', encode_text), ('cpf', encode_text),
+    ('birth_date', encode_date), ('gender', encode_text),
+    ('agree_terms', encode_bool), ('receive_promotions_email', encode_bool),
+    ('registration_origin', encode_text), ('created_at', encode_timestamp)
+]
+SALES_COLUMNS = [
+    ('id', encode_int), ('store_id', encode_int), ('customer_id', encode_int),
+    ('channel_id', encode_int), ('customer_name', encode_text),
+    ('created_at', encode_timestamp), ('sale_status_desc', encode_text),
+    ('total_amount_items', encode_money), ('total_discount', encode_money),
+    ('total_increase', encode_money), ('delivery_fee', encode_money),
+    ('service_tax_fee', encode_money), ('total_amount', encode_money),
+    ('value_paid', encode_money), ('production_seconds', encode_int),
+    ('delivery_seconds', encode_int), ('discount_reason', encode_text),
+    ('people_quantity', encode_int), ('origin', encode_text)
+]
+PRODUCT_SALES_COLUMNS = [
+    ('id', encode_int), ('sale_id', encode_int), ('product_id', encode_int),
+    ('quantity', encode_int), ('base_price', encode_money),
+    ('total_price', encode_money), ('sale_created_at', encode_timestamp)
+]
+ITEM_PRODUCT_SALES_COLUMNS = [
+    ('id', encode_int), ('product_sale_id', encode_int), ('item_id', encode_int),
+    ('option_group_id', encode_int), ('quantity', encode_int),
+    ('additional_price', encode_money), ('price', encode_money),
+    ('amount', encode_int), ('sale_created_at', encode_timestamp)
+]
+DELIVERY_SALES_COLUMNS = [
+    ('id', encode_int), ('sale_id', encode_int), ('courier_name', encode_text),
+    ('courier_phone', encode_text), ('courier_type', encode_text),
+    ('delivery_type', encode_text), ('status', encode_text),
+    ('delivery_fee', encode_money), ('courier_fee', encode_money),
+    ('sale_created_at', encode_timestamp)
+]
+DELIVERY_ADDRESSES_COLUMNS = [
+    ('id', encode_int), ('sale_id', encode_int), ('delivery_sale_id', encode_int),
+    ('street', encode_text), ('number', encode_text), ('complement', encode_text),
+    ('neighborhood', encode_text), ('city', encode_text), ('state', encode_text),
+    ('postal_code', encode_text), ('latitude', encode_coordinate),
+    ('longitude', encode_coordinate), ('sale_created_at', encode_timestamp)
+]
+PAYMENTS_COLUMNS = [
+    ('id', encode_int), ('sale_id', encode_int), ('payment_type_id', encode_int),
+    ('value', encode_money), ('sale_created_at', encode_timestamp)
+]
+
+# Every table a shard writes, parents first; each gets a reserved id block
+SHARD_TABLES = ['sales', 'product_sales', 'item_product_sales', 'delivery_sales', 'delivery_addresses', 'payments']
+
+
+def get_payment_type_ids(conn):
     cursor = conn.cursor()
-    start_date = datetime.now() - timedelta(days=30 * months)
-    end_date = datetime.now()
-    
-    # Anomalies
-    anomaly_week = start_date + timedelta(days=random.randint(30, 60))
-    promo_day = start_date + timedelta(days=random.randint(90, 120))
-    
-    current_date = start_date
-    total_sales = 0
-    batch_size = 500
-    
-    while current_date <= end_date:
-        weekday = current_date.weekday()
-        day_mult = WEEKDAY_MULT[weekday]
-        
-        # Anomaly: bad week
-        if anomaly_week <= current_date < anomaly_week + timedelta(days=7):
+    cursor.execute("SELECT description, MIN(id) FROM payment_types GROUP BY description")
+    return dict(cursor.fetchall())
+
+
+def cumulative_table(weights):
+    """CDF for vectorized weighted sampling with searchsorted"""
+    cdf = np.cumsum(np.asarray(weights, dtype=float))
+    cdf /= cdf[-1]
+    cdf[-1] = 1.0
+    return cdf
+
+
+def sample(rng, cdf, size):
+    return np.searchsorted(cdf, rng.random(size), side='right')
+
+
+def build_sampling_tables(stores, channels, products, items, option_groups, customers, payment_type_ids):
+    """Everything a worker samples from, precomputed once"""
+    return {
+        'store_ids': np.array(stores),
+        'hour_cdf': cumulative_table([get_hour_weight(h) for h in range(24)]),
+        'channel_cdf': cumulative_table([c['weight'] for c in channels]),
+        'channel_ids': np.array([c['id'] for c in channels]),
+        'channel_is_delivery': np.array([c['type'] == 'D' for c in channels]),
+        'channel_is_presencial': np.array([c['type'] == 'P' for c in channels]),
+        'product_cdf': cumulative_table([p['popularity'] for p in products]),
+        'product_ids': np.array([p['id'] for p in products]),
+        'product_prices': np.array([p['base_price'] for p in products]),
+        'product_customizable': np.array([p['has_customization'] for p in products]),
+        'item_ids': np.array([i['id'] for i in items]),
+        'item_prices': np.array([i['price'] for i in items]),
+        'option_group_ids': np.array(option_groups),
+        'customer_ids': np.array(customers),
+        'payment_type_ids': np.array([payment_type_ids[pt] for pt in PAYMENT_TYPES_LIST])
+    }
+
+
+def build_calendar(rng, start_date, num_days):
+    """Per-day demand multiplier: weekday pattern, daily noise, a bad week and a promo day"""
+    anomaly_week = int(rng.integers(30, 61))
+    promo_day = int(rng.integers(90, 121))
+    multipliers = []
+    for offset in range(num_days):
+        day = start_date + timedelta(days=offset)
+        day_mult = WEEKDAY_MULT[day.weekday()] * max(0.0, rng.normal(1.0, DAILY_SALES_STDDEV))
+        if anomaly_week <= offset < anomaly_week + 7:
             day_mult *= 0.7
-        
-        # Anomaly: promo day
-        if current_date.date() == promo_day.date():
+        if offset == promo_day:
             day_mult *= 3.0
-        
-        daily_sales = int(random.gauss(2700, 400) * day_mult)
-        
-        sales_batch = []
-        
-        for _ in range(daily_sales):
-            # Hour distribution
-            hour_weights = [get_hour_weight(h) * 100 for h in range(24)]
-            hour = random.choices(range(24), weights=hour_weights)[0]
-            
-            sale_time = current_date.replace(
-                hour=hour,
-                minute=random.randint(0, 59),
-                second=random.randint(0, 59)
-            )
-            
-            # Select entities
-            store_id = random.choice(stores)
-            channel = random.choices(channels, weights=[c['weight'] for c in channels])[0]
-            customer_id = random.choice(customers) if random.random() > 0.3 else None
-            
-            # Generate sale
-            sale_data = generate_single_sale(
-                sale_time, store_id, channel, customer_id, 
-                products, items, option_groups
-            )
-            
-            sales_batch.append(sale_data)
-            
-            if len(sales_batch) >= batch_size:
-                insert_sales_batch(cursor, sales_batch, items, option_groups)
-                total_sales += len(sales_batch)
-                sales_batch = []
-                conn.commit()
-        
-        # Insert remaining
-        if sales_batch:
-            insert_sales_batch(cursor, sales_batch, items, option_groups)
-            total_sales += len(sales_batch)
-            conn.commit()
-        
-        current_date += timedelta(days=1)
-        
-        if current_date.day == 1:
-            print(f"  → {current_date.strftime('%B %Y')}: {total_sales:,} sales")
-    
-    print(f"✓ {total_sales:,} total sales generated")
-    return total_sales
+        multipliers.append(day_mult)
+    return np.array(multipliers)
+
+
+def plan_shards(num_stores, num_days):
+    """Shard by store block and date block; each shard has its own random streams"""
+    shards = []
+    for first_store in range(0, num_stores, STORES_PER_SHARD):
+        for first_day in range(0, num_days, DAYS_PER_SHARD):
+            shards.append({
+                'index': len(shards),
+                'first_store': first_store,
+                'num_stores': min(STORES_PER_SHARD, num_stores - first_store),
+                'first_day': first_day,
+                'num_days': min(DAYS_PER_SHARD, num_days - first_day)
+            })
+    return shards
+
+
+def shard_skeleton(seed, shard, tables, multipliers):
+    """The shape of a shard: how many sales, lines, items, deliveries and payments.
+
+    Drawn from its own stream so the parent can size every shard (and hand out
+    ids) without generating the rows themselves.
+    """
+    rng = np.random.default_rng([seed, shard['index'], 0])
+    demand = SALES_PER_STORE_DAY * multipliers[shard['first_day']:shard['first_day'] + shard['num_days']]
+    counts = rng.poisson(np.repeat(demand[:, None], shard['num_stores'], axis=1)).ravel()
+    num_sales = int(counts.sum())
+    day_offsets = np.repeat(np.repeat(np.arange(shard['num_days']), shard['num_stores']), counts) + shard['first_day']
+    store_indexes = np.repeat(np.tile(np.arange(shard['num_stores']), shard['num_days']), counts) + shard['first_store']
+
+    channels = sample(rng, tables['channel_cdf'], num_sales)
+    completed = rng.random(num_sales) < STATUS_WEIGHTS[0]
+    product_counts = np.minimum(5, rng.exponential(2.0, num_sales).astype(int) + 1)
+    line_products = sample(rng, tables['product_cdf'], int(product_counts.sum()))
+    customized = tables['product_customizable'][line_products] & (rng.random(len(line_products)) > 0.4)
+    item_counts = np.where(customized, rng.integers(1, 5, len(line_products)), 0)
+    delivered = tables['channel_is_delivery'][channels] & completed
+    payment_counts = np.where(completed, np.where(rng.random(num_sales) < 0.15, 2, 1), 0)
+
+    skeleton = {
+        'day_offsets': day_offsets,
+        'store_indexes': store_indexes,
+        'channels': channels,
+        'completed': completed,
+        'product_counts': product_counts,
+        'line_products': line_products,
+        'item_counts': item_counts,
+        'delivered': delivered,
+        'payment_counts': payment_counts
+    }
+    skeleton['sizes'] = {
+        'sales': num_sales,
+        'product_sales': len(line_products),
+        'item_product_sales': int(item_counts.sum()),
+        'delivery_sales': int(delivered.sum()),
+        'delivery_addresses': int(delivered.sum()),
+        'payments': int(payment_counts.sum())
+    }
+    return skeleton
 
 
-def generate_single_sale(sale_time, store_id, channel, customer_id, products, items, option_groups):
-    """Generate a single sale with all related data"""
-    
-    # Select 1-5 products
-    num_products = min(5, max(1, int(random.expovariate(0.5)) + 1))
-    selected_products = random.choices(
-        products,
-        weights=[p['popularity'] for p in products],
-        k=num_products
+def reserve_ids(conn, totals):
+    """Take a contiguous id block per table so shards can write explicit, reproducible ids"""
+    cursor = conn.cursor()
+    bases = {}
+    for table in SHARD_TABLES:
+        cursor.execute("SELECT nextval(pg_get_serial_sequence(%s, 'id'))", (table,))
+        bases[table] = cursor.fetchone()[0]
+        if totals[table] > 1:
+            cursor.execute(
+                "SELECT setval(pg_get_serial_sequence(%s, 'id'), %s)",
+                (table, bases[table] + totals[table] - 1)
+            )
+    conn.commit()
+    return bases
+
+
+def money(values):
+    return np.round(values, 2).tolist()
+
+
+def generate_shard_rows(seed, shard, tables, multipliers, start_date, id_bases):
+    """Fill in a shard's skeleton: prices, times, names and addresses"""
+    skeleton = shard_skeleton(seed, shard, tables, multipliers)
+    sizes = skeleton['sizes']
+    rng = np.random.default_rng([seed, shard['index'], 1])
+    shard_fake = Faker('pt_BR')
+    shard_fake.seed_instance(int(rng.integers(2 ** 32)))
+    # Faker is by far the slowest part, so each shard samples from small pools
+    names = [shard_fake.name() for _ in range(FAKE_POOL_SIZE)]
+    phones = [shard_fake.phone_number() for _ in range(FAKE_POOL_SIZE)]
+    streets = [shard_fake.street_name() for _ in range(FAKE_POOL_SIZE)]
+    neighborhoods = [shard_fake.bairro() for _ in range(FAKE_POOL_SIZE)]
+    cities = [shard_fake.city() for _ in range(FAKE_POOL_SIZE)]
+    states = [shard_fake.estado_sigla() for _ in range(FAKE_POOL_SIZE)]
+    postcodes = [shard_fake.postcode() for _ in range(FAKE_POOL_SIZE)]
+
+    num_sales = sizes['sales']
+    sale_ids = id_bases['sales'] + np.arange(num_sales)
+    channels = skeleton['channels']
+    completed = skeleton['completed']
+    is_delivery = tables['channel_is_delivery'][channels]
+
+    # Sale times
+    seconds = (
+        skeleton['day_offsets'] * 86400
+        + sample(rng, tables['hour_cdf'], num_sales) * 3600
+        + rng.integers(0, 60, num_sales) * 60
+        + rng.integers(0, 60, num_sales)
     )
-    
-    # Calculate financial values
-    total_items_value = 0
-    products_data = []
-    
-    for product in selected_products:
-        qty = random.randint(1, 3)
-        base_price = product['base_price']
-        
-        # Items/complements for this product (60% have customization)
-        items_data = []
-        item_additions_price = 0
-        
-        if product['has_customization'] and random.random() > 0.4:
-            num_items = random.randint(1, 4)
-            for _ in range(num_items):
-                item = random.choice(items)
-                item_qty = 1
-                item_price = item['price']
-                item_additions_price += item_price
-                
-                items_data.append({
-                    'item_id': item['id'],
-                    'option_group_id': random.choice(option_groups) if random.random() > 0.5 else None,
-                    'quantity': item_qty,
-                    'additional_price': item_price,
-                    'price': item_price
-                })
-        
-        product_total = (base_price + item_additions_price) * qty
-        total_items_value += product_total
-        
-        products_data.append({
-            'product_id': product['id'],
-            'quantity': qty,
-            'base_price': base_price,
-            'total_price': product_total,
-            'items': items_data
-        })
-    
-    # Discounts
-    discount = 0
-    discount_reason = None
-    if random.random() < 0.2:
-        discount = round(total_items_value * random.uniform(0.05, 0.30), 2)
-        discount_reason = random.choice(DISCOUNT_REASONS)
-    
-    # Increases
-    increase = 0
-    if random.random() < 0.05:
-        increase = round(total_items_value * random.uniform(0.02, 0.10), 2)
-    
-    # Delivery fee
-    delivery_fee = 0
-    if channel['type'] == 'D':
-        delivery_fee = random.choice([5.0, 7.0, 9.0, 12.0, 15.0])
-    
-    # Service tax
-    service_tax = round(total_items_value * 0.10, 2) if random.random() < 0.3 else 0
-    
-    # Status
-    status = random.choices(SALES_STATUS, STATUS_WEIGHTS)[0]
-    
-    # Total
-    total_amount = total_items_value - discount + increase + delivery_fee + service_tax
-    value_paid = total_amount if status == 'COMPLETED' else 0
-    
-    # Operational times
-    production_sec = random.randint(300, 2400) if status == 'COMPLETED' else None
-    delivery_sec = random.randint(600, 3600) if channel['type'] == 'D' and status == 'COMPLETED' else None
-    
-    # Delivery details (for delivery orders)
-    delivery_data = None
-    if channel['type'] == 'D' and status == 'COMPLETED':
-        # Brazilian coordinates (realistic range)
-        lat = -23.5 + random.uniform(-10, 5)  # -33.5 to -18.5 (covers Brazil)
-        long = -46.6 + random.uniform(-10, 10)  # -56.6 to -36.6
-        
-        delivery_data = {
-            'courier_name': fake.name(),
-            'courier_phone': fake.phone_number(),
-            'courier_type': random.choice(COURIER_TYPES),
-            'delivery_type': random.choice(DELIVERY_TYPES),
-            'status': 'DELIVERED',
-            'delivery_fee': delivery_fee,
-            'courier_fee': round(delivery_fee * 0.6, 2),
-            'address': {
-                'street': fake.street_name(),
-                'number': str(random.randint(10, 9999)),
-                'complement': random.choice(['Apto 101', 'Casa', 'Bloco A', 'Fundos', None, None]) if random.random() > 0.5 else None,
-                'neighborhood': fake.bairro(),
-                'city': fake.city(),
-                'state': fake.estado_sigla(),
-                'postal_code': fake.postcode(),
-                'latitude': lat,
-                'longitude': long
-            }
-        }
-    
-    # Payment splits
-    payments = []
-    if status == 'COMPLETED':
-        num_payments = random.choices([1, 2], weights=[0.85, 0.15])[0]
-        
-        if num_payments == 1:
-            payments = [{'type': random.choice(PAYMENT_TYPES_LIST), 'value': value_paid}]
-        else:
-            split = round(value_paid * random.uniform(0.3, 0.7), 2)
-            payments = [
-                {'type': random.choice(PAYMENT_TYPES_LIST[:3]), 'value': split},
-                {'type': random.choice(PAYMENT_TYPES_LIST), 'value': value_paid - split}
-            ]
-    
+    start_time = datetime.combine(start_date, datetime.min.time())
+    created_at = [start_time + timedelta(seconds=s) for s in seconds.tolist()]
+
+    # Product lines and their customizations
+    line_sales = np.repeat(np.arange(num_sales), skeleton['product_counts'])
+    line_products = skeleton['line_products']
+    num_lines = sizes['product_sales']
+    line_ids = id_bases['product_sales'] + np.arange(num_lines)
+    quantities = rng.integers(1, 4, num_lines)
+    base_prices = tables['product_prices'][line_products]
+    item_lines = np.repeat(np.arange(num_lines), skeleton['item_counts'])
+    num_items = sizes['item_product_sales']
+    item_indexes = rng.integers(0, len(tables['item_ids']), num_items)
+    item_prices = tables['item_prices'][item_indexes]
+    has_option_group = rng.random(num_items) > 0.5
+    option_groups = tables['option_group_ids'][rng.integers(0, len(tables['option_group_ids']), num_items)]
+    additions = np.bincount(item_lines, weights=item_prices, minlength=num_lines)
+    line_totals = (base_prices + additions) * quantities
+    total_items_value = np.bincount(line_sales, weights=line_totals, minlength=num_sales)
+
+    # Financials
+    discounted = rng.random(num_sales) < 0.2
+    discounts = np.where(discounted, np.round(total_items_value * rng.uniform(0.05, 0.30, num_sales), 2), 0.0)
+    discount_reasons = rng.integers(0, len(DISCOUNT_REASONS), num_sales)
+    increases = np.where(rng.random(num_sales) < 0.05, np.round(total_items_value * rng.uniform(0.02, 0.10, num_sales), 2), 0.0)
+    delivery_fees = np.where(is_delivery, np.array([5.0, 7.0, 9.0, 12.0, 15.0])[rng.integers(0, 5, num_sales)], 0.0)
+    service_taxes = np.where(rng.random(num_sales) < 0.3, np.round(total_items_value * 0.10, 2), 0.0)
+    total_amounts = total_items_value - discounts + increases + delivery_fees + service_taxes
+    values_paid = np.where(completed, total_amounts, 0.0)
+    production_seconds = rng.integers(300, 2401, num_sales)
+    delivery_seconds = rng.integers(600, 3601, num_sales)
+    has_customer = rng.random(num_sales) > 0.3
+    customer_ids = tables['customer_ids'][rng.integers(0, len(tables['customer_ids']), num_sales)]
+    anonymous_names = rng.integers(0, FAKE_POOL_SIZE, num_sales)
+    people = rng.integers(1, 9, num_sales)
+    is_presencial = tables['channel_is_presencial'][channels]
+    store_ids = tables['store_ids'].tolist()
+    channel_ids = tables['channel_ids'].tolist()
+
+    sales_rows = []
+    for (sale_id, store_index, channel, done, delivery, presencial, customer, known_customer,
+         anonymous_name, created, items_value, discount, reason, discounted_sale, increase,
+         delivery_fee, service_tax, total_amount, value_paid, production, delivery_time, people_quantity) in zip(
+        sale_ids.tolist(), skeleton['store_indexes'].tolist(), channels.tolist(), completed.tolist(),
+        is_delivery.tolist(), is_presencial.tolist(), customer_ids.tolist(), has_customer.tolist(),
+        anonymous_names.tolist(), created_at, total_items_value.tolist(), discounts.tolist(),
+        discount_reasons.tolist(), discounted.tolist(), increases.tolist(), delivery_fees.tolist(),
+        service_taxes.tolist(), total_amounts.tolist(), values_paid.tolist(),
+        production_seconds.tolist(), delivery_seconds.tolist(), people.tolist()
+    ):
+        sales_rows.append((
+            sale_id, store_ids[store_index],
+            customer if known_customer else None,
+            channel_ids[channel],
+            None if known_customer else names[anonymous_name],
+            created, 'COMPLETED' if done else 'CANCELLED',
+            items_value, discount, increase, delivery_fee, service_tax, total_amount, value_paid,
+            production if done else None,
+            delivery_time if done and delivery else None,
+            DISCOUNT_REASONS[reason] if discounted_sale else None,
+            people_quantity if presencial else None,
+            'POS'
+        ))
+
+    line_sale_ids = sale_ids[line_sales].tolist()
+    line_created_at = [created_at[s] for s in line_sales.tolist()]
+    product_sales_rows = list(zip(
+        line_ids.tolist(), line_sale_ids, tables['product_ids'][line_products].tolist(),
+        quantities.tolist(), base_prices.tolist(), line_totals.tolist(), line_created_at
+    ))
+    item_product_sales_rows = [
+        (item_id, line_id, item, option_group if has_group else None, 1, price, price, 1, line_created_at[line])
+        for item_id, line_id, item, option_group, has_group, price, line in zip(
+            (id_bases['item_product_sales'] + np.arange(num_items)).tolist(),
+            line_ids[item_lines].tolist(),
+            tables['item_ids'][item_indexes].tolist(),
+            option_groups.tolist(),
+            has_option_group.tolist(),
+            item_prices.tolist(),
+            item_lines.tolist()
+        )
+    ]
+
+    # Deliveries
+    delivered = np.flatnonzero(skeleton['delivered'])
+    num_deliveries = len(delivered)
+    delivery_ids = (id_bases['delivery_sales'] + np.arange(num_deliveries)).tolist()
+    address_ids = (id_bases['delivery_addresses'] + np.arange(num_deliveries)).tolist()
+    couriers = rng.integers(0, FAKE_POOL_SIZE, num_deliveries)
+    courier_types = rng.integers(0, len(COURIER_TYPES), num_deliveries)
+    delivery_types = rng.integers(0, len(DELIVERY_TYPES), num_deliveries)
+    address_pool = rng.integers(0, FAKE_POOL_SIZE, (num_deliveries, 5))
+    numbers = rng.integers(10, 10000, num_deliveries)
+    complements = np.where(rng.random(num_deliveries) > 0.5, rng.integers(0, 6, num_deliveries), -1)
+    # Brazilian coordinates, clipped to a valid range
+    latitudes = np.clip(-23.5 + rng.uniform(-10, 5, num_deliveries), -33.0, -5.0)
+    longitudes = np.clip(-46.6 + rng.uniform(-10, 10, num_deliveries), -74.0, -34.0)
+    delivery_sales_rows = []
+    delivery_addresses_rows = []
+    for (i, delivery_id, address_id, courier, courier_type, delivery_type, pool, number,
+         complement, latitude, longitude) in zip(
+        delivered.tolist(), delivery_ids, address_ids, couriers.tolist(), courier_types.tolist(),
+        delivery_types.tolist(), address_pool.tolist(), numbers.tolist(), complements.tolist(),
+        latitudes.tolist(), longitudes.tolist()
+    ):
+        fee = float(delivery_fees[i])
+        sale_id = int(sale_ids[i])
+        delivery_sales_rows.append((
+            delivery_id, sale_id, names[courier], phones[courier],
+            COURIER_TYPES[courier_type], DELIVERY_TYPES[delivery_type], 'DELIVERED',
+            fee, round(fee * 0.6, 2), created_at[i]
+        ))
+        delivery_addresses_rows.append((
+            address_id, sale_id, delivery_id, streets[pool[0]], str(number),
+            COMPLEMENTS[complement] if complement >= 0 else None,
+            neighborhoods[pool[1]], cities[pool[2]], states[pool[3]], postcodes[pool[4]],
+            round(latitude, 8), round(longitude, 8), created_at[i]
+        ))
+
+    # Payments: one, or a split where the first part is cash or card
+    payment_types = tables['payment_type_ids'].tolist()
+    splits = np.round(values_paid * rng.uniform(0.3, 0.7, num_sales), 2)
+    first_types = rng.integers(0, len(payment_types), num_sales)
+    split_types = rng.integers(0, 3, num_sales)
+    second_types = rng.integers(0, len(payment_types), num_sales)
+    payment_ids = iter((id_bases['payments'] + np.arange(sizes['payments'])).tolist())
+    payments_rows = []
+    for sale_id, count, created, value_paid, split, first_type, split_type, second_type in zip(
+        sale_ids.tolist(), skeleton['payment_counts'].tolist(), created_at, values_paid.tolist(),
+        splits.tolist(), first_types.tolist(), split_types.tolist(), second_types.tolist()
+    ):
+        if count == 1:
+            payments_rows.append((next(payment_ids), sale_id, payment_types[first_type], value_paid, created))
+        elif count == 2:
+            payments_rows.append((next(payment_ids), sale_id, payment_types[split_type], split, created))
+            payments_rows.append((next(payment_ids), sale_id, payment_types[second_type], value_paid - split, created))
+
     return {
-        'store_id': store_id,
-        'customer_id': customer_id,
-        'customer_name': fake.name() if not customer_id else None,
-        'channel_id': channel['id'],
-        'created_at': sale_time,
-        'sale_status_desc': status,
-        'total_items_value': total_items_value,
-        'discount': discount,
-        'discount_reason': discount_reason,
-        'increase': increase,
-        'delivery_fee': delivery_fee,
-        'service_tax': service_tax,
-        'total_amount': total_amount,
-        'value_paid': value_paid,
-        'production_sec': production_sec,
-        'delivery_sec': delivery_sec,
-        'people_qty': random.randint(1, 8) if channel['type'] == 'P' else None,
-        'products': products_data,
-        'delivery': delivery_data,
-        'payments': payments
+        'sales': sales_rows,
+        'product_sales': product_sales_rows,
+        'item_product_sales': item_product_sales_rows,
+        'delivery_sales': delivery_sales_rows,
+        'delivery_addresses': delivery_addresses_rows,
+        'payments': payments_rows
     }
 
 
-def insert_sales_batch(cursor, sales_batch, items, option_groups):
-    """Insert batch of sales with all related data"""
-    
-    # Insert sales
-    sales_data = [(
-        s['store_id'], s['customer_id'], s['channel_id'],
-        s['customer_name'], s['created_at'], s['sale_status_desc'],
-        Decimal(str(s['total_items_value'])),
-        Decimal(str(s['discount'])),
-        Decimal(str(s['increase'])),
-        Decimal(str(s['delivery_fee'])),
-        Decimal(str(s['service_tax'])),
-        Decimal(str(s['total_amount'])),
-        Decimal(str(s['value_paid'])),
-        s['production_sec'], s['delivery_sec'],
-        s['discount_reason'], s['people_qty'], 'POS'
-    ) for s in sales_batch]
-    
-    execute_batch(cursor, """
-        INSERT INTO sales (
-            store_id, customer_id, channel_id, customer_name,
-            created_at, sale_status_desc,
-            total_amount_items, total_discount, total_increase,
-            delivery_fee, service_tax_fee, total_amount, value_paid,
-            production_seconds, delivery_seconds,
-            discount_reason, people_quantity, origin
-        ) VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
-    """, sales_data, page_size=500)
-    
-    # Get inserted sale IDs
-    cursor.execute("""
-        SELECT id FROM sales 
-        ORDER BY id DESC 
-        LIMIT %s
-    """, (len(sales_batch),))
-    sale_ids = [row[0] for row in cursor.fetchall()]
-    sale_ids.reverse()
-    
-    # Insert product_sales and related data
-    for sale_id, sale in zip(sale_ids, sales_batch):
-        for prod_data in sale['products']:
-            cursor.execute("""
-                INSERT INTO product_sales (
-                    sale_id, product_id, quantity, base_price, total_price
-                ) VALUES (%s,%s,%s,%s,%s) RETURNING id
-            """, (
-                sale_id, prod_data['product_id'],
-                prod_data['quantity'], prod_data['base_price'],
-                prod_data['total_price']
-            ))
-            product_sale_id = cursor.fetchone()[0]
-            
-            # Insert items for this product
-            for item_data in prod_data['items']:
-                cursor.execute("""
-                    INSERT INTO item_product_sales (
-                        product_sale_id, item_id, option_group_id,
-                        quantity, additional_price, price, amount
-                    ) VALUES (%s,%s,%s,%s,%s,%s,%s)
-                """, (
-                    product_sale_id, item_data['item_id'],
-                    item_data['option_group_id'],
-                    item_data['quantity'], item_data['additional_price'],
-                    item_data['price'], 1
-                ))
-        
-        # Insert delivery data
-        if sale['delivery']:
-            d = sale['delivery']
-            cursor.execute("""
-                INSERT INTO delivery_sales (
-                    sale_id, courier_name, courier_phone, courier_type,
-                    delivery_type, status, delivery_fee, courier_fee
-                ) VALUES (%s,%s,%s,%s,%s,%s,%s,%s) RETURNING id
-            """, (
-                sale_id, d['courier_name'], d['courier_phone'],
-                d['courier_type'], d['delivery_type'], d['status'],
-                d['delivery_fee'], d['courier_fee']
-            ))
-            delivery_sale_id = cursor.fetchone()[0]
-            
-            addr = d['address']
-            # Ensure coordinates are within valid range for Brazil
-            lat = max(-33.0, min(-5.0, addr['latitude']))
-            long = max(-74.0, min(-34.0, addr['longitude']))
-            
-            cursor.execute("""
-                INSERT INTO delivery_addresses (
-                    sale_id, delivery_sale_id, street, number, complement,
-                    neighborhood, city, state, postal_code, latitude, longitude
-                ) VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
-            """, (
-                sale_id, delivery_sale_id, addr['street'], addr['number'],
-                addr['complement'], addr['neighborhood'], addr['city'],
-                addr['state'], addr['postal_code'], lat, long
-            ))
-        
-        # Insert payments
-        for payment in sale['payments']:
-            cursor.execute(
-                "SELECT id FROM payment_types WHERE description = %s LIMIT 1",
-                (payment['type'],)
-            )
-            result = cursor.fetchone()
-            if result:
-                cursor.execute("""
-                    INSERT INTO payments (sale_id, payment_type_id, value)
-                    VALUES (%s,%s,%s)
-                """, (sale_id, result[0], Decimal(str(payment['value']))))
+TABLE_COLUMNS = {
+    'sales': SALES_COLUMNS,
+    'product_sales': PRODUCT_SALES_COLUMNS,
+    'item_product_sales': ITEM_PRODUCT_SALES_COLUMNS,
+    'delivery_sales': DELIVERY_SALES_COLUMNS,
+    'delivery_addresses': DELIVERY_ADDRESSES_COLUMNS,
+    'payments': PAYMENTS_COLUMNS
+}
+
+# Set in each worker process by init_worker
+worker_context = None
+
+
+def init_worker(context):
+    global worker_context
+    worker_context = context
+
+
+def load_shard(task):
+    """Generate one shard and COPY it in its own transaction"""
+    shard, id_bases = task
+    context = worker_context
+    rows = generate_shard_rows(
+        context['seed'], shard, context['tables'], context['multipliers'],
+        context['start_date'], id_bases
+    )
+    conn = get_db_connection(context['db_url'])
+    try:
+        cursor = conn.cursor()
+        # Parents before children so the foreign keys hold at every step
+        for table in SHARD_TABLES:
+            copy_rows(cursor, table, TABLE_COLUMNS[table], rows[table])
+        conn.commit()
+    finally:
+        conn.close()
+    return len(rows['sales'])
+
+
+def generate_sales(conn, db_url, stores, channels, products, items, option_groups, customers,
+                   months=6, end_date=None, seed=0, workers=1):
+    """Generate sales with realistic patterns, sharded across worker processes"""
+    print(f"Generating sales for {months} months with {workers} worker(s), seed {seed}...")
+
+    end_date = end_date or date.today()
+    start_date = end_date - timedelta(days=30 * months)
+    num_days = (end_date - start_date).days + 1
+    multipliers = build_calendar(np.random.default_rng([seed]), start_date, num_days)
+    tables = build_sampling_tables(stores, channels, products, items, option_groups, customers, get_payment_type_ids(conn))
+
+    shards = plan_shards(len(stores), num_days)
+    shard_sizes = [shard_skeleton(seed, shard, tables, multipliers)['sizes'] for shard in shards]
+    totals = {table: sum(sizes[table] for sizes in shard_sizes) for table in SHARD_TABLES}
+    bases = reserve_ids(conn, totals)
+    tasks = []
+    for shard, sizes in zip(shards, shard_sizes):
+        tasks.append((shard, dict(bases)))
+        for table in SHARD_TABLES:
+            bases[table] += sizes[table]
+
+    context = {
+        'db_url': db_url,
+        'seed': seed,
+        'tables': tables,
+        'multipliers': multipliers,
+        'start_date': start_date
+    }
+    total_sales = 0
+    with multiprocessing.Pool(workers, initializer=init_worker, initargs=(context,)) as pool:
+        for done, shard_sales in enumerate(pool.imap_unordered(load_shard, tasks), start=1):
+            total_sales += shard_sales
+            if done % max(1, len(tasks) // 10) == 0 or done == len(tasks):
+                print(f"  → {done}/{len(tasks)} shards: {total_sales:,} sales")
+
+    print(f"✓ {total_sales:,} total sales generated")
+    return total_sales
 
 
 def create_indexes(conn):
@@ -644,20 +838,20 @@ def create_indexes(conn):
     print("Creating indexes...")
     cursor = conn.cursor()
     
-    # Additional indexes
+    # The backend's migrations own the full index set; these keep a standalone load usable.
     indexes = [
-        "CREATE INDEX IF NOT EXISTS idx_sales_date_status ON sales(DATE(created_at), sale_status_desc)",
+        "CREATE INDEX IF NOT EXISTS idx_sales_sale_date_status ON sales(sale_date, sale_status_desc)",
         "CREATE INDEX IF NOT EXISTS idx_product_sales_product_sale ON product_sales(product_id, sale_id)",
     ]
     
     for idx in indexes:
         try:
             cursor.execute(idx)
-        except:
-            pass
-    
+            conn.commit()
+        except psycopg2.Error as e:
+            conn.rollback()
+            print(f"  ! Could not create index ({e.pgerror or e}): {idx}")
     
-    conn.commit()
     print("✓ Indexes created")
 
 
@@ -670,28 +864,41 @@ def main():
     parser.add_argument('--items', type=int, default=200, help='Number of items/complements')
     parser.add_argument('--customers', type=int, default=10000, help='Number of customers')
     parser.add_argument('--months', type=int, default=6, help='Months of sales data')
+    parser.add_argument('--scale-factor', type=float, default=1.0,
+                       help='Multiplies stores and customers (sales follow the store count)')
+    parser.add_argument('--seed', type=int, help='Random seed; the same seed and arguments give the same data')
+    parser.add_argument('--end-date', type=date.fromisoformat,
+                       help='Last day of sales (YYYY-MM-DD), default today; fix it to reproduce a seeded run')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                       help='Worker processes generating sales shards')
     
     args = parser.parse_args()
+    num_stores = max(1, round(args.stores * args.scale_factor))
+    num_customers = max(1, round(args.customers * args.scale_factor))
+    end_date = args.end_date or date.today()
+    seed = args.seed if args.seed is not None else random.SystemRandom().randrange(2 ** 32)
+    random.seed(seed)
+    fake.seed_instance(seed)
     
     print("=" * 70)
     print("God Level Coder Challenge - Data Generator")
     print("=" * 70)
-    print(f"Generating {args.months} months of restaurant operational data...")
+    print(f"Generating {args.months} months of restaurant operational data up to {end_date} (seed {seed})...")
     print()
     
     conn = get_db_connection(args.db_url)
     
     try:
         sub_brand_ids, channels = setup_base_data(conn)
-        stores = generate_stores(conn, sub_brand_ids, args.stores)
+        stores = generate_stores(conn, sub_brand_ids, num_stores, end_date)
         products, items, option_groups = generate_products_and_items(
             conn, sub_brand_ids, args.products, args.items
         )
-        customers = generate_customers(conn, args.customers)
+        customers = generate_customers(conn, num_customers, end_date)
         
         total_sales = generate_sales(
-            conn, stores, channels, products, items, 
-            option_groups, customers, args.months
+            conn, args.db_url, stores, channels, products, items,
+            option_groups, customers, args.months, end_date, seed, args.workers
         )
         
         create_indexes(conn)